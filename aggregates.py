@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# Acil servis verileri için önceden toplanmış veri küpleri. Her küme gün, hafta
+# ve ay çözünürlüğünde, ana boyutların (cinsiyet, ırk, geliş şekli, çıkış
+# durumu...) her birleşimi için sayıları tutar; panel sorguları ham tablolar
+# yerine bu küçük küpler üzerinde gruplama/toplama olarak çalışır.
+RESOLUTIONS = ["day", "week", "month"]
+BUCKET_COLUMN = "bucket"
+
+STAY_DIMENSIONS = ["gender", "race", "arrival_transport", "disposition"]
+DIAGNOSIS_DIMENSIONS = ["gender", "disposition", "icd_code", "icd_version", "long_title"]
+
+# Küp türü → (boyutlar, ölçüler, çözünürlükler). Ölçüler toplanabilir olmalıdır;
+# ortalamalar sorgu sırasında toplam / sayı olarak hesaplanır. Tanı küpü ICD
+# kodu boyutu nedeniyle günlük çözünürlükte ham tablodan pek küçük olmadığından
+# yalnızca aylık tutulur.
+CUBES = {
+    "ed_stays": (STAY_DIMENSIONS, {
+        "visits": ("stay_id", "size"),
+        "los_hours_sum": ("los_hours", "sum"),
+        "los_count": ("los_hours", "count"),
+    }, RESOLUTIONS),
+    "ed_diagnoses": (DIAGNOSIS_DIMENSIONS, {
+        "diagnoses": ("stay_id", "size"),
+    }, ["month"]),
+}
+
+CUBE_DIMENSIONS = {column for dimensions, _, _ in CUBES.values() for column in dimensions}
+
+# Uzun serilerde grafiğe gönderilen en fazla nokta sayısı (grup başına)
+CHART_MAX_POINTS = 500
+
+def cube_name(kind, resolution):
+    return f"{kind}_{resolution}"
+
+def time_bucket(times, resolution):
+    """Zamanları gün / hafta (pazartesi) / ay başına indir."""
+    times = pd.to_datetime(times, errors="coerce")
+    if resolution == "day":
+        return times.dt.floor("D")
+    if resolution == "week":
+        return times.dt.to_period("W-SUN").dt.start_time
+    if resolution == "month":
+        return times.dt.to_period("M").dt.start_time
+    raise ValueError(f"Bilinmeyen çözünürlük: {resolution}")
+
+def build_cube(df, time_column, dimensions, measures, resolution):
+    """``df``'i zaman kovası ve boyutlara göre toplayıp küpü döndür."""
+    dimensions = [column for column in dimensions if column in df.columns]
+    frame = df.assign(**{BUCKET_COLUMN: time_bucket(df[time_column], resolution)})
+    # Boyutu boş olan satırlar da sayılır (ör. çıkış durumu bilinmeyen ziyaretler)
+    cube = frame.groupby([BUCKET_COLUMN] + dimensions, dropna=False, observed=True).agg(**measures)
+    return cube.reset_index()
+
+def build_kind_cube(kind, df, resolution):
+    """Bir küp türünü tek çözünürlükte oluştur (ör. bellekteki filtrelenmiş kohorttan)."""
+    dimensions, measures, _ = CUBES[kind]
+    return build_cube(df, "intime", dimensions, measures, resolution)
+
+def build_kind_cubes(kind, df):
+    """Bir küp türünü tüm çözünürlüklerinde oluştur: {küme adı: küp}."""
+    return {cube_name(kind, resolution): build_kind_cube(kind, df, resolution) for resolution in CUBES[kind][2]}
+
+def build_cubes(stays_df, diagnoses_df):
+    """Tüm küp türlerini tüm çözünürlüklerde oluştur: {küme adı: küp}."""
+    return {**build_kind_cubes("ed_stays", stays_df), **build_kind_cubes("ed_diagnoses", diagnoses_df)}
+
+def combine_cubes(kind, parts):
+    """Tablonun ayrı parçalarından oluşturulmuş aynı küpleri tek küpte topla.
+
+    Ölçüler toplanabilir olduğundan aynı (kova, boyutlar) satırlarının ölçüleri toplanır.
+    """
+    measures = list(CUBES[kind][1])
+    cube = pd.concat(parts, ignore_index=True)
+    keys = [column for column in cube.columns if column not in measures]
+    return cube.groupby(keys, dropna=False, observed=True)[measures].sum().reset_index()
+
+def query_cube(cube, group_by=None, filters=None, start=None, end=None):
+    """Küpü filtrele ve (kova + ``group_by``) düzeyine topla.
+
+    ``filters`` {boyut: izin verilen değerler}; boş liste filtre uygulanmaz demektir.
+    """
+    group_by = list(group_by or [])
+    mask = np.ones(len(cube), dtype=bool)
+    for column, values in (filters or {}).items():
+        if values and column in cube.columns:
+            mask &= cube[column].isin(values).to_numpy()
+    if start is not None:
+        mask &= (cube[BUCKET_COLUMN] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (cube[BUCKET_COLUMN] <= pd.Timestamp(end)).to_numpy()
+    measures = [column for column in cube.columns if column != BUCKET_COLUMN and column not in CUBE_DIMENSIONS]
+    return (
+        cube[mask]
+        .groupby([BUCKET_COLUMN] + group_by, observed=True)[measures]
+        .sum()
+        .reset_index()
+    )
+
+def lttb(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: serinin görsel biçimini koruyan ``threshold``
+    noktanın indislerini döndür. ``x`` artan sırada olmalıdır."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    # İlk ve son nokta dışındaki noktalar threshold - 2 kovaya bölünür
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Sonraki kovanın ortalaması üçgenin üçüncü köşesidir
+        next_start, next_stop = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_stop].mean()
+        avg_y = y[next_start:next_stop].mean()
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        indices[i + 1] = previous
+    return indices
+
+def downsample(series_df, x_column, y_column, group_by=None, threshold=CHART_MAX_POINTS):
+    """Her grubu ayrı ayrı LTTB ile ``threshold`` noktaya indir."""
+    if group_by:
+        parts = [
+            group.iloc[lttb(group[x_column].astype("int64"), group[y_column], threshold)]
+            for _, group in series_df.sort_values(x_column).groupby(group_by, observed=True)
+        ]
+        return pd.concat(parts, ignore_index=True) if parts else series_df
+    series_df = series_df.sort_values(x_column)
+    return series_df.iloc[lttb(series_df[x_column].astype("int64"), series_df[y_column], threshold)]
@@ -1,35 +1,92 @@
 import streamlit as st
 import pandas as pd
-import psycopg2
 import plotly.express as px
-from dotenv import load_dotenv
+import logging
 import os
-from functools import lru_cache
-
-# .env dosyasından veritabanı bilgilerini yükle
-load_dotenv()
-DB_CONFIG = {
-    "dbname": os.getenv("DB_NAME", "mimic"),
-    "user": os.getenv("DB_USER", "postgres"),
-    "password": os.getenv("DB_PASSWORD", "password"),
-    "host": os.getenv("DB_HOST", "localhost"),
-    "port": os.getenv("DB_PORT", "5432")
-}
-
-def get_data(query):
+from backend.cache import QueryCache
+from backend.counts import CountService
+from backend.db import get_pool, query_df
+from backend.queries import (
+    FILTER_DICTIONARY_SEARCH_QUERY,
+    FILTER_DICTIONARY_VALUES_QUERY,
+    FILTER_DICTIONARY_VERSION_QUERY,
+    build_bookmark_query,
+    build_filter_sql,
+    build_page_query,
+    like_pattern,
+)
+
+# Sorgu gecikmeleri "mimic.db" logger'ı ile konsola yazılır
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(asctime)s %(name)s %(message)s")
+
+def get_data(query, params=None, label=None):
     """ PostgreSQL'den veri çekme fonksiyonu """
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        df = pd.read_sql(query, conn)
-        conn.close()
-        return df
+        return query_df(query, params, label=label)
     except Exception as e:
         st.error(f"SQL Hatası: {e}")
         return pd.DataFrame()
 
-@lru_cache(maxsize=128)
-def get_cached_data(query):
-    return get_data(query)
+@st.cache_resource
+def get_query_cache():
+    """ Süreç genelinde paylaşılan sorgu sonucu önbelleği """
+    return QueryCache()
+
+@st.cache_resource
+def get_count_service():
+    """ Tahmini/kesin toplam sayı servisi; kesin sayımlar arka planda çalışır """
+    return CountService(get_query_cache(), get_pool())
+
+# Kesin sayım beklenirken toplamın yeniden kontrol edilme aralığı (saniye)
+COUNT_POLL_SECONDS = 2
+
+def get_cached_data(query, params=None, label=None):
+    """ Sonucu önbellekten döndür, yoksa veritabanından çekip sakla """
+    return get_query_cache().get_or_load(query, params, lambda: get_data(query, params, label))
+
+# Sayfaya atlama için her BOOKMARK_PAGES sayfada bir anahtar örneklenir
+BOOKMARK_PAGES = 20
+
+def get_page_bookmarks(filter_sql, filter_params, sort_key, descending, stride):
+    """ Sıralı sonuçtaki her ``stride``. satırın sayfa anahtarı """
+    query, params = build_bookmark_query(sort_key, descending, filter_sql, filter_params, stride)
+    df = get_cached_data(query, params, label="page_bookmarks")
+    return [to_page_key(row) for _, row in df.iterrows()]
+
+def to_page_key(row):
+    """ DataFrame satırındaki page_key_* değerlerini psycopg2 parametresine çevir; NULL (NaN) → None """
+    return tuple(None if pd.isna(v) else v.item() if hasattr(v, "item") else v for v in row.filter(like="page_key_"))
+
+# ICD aramasında gösterilecek en fazla seçenek
+SEARCH_LIMIT = 50
+
+def dictionary_values(dimension):
+    """ Filtre sözlüğündeki bir boyutun tüm değerleri (küçük boyutlar için) """
+    return get_cached_data(FILTER_DICTIONARY_VALUES_QUERY, [dimension], label=f"filter:{dimension}")
+
+def dictionary_multiselect(label, dimension, key):
+    """ Sunucu tarafında aranan, sonuçları sınırlı çoklu seçim kutusu.
+
+    Arama kutusu boşken en sık kullanılan değerler listelenir; seçili
+    değerler arama değişse de seçeneklerde kalır.
+    """
+    term = st.sidebar.text_input(f"{label} (ara)", key=f"{key}_search", placeholder="kod veya başlık yazın")
+    pattern = like_pattern(term.strip())
+    matches = get_cached_data(FILTER_DICTIONARY_SEARCH_QUERY, [dimension, pattern, pattern, SEARCH_LIMIT],
+                              label=f"search:{dimension}")
+    labels = st.session_state.setdefault(f"{key}_labels", {})
+    found = []
+    for row in matches.itertuples(index=False):
+        labels[row.value] = f"{row.value} — {row.label} ({row.frequency:,})" if row.label else f"{row.value} ({row.frequency:,})"
+        found.append(row.value)
+    options = list(dict.fromkeys(st.session_state.get(key, []) + found))
+    return st.sidebar.multiselect(label, options, key=key, format_func=lambda value: labels.get(value, value))
+
+def go_to_page(page, anchor=None):
+    """ Buton geri çağrısı: sayfa numarasını ve bilinen başlangıç anahtarını ayarla """
+    st.session_state['page_number'] = page
+    if anchor is not None:
+        st.session_state['page_anchors'][page] = anchor
 
 st.set_page_config(layout="wide")  # Sayfa genişliğini geniş hale getir
 
@@ -38,107 +95,127 @@ st.title("📊 MIMIC-IV Veri Görüntüleyici")
 # Sayfalama (Pagination) seçenekleri
 st.sidebar.header("🔍 Filtre Seçenekleri ve Sayfalama")
 page_size = st.sidebar.slider("Sayfa Boyutu", min_value=10, max_value=100, value=25, step=5)
-if 'page_number' not in st.session_state:
-    st.session_state['page_number'] = 1
-page_number = st.session_state['page_number']
-offset = (page_number - 1) * page_size
 
 # Kullanıcıya sıralama seçenekleri sunma
 sort_options = {
-    "Yaş": "mimiciv_hosp.patients.anchor_age::INTEGER",
-    "Cinsiyet": "mimiciv_hosp.patients.gender",
-    "Kabul Türü": "mimiciv_hosp.admissions.admission_type",
-    "ICD Kodu": "mimiciv_hosp.diagnoses_icd.icd_code"
+    "Yaş": "anchor_age",
+    "Cinsiyet": "gender",
+    "Kabul Türü": "admission_type",
+    "ICD Kodu": "icd_code"
 }
 sort_by = st.sidebar.selectbox("Sıralama Ölçütü Seçin", list(sort_options.keys()))
-sort_column = sort_options[sort_by]
+sort_key = sort_options[sort_by]
 sort_order = st.sidebar.radio("Sıralama Düzeni", ["Artan", "Azalan"])
-sort_order_sql = "ASC" if sort_order == "Artan" else "DESC"
+descending = sort_order == "Azalan"
+
+# Filtre seçenekleri içe aktarımda oluşturulan filtre sözlüğünden gelir
+filter_version = get_cached_data(FILTER_DICTIONARY_VERSION_QUERY, label="filter_version")
+if filter_version.empty:
+    st.warning("Filtre sözlüğü bulunamadı. Önce `python build_filter_dictionary.py` komutunu çalıştırın.")
+    st.stop()
 
-# Filtreleme seçenekleri
-gender_filter = st.sidebar.selectbox("Cinsiyet Seçiniz", ["All"] + get_cached_data("SELECT DISTINCT gender FROM mimiciv_hosp.patients")['gender'].tolist())
-gender_query = "" if gender_filter == "All" else f"AND mimiciv_hosp.patients.gender = '{gender_filter}'"
+gender_filter = st.sidebar.selectbox("Cinsiyet Seçiniz", ["All"] + dictionary_values("gender")['value'].tolist())
 
 # Yaş aralığı filtresi
-default_min_age, default_max_age = get_cached_data("SELECT MIN(anchor_age), MAX(anchor_age) FROM mimiciv_hosp.patients").iloc[0]
+ages = dictionary_values("anchor_age")['value'].astype(int)
+default_min_age, default_max_age = ages.min(), ages.max()
 min_age, max_age = st.sidebar.slider("Yaş Aralığı Seçin", int(default_min_age), int(default_max_age), (int(default_min_age), int(default_max_age)))
-age_query = f"AND patients.anchor_age::INTEGER BETWEEN {min_age} AND {max_age}"
 
-icd_code_options = get_cached_data("SELECT DISTINCT icd_code FROM mimiciv_hosp.diagnoses_icd")['icd_code'].tolist()
-icd_code_filter = st.sidebar.multiselect("ICD Koduyla Filtrele", icd_code_options)
-icd_name_options = get_cached_data("SELECT DISTINCT long_title FROM mimiciv_hosp.d_icd_diagnoses")['long_title'].tolist()
-icd_name_filter = st.sidebar.multiselect("Hastalık İsmiyle Filtrele", icd_name_options)
-
-icd_filter_conditions = []
-if icd_code_filter:
-    icd_filter_conditions.append(f"diagnoses_icd.icd_code IN ({','.join([f'\'{code}\'' for code in icd_code_filter])})")
-if icd_name_filter:
-    icd_filter_conditions.append(f"d_icd_diagnoses.long_title IN ({','.join([f'\'{name}\'' for name in icd_name_filter])})")
-icd_filter_query = " AND ".join(icd_filter_conditions)
-icd_filter_query = f"AND {icd_filter_query}" if icd_filter_query else ""
+icd_code_filter = dictionary_multiselect("ICD Koduyla Filtrele", "icd_code", key="icd_code_filter")
+icd_name_filter = dictionary_multiselect("Hastalık İsmiyle Filtrele", "long_title", key="icd_name_filter")
 
 # Ekstra filtreleme
-admission_types = get_cached_data("SELECT DISTINCT admission_type FROM mimiciv_hosp.admissions")['admission_type'].tolist()
+admission_types = dictionary_values("admission_type")['value'].tolist()
 admission_type_filter = st.sidebar.multiselect("Kabul Türü Seçin", admission_types)
-admission_type_query = f"AND admissions.admission_type IN ({','.join([f'\'{t}\'' for t in admission_type_filter])})" if admission_type_filter else ""
-
-total_count_query = f"""
-    SELECT COUNT(*) FROM mimiciv_hosp.patients
-    LEFT JOIN mimiciv_hosp.admissions ON patients.subject_id = admissions.subject_id
-    LEFT JOIN mimiciv_icu.icustays ON admissions.hadm_id = icustays.hadm_id
-    LEFT JOIN mimiciv_hosp.diagnoses_icd ON admissions.hadm_id = diagnoses_icd.hadm_id
-    LEFT JOIN mimiciv_hosp.d_icd_diagnoses ON diagnoses_icd.icd_code = d_icd_diagnoses.icd_code
-    WHERE patients.anchor_age::INTEGER IS NOT NULL 
-    {gender_query} 
-    {age_query} 
-    {icd_filter_query}
-    {admission_type_query}
-"""
-total_count_df = get_data(total_count_query)
-total_records = total_count_df.iloc[0, 0] if not total_count_df.empty else 0
-
-query = f"""
-    SELECT 
-        row_number() OVER (ORDER BY {sort_column} {sort_order_sql}) AS row_num,
-        patients.subject_id,
-        admissions.hadm_id,
-        patients.gender,
-        patients.anchor_age::INTEGER,
-        admissions.race,
-        admissions.marital_status,
-        patients.dod AS date_of_death,
-        icustays.first_careunit AS first_care_unit,
-        icustays.last_careunit AS last_care_unit,
-        admissions.admission_type,
-        admissions.admission_location,
-        admissions.discharge_location,
-        diagnoses_icd.icd_code,
-        d_icd_diagnoses.long_title
-    FROM mimiciv_hosp.patients
-    LEFT JOIN mimiciv_hosp.admissions ON patients.subject_id = admissions.subject_id AND admissions.admission_type IS NOT NULL
-    LEFT JOIN mimiciv_icu.icustays ON admissions.hadm_id = icustays.hadm_id
-    LEFT JOIN mimiciv_hosp.diagnoses_icd ON admissions.hadm_id = diagnoses_icd.hadm_id AND diagnoses_icd.icd_code IS NOT NULL
-    LEFT JOIN mimiciv_hosp.d_icd_diagnoses ON diagnoses_icd.icd_code = d_icd_diagnoses.icd_code AND d_icd_diagnoses.long_title IS NOT NULL
-    WHERE patients.anchor_age::INTEGER IS NOT NULL 
-    {gender_query} 
-    {age_query} 
-    {icd_filter_query}
-    {admission_type_query}
-    LIMIT {page_size} OFFSET {offset};
-"""
-
-df = get_data(query)
-
-st.write(f"### İlk {page_size} kayıt (Sayfa {page_number} / Toplam {total_records})")
+
+# Filtre değerleri SQL'e gömülmez, parametre olarak gönderilir
+filter_sql, filter_params = build_filter_sql(
+    gender=None if gender_filter == "All" else gender_filter,
+    age_range=(min_age, max_age),
+    icd_codes=icd_code_filter,
+    long_titles=icd_name_filter,
+    admission_types=admission_type_filter,
+)
+
+# Toplam: önce planlayıcı tahmini, kesin COUNT(*) arka planda tamamlanır
+count_service = get_count_service()
+total_records, count_is_exact = count_service.get(filter_sql, filter_params)
+# Kesin sayım sürerken toplam yoklanır; başarısız olduysa yoklama durur
+count_pending = count_service.counting(filter_sql, filter_params)
+
+# Filtre, sıralama veya sayfa boyutu değişince sayfalama baştan başlar.
+# page_anchors: sayfa numarası -> (önceki satırın anahtarı, o anahtardan sonraki atlama)
+pagination_signature = (filter_sql, repr(filter_params), sort_key, descending, page_size)
+if st.session_state.get('pagination_signature') != pagination_signature:
+    st.session_state['pagination_signature'] = pagination_signature
+    st.session_state['page_number'] = 1
+    st.session_state['page_anchors'] = {1: (None, 0)}
+
+# Sayım da tahmin de alınamadıysa toplam ve son sayfa bilinmez (None)
+last_page = max(1, -(-int(total_records) // page_size)) if total_records is not None else None
+# Tahmini toplam gerçek sayıdan küçük olabilir; sayfa yalnızca kesin sayıyla sınırlanır
+page_number = min(st.session_state['page_number'], last_page) if count_is_exact else st.session_state['page_number']
+page_anchors = st.session_state['page_anchors']
+
+if page_number not in page_anchors:
+    # Bilinmeyen sayfa: en yakın örneklenmiş anahtardan en fazla BOOKMARK_PAGES sayfa ilerle
+    stride = page_size * BOOKMARK_PAGES
+    start_row = (page_number - 1) * page_size
+    bookmarks = get_page_bookmarks(filter_sql, filter_params, sort_key, descending, stride)
+    bookmark_index = min(start_row // stride, len(bookmarks))
+    page_anchors[page_number] = (
+        bookmarks[bookmark_index - 1] if bookmark_index else None,
+        start_row - bookmark_index * stride,
+    )
+
+after, skip = page_anchors[page_number]
+query, params = build_page_query(sort_key, descending, filter_sql, filter_params, page_size, after=after, offset=skip)
+df = get_cached_data(query, params, label="page")
+
+next_anchor = None
+if not df.empty:
+    next_anchor = (to_page_key(df.iloc[-1]), 0)
+    # Önbellekteki DataFrame paylaşıldığı için kopyası üzerinde çalışılır
+    df = df.drop(columns=[col for col in df.columns if col.startswith("page_key_")])
+    df.insert(0, "row_num", range((page_number - 1) * page_size + 1, (page_number - 1) * page_size + 1 + len(df)))
+
+if total_records is None:
+    total_label = "bilinmiyor"
+else:
+    total_label = f"{total_records:,}" if count_is_exact else f"≈{total_records:,}"
+st.write(f"### İlk {page_size} kayıt (Sayfa {page_number} / {last_page or '?'}, Toplam {total_label})")
+
+def show_total_count():
+    """ Kesin sayım bitince (başarılı ya da başarısız) sayfayı yeniden çiz """
+    total, exact = count_service.get(filter_sql, filter_params)
+    if count_pending and not count_service.counting(filter_sql, filter_params):
+        st.rerun()
+    if total is None:
+        st.caption("Toplam kayıt sayısı bilinmiyor (kesin sayım ve planlayıcı tahmini alınamadı)")
+    elif not exact and count_pending:
+        st.caption(f"Toplam ≈{total:,} kayıt (planlayıcı tahmini; kesin sayım hesaplanıyor…)")
+    elif not exact:
+        st.caption(f"Toplam ≈{total:,} kayıt (planlayıcı tahmini; kesin sayım başarısız oldu)")
+
+st.fragment(show_total_count, run_every=COUNT_POLL_SECONDS if count_pending else None)()
 st.dataframe(df, height=600)  # Tablo yüksekliği artırıldı
 
 # Sayfanın altına sayfalama ekleme
 col1, col2, col3 = st.columns([1, 4, 1])
 with col2:
-    if st.button("⬅️ Önceki Sayfa") and page_number > 1:
-        st.session_state['page_number'] -= 1
-        page_number -= 1
+    st.button("⬅️ Önceki Sayfa", disabled=page_number <= 1, on_click=go_to_page, args=(page_number - 1,))
     st.write(f"**Sayfa {page_number}**")
-    if st.button("Sonraki Sayfa ➡️"):
-        st.session_state['page_number'] += 1
-        page_number += 1
+    st.button("Sonraki Sayfa ➡️", disabled=next_anchor is None or len(df) < page_size or (count_is_exact and page_number >= last_page),
+              on_click=go_to_page, args=(page_number + 1, next_anchor))
+    target_page = st.number_input("Sayfaya Git", min_value=1, max_value=None if last_page is None else max(last_page, page_number), value=page_number, step=1)
+    st.button("Git", on_click=go_to_page, args=(int(target_page),))
+
+# Önbellek metrikleri ve filtre sözlüğü sürümü
+cache_stats = get_query_cache().stats()
+st.sidebar.markdown("---")
+st.sidebar.caption(f"📚 Filtre sözlüğü sürümü: {filter_version.iloc[0]['version']}")
+st.sidebar.caption(
+    f"🗄️ Önbellek: {cache_stats['hits']} isabet / {cache_stats['misses']} ıska "
+    f"(%{cache_stats['hit_ratio'] * 100:.0f}) · {cache_stats['entries']} kayıt · "
+    f"{cache_stats['bytes'] / 1024 / 1024:.1f} MB · {cache_stats['evictions']} tahliye"
+)
@@ -1,39 +1,59 @@
 import streamlit as st
 import pandas as pd
-import os
 import re
+import numpy as np
 import matplotlib.pyplot as plt
+import plotly.express as px
+
+from aggregates import BUCKET_COLUMN, build_kind_cube, cube_name, downsample, query_cube
+from build_cohort import ensure_cohort, file_signatures
+from complaint_index import ComplaintIndex
+from dataset_registry import REGISTRY, patient_store
+from datasets import base_column, dataset_exists, dataset_path
+from notes_index import NOTE_SOURCES, search_notes, update_notes_index
+from patient_store import DETAIL_SOURCES, ensure_patient_store
+from stay_events import STAY_COLUMNS, StayAligner, event_time_column
 
 # Set page config first
 st.set_page_config(page_title="ED Dashboard", layout="wide")
 st.title("Acil Servis (ED) Verileri")
 
-# Hasta ve tanı verilerini yüklemeden önce boş filtre kutuları oluşturmak için değerleri çekelim
-def load_unique_filters():
-    admissions_df = pd.read_csv("data/admissions.csv") if os.path.exists("data/admissions.csv") else pd.DataFrame()
-    if not admissions_df.empty:
-        return {
-            "admission_type": sorted(admissions_df["admission_type"].dropna().unique().tolist()),
-            "admission_location": sorted(admissions_df["admission_location"].dropna().unique().tolist()),
-            "discharge_location": sorted(admissions_df["discharge_location"].dropna().unique().tolist()),
-        }
-    return {"admission_type": [], "admission_location": [], "discharge_location": []}
+# Birleştirilmiş kohort tablosu (build_cohort.py); sunucu sürecinde bir kez
+# yüklenip tüm oturumlarla paylaşılır (dataset_registry.py), filtreler bu
+# tabloya maske olarak uygulanır
+
+FILTER_COLUMNS = ["long_title", "icd_code", "admission_type", "admission_location", "discharge_location", "disposition"]
+
+def unique_options(df, column):
+    return sorted(df[column].dropna().unique().tolist()) if column in df.columns else []
 
-filter_options = load_unique_filters()
+@st.cache_data
+def load_filter_options(version):
+    cohort_df = REGISTRY.get("cohort")
+    return {
+        column: unique_options(cohort_df, column)
+        for column in FILTER_COLUMNS
+    }
+
+try:
+    ensure_cohort()
+    cohort_df = REGISTRY.get("cohort")
+    filter_options = load_filter_options(REGISTRY.version("cohort"))
+except Exception as e:
+    st.error(f"Kohort tablosu oluşturulamadı: {e}")
+    cohort_df = pd.DataFrame()
+    filter_options = {column: [] for column in FILTER_COLUMNS}
 
 # Filtreler
 st.sidebar.header("Filtreler")
 
-# ICD kodları dropdown için ICD başlıkları yükleniyor
-try:
-    diag_full = pd.read_csv("data/depress_diagnoses.csv")
-    icd_options = sorted(diag_full['long_title'].dropna().unique().tolist()) if 'long_title' in diag_full.columns else []
-    icd_code_options = sorted(diag_full['icd_code'].dropna().unique().tolist()) if 'icd_code' in diag_full.columns else []
-except:
-    icd_options = []
-    icd_code_options = []
-
-chiefcomplaint_filter = st.sidebar.text_input("Hasta Şikayeti ile Filtrele", value="", key="cc_filter", label_visibility="visible")
+icd_options = filter_options["long_title"]
+icd_code_options = filter_options["icd_code"]
+
+chiefcomplaint_filter = st.sidebar.text_input(
+    "Hasta Şikayeti ile Filtrele", value="", key="cc_filter", label_visibility="visible",
+    help="Birden çok kelime birlikte aranır; sonuna * eklenen kelime önek olarak eşleşir (ör. depress*)",
+)
 icd_filter = st.sidebar.multiselect("Tanı Seçin (ICD Açıklaması)", icd_options, key="icd_filter_dropdown")
 icd_code_filter = st.sidebar.multiselect("ICD Kodu Seçin", icd_code_options, key="icd_code_filter_dropdown")
 gender_filter = st.sidebar.selectbox("Cinsiyet Seçin", ("All", "M", "F"), key="gender_filter")
@@ -43,109 +63,145 @@ adm_loc_filter = st.sidebar.selectbox("Başvuru Yeri", ["All"] + filter_options[
 disch_loc_filter = st.sidebar.selectbox("Taburcu Yeri", ["All"] + filter_options["discharge_location"], key="disch_loc")
 
 # Disposition filtrelemesi
-try:
-    edstays_df = pd.read_csv("data/depress_patients.csv")
-    disposition_options = sorted(edstays_df['disposition'].dropna().unique().tolist()) if 'disposition' in edstays_df.columns else []
-except:
-    disposition_options = []
+disposition_options = filter_options["disposition"]
 disposition_filter = st.sidebar.multiselect("Çıkış Durumu (Disposition)", disposition_options, default=disposition_options)
 
-# Ek verileri yükle
-def load_optional_data(filename):
-    return pd.read_csv(filename) if os.path.exists(filename) else pd.DataFrame()
-
-notes_df = load_optional_data("data/depress_notes.csv")
-meds_df = load_optional_data("data/depress_meds.csv")
-medrecon_df = load_optional_data("data/depress_medrecon.csv")
-pyxis_df = load_optional_data("data/depress_pyxis.csv")
-
-# Highlight fonksiyonu
-def highlight_keywords(text):
-    keywords = [
-        "History of Present Illness", "Past Medical History", "Social History",
-        "Physical Exam", "Hospital Course", "Discharge Diagnosis",
-        "Discharge Medications", "Followup Instructions"
-    ]
-    for kw in keywords:
-        pattern = re.compile(rf"(\b{re.escape(kw)}\b)", re.IGNORECASE)
-        text = pattern.sub(r"\n\n### \1\n", text)
-    return text
-
-# Chiefcomplaint filtresi merge sonrası da uygulanmalı
-def apply_post_merge_filter(df):
-    if chiefcomplaint_filter and "chiefcomplaint" in df.columns:
-        filter_term = chiefcomplaint_filter.strip()
-
-        # Build a regex pattern to match the exact term and exclude words that contain the term as part of another word
-        pattern = r'\b' + re.escape(filter_term) + r'\b'  # Match the exact term as a word
-
-        # Apply the filter to find complaints that match the entered term
-        df = df[df["chiefcomplaint"].fillna("").astype(str).str.contains(pattern, case=False, na=False)]
-
-        # Exclude complaints that contain the filter term as part of another word (e.g., "SI" in "depression")
-        df = df[~df["chiefcomplaint"].fillna("").astype(str).str.contains(r'\b' + re.escape(filter_term) + r'\w+', case=False, na=False)]
-
-    return df
-
-
-# Hasta ve tanı verilerini yükle
+# Ek veriler hasta bazlı depolardan (patient_store.py) yalnızca seçilen hasta için okunur
+def patient_rows(name, subject_id):
+    if ensure_patient_store(name) is None:
+        return pd.DataFrame()
+    return patient_store(name).rows(subject_id)
+
+# Hastanın olayları başvurularının [intime, outtime] pencerelerine (pencere
+# dışındakiler yatış kimliğiyle) ikili aramayla atanır (stay_events.py);
+# detaylarda yalnızca seçilen başvurunun olayları gösterilir
+ALIGNED_COLUMNS = ["aligned_stay_id", "aligned_hadm_id", "aligned_by"]
+TIMELINE_SOURCES = {
+    "labs": ("🔬 Laboratuvar", "test_name"),
+    "meds": ("💊 İlaç", "drug"),
+    "medrecon": ("🗂️ İlaç Geçmişi", "name"),
+    "pyxis": ("💉 Pyxis", "medication"),
+    "notes": ("📝 Not", "note_type"),
+}
+
+def patient_stays(subject_id):
+    # Kohortta başvuru sütunları tanılarla birleştirmeden _x ekiyle gelebilir
+    columns = {
+        column: base_column(column) for column in cohort_df.columns
+        if base_column(column) in STAY_COLUMNS and not column.endswith("_y")
+    }
+    stays = cohort_df.loc[(cohort_df["subject_id"] == subject_id).to_numpy(), list(columns)].rename(columns=columns)
+    return stays.drop_duplicates("stay_id").sort_values("intime", ascending=False).reset_index(drop=True)
+
+def stay_rows(name, rows, aligner, stay_id):
+    """Kaynağın satırlarını başvurulara hizala; ``stay_id`` None ise tüm başvurular."""
+    time_column = event_time_column(name, rows.columns)
+    if rows.empty or time_column is None:
+        return rows
+    rows = aligner.align(rows, time_column)
+    if stay_id is not None:
+        rows = rows[(rows["aligned_stay_id"] == stay_id).fillna(False).to_numpy()]
+    return rows.drop(columns=ALIGNED_COLUMNS)
+
+def stay_events(subject_id, aligner, stay_id):
+    """Panel adı → hastanın (seçilen başvuruya ait) satırları."""
+    events = {}
+    for name in DETAIL_SOURCES:
+        try:
+            events[name] = stay_rows(name, patient_rows(name, subject_id), aligner, stay_id)
+        except Exception as e:
+            st.warning(f"{TIMELINE_SOURCES[name][0]} verisi gösterilemedi: {e}")
+            events[name] = pd.DataFrame()
+    return events
+
+def stay_timeline(events):
+    """Kaynakların olaylarını tek bir (Zaman, Kaynak, Ayrıntı) tablosunda topla."""
+    parts = []
+    for name, rows in events.items():
+        time_column = event_time_column(name, rows.columns)
+        if rows.empty or time_column is None:
+            continue
+        label, detail = TIMELINE_SOURCES[name]
+        parts.append(pd.DataFrame({
+            "Zaman": rows[time_column].to_numpy(),
+            "Kaynak": label,
+            "Ayrıntı": rows[detail].astype(str).to_numpy() if detail in rows.columns else "",
+        }))
+    return pd.concat(parts, ignore_index=True).dropna(subset=["Zaman"]) if parts else pd.DataFrame()
+
+# Notlar diskteki FTS5 dizininden aranır (notes_index.py); kaynak dosyalar
+# değişince dizine yalnızca yeni notlar eklenir
+@st.cache_resource(show_spinner="Not dizini güncelleniyor...")
+def refresh_notes_index(source_signatures):
+    update_notes_index()
+
+# Not bölümleri: tüm başlıklar tek bir önceden derlenmiş desenle, tek geçişte bulunur
+SECTION_HEADERS = [
+    "History of Present Illness", "Past Medical History", "Social History",
+    "Physical Exam", "Hospital Course", "Discharge Diagnosis",
+    "Discharge Medications", "Followup Instructions"
+]
+SECTION_PATTERN = re.compile(r"\b(" + "|".join(re.escape(header) for header in SECTION_HEADERS) + r")\b", re.IGNORECASE)
+NOTES_PER_PAGE = 5
+
+def split_sections(text):
+    """Notu (başlık, gövde başlangıcı, gövde bitişi) bölümlerine ayır; ilk başlıktan
+    önceki kısım "Giriş"tir."""
+    sections = []
+    start, title = 0, "Giriş"
+    for match in SECTION_PATTERN.finditer(text):
+        if match.start() > start or sections:
+            sections.append((title, start, match.start()))
+        start, title = match.end(), match.group(1)
+    sections.append((title, start, len(text)))
+    return sections
+
+# Bölüm sınırları not başına bir kez hesaplanır; metin önbellek anahtarına katılmaz
+@st.cache_data(max_entries=5000)
+def note_sections(note_id, _text):
+    return split_sections(_text)
+
+# Şikayet filtresi kohort sürümü başına bir kez kurulan ters dizinle uygulanır
+@st.cache_resource(show_spinner="Şikayet dizini hazırlanıyor...")
+def load_complaint_index(version):
+    return ComplaintIndex(REGISTRY.get("cohort")["chiefcomplaint"])
+
+# Kohort tablosuna filtreleri tek bir boolean maske olarak uygula
 def load_and_filter_data():
     try:
-        patients_df = pd.read_csv("data/depress_patients.csv")
-        diagnoses_df = pd.read_csv("data/depress_diagnoses.csv")
-        base_patients_df = load_optional_data("data/patients.csv")
-        admissions_df = load_optional_data("data/admissions.csv")
-        triage_df = load_optional_data("data/triage.csv")
-
-        if not base_patients_df.empty:
-            base_patients_df = base_patients_df[["subject_id", "anchor_age"]]
-            patients_df = pd.merge(patients_df, base_patients_df, on="subject_id", how="left")
+        if cohort_df.empty:
+            return pd.DataFrame()
 
-        if not admissions_df.empty:
-            admissions_df = admissions_df[["subject_id", "hadm_id", "admission_type", "admission_location", "discharge_location"]]
-            if "hadm_id" in patients_df.columns:
-                patients_df = pd.merge(patients_df, admissions_df, on=["subject_id", "hadm_id"], how="left")
-            else:
-                patients_df = pd.merge(patients_df, admissions_df, on="subject_id", how="left")
+        mask = np.ones(len(cohort_df), dtype=bool)
 
-        if not triage_df.empty and "chiefcomplaint" in triage_df.columns:
-            triage_df = triage_df[["subject_id", "stay_id", "chiefcomplaint"]]
-            patients_df = pd.merge(patients_df, triage_df, on=["subject_id", "stay_id"], how="left")
+        if chiefcomplaint_filter.strip() and "chiefcomplaint" in cohort_df.columns:
+            mask &= load_complaint_index(REGISTRY.version("cohort")).mask(chiefcomplaint_filter)
 
-        if gender_filter != "All" and "gender" in patients_df.columns:
-            patients_df = patients_df[patients_df["gender"] == gender_filter]
+        if gender_filter != "All" and "gender" in cohort_df.columns:
+            mask &= (cohort_df["gender"] == gender_filter).to_numpy()
 
-        if "anchor_age" in patients_df.columns:
-            patients_df["anchor_age"] = pd.to_numeric(patients_df["anchor_age"], errors="coerce")
-            patients_df = patients_df[(patients_df["anchor_age"] >= age_min) & (patients_df["anchor_age"] <= age_max)]
+        if "anchor_age" in cohort_df.columns:
+            mask &= cohort_df["anchor_age"].between(age_min, age_max).to_numpy()
 
-        if adm_type_filter != "All" and "admission_type" in patients_df.columns:
-            patients_df = patients_df[patients_df["admission_type"] == adm_type_filter]
+        if adm_type_filter != "All" and "admission_type" in cohort_df.columns:
+            mask &= (cohort_df["admission_type"] == adm_type_filter).to_numpy()
 
-        if adm_loc_filter != "All" and "admission_location" in patients_df.columns:
-            patients_df = patients_df[patients_df["admission_location"] == adm_loc_filter]
+        if adm_loc_filter != "All" and "admission_location" in cohort_df.columns:
+            mask &= (cohort_df["admission_location"] == adm_loc_filter).to_numpy()
 
-        if disch_loc_filter != "All" and "discharge_location" in patients_df.columns:
-            patients_df = patients_df[patients_df["discharge_location"] == disch_loc_filter]
+        if disch_loc_filter != "All" and "discharge_location" in cohort_df.columns:
+            mask &= (cohort_df["discharge_location"] == disch_loc_filter).to_numpy()
 
         if icd_filter:
-            diagnoses_df = diagnoses_df[diagnoses_df['long_title'].isin(icd_filter)]
+            mask &= cohort_df["long_title"].isin(icd_filter).to_numpy()
 
         if icd_code_filter:
-            diagnoses_df = diagnoses_df[diagnoses_df['icd_code'].isin(icd_code_filter)]
-
-        merge_keys = ["subject_id"]
-        if "hadm_id" in patients_df.columns and "hadm_id" in diagnoses_df.columns:
-            merge_keys.append("hadm_id")
-
-        merged_df = pd.merge(patients_df, diagnoses_df, on=merge_keys, how="inner")
+            mask &= cohort_df["icd_code"].isin(icd_code_filter).to_numpy()
 
-        if 'disposition' in patients_df.columns and disposition_filter:
-            merged_df = merged_df[merged_df['disposition'].isin(disposition_filter)]
+        if "disposition" in cohort_df.columns and disposition_filter:
+            mask &= cohort_df["disposition"].isin(disposition_filter).to_numpy()
 
-        merged_df.drop_duplicates(subset=["subject_id", "hadm_id", "icd_code"], inplace=True)
-
-        return merged_df
+        return cohort_df[mask].drop_duplicates(subset=["subject_id", "hadm_id", "icd_code"])
 
     except Exception as e:
         st.error(f"Veri yükleme/filtreleme hatası: {e}")
@@ -153,7 +209,92 @@ def load_and_filter_data():
 
 # df_summary oluşturulduktan sonra filtre uygulama
 df_summary = load_and_filter_data()
-df_summary = apply_post_merge_filter(df_summary)
+
+# Eğilim grafikleri iki kapsamda çizilir: tüm ED başvuruları prepare_data.py'nin
+# yazdığı gün/hafta/ay küplerinden (aggregates.py), filtrelenmiş kohort ise bellekteki
+# kohort satırlarından aynı küp koduyla; uzun seriler LTTB ile seyreltilir
+TREND_SCOPES = {"Filtrelenmiş kohort": "cohort", "Tüm ED başvuruları": "all"}
+TREND_RESOLUTIONS = {"Gün": "day", "Hafta": "week", "Ay": "month"}
+TREND_GROUPS = {"Yok": None, "Cinsiyet": "gender", "Irk": "race", "Geliş Şekli": "arrival_transport", "Çıkış Durumu": "disposition"}
+TREND_METRICS = {"Ziyaret sayısı": "visits", "Ortalama kalış süresi (saat)": "los_mean"}
+TOP_DIAGNOSES = 15
+
+def cube_filters():
+    """Kenar çubuğundaki filtrelerden küplerde karşılığı olanlar."""
+    filters = {}
+    if gender_filter != "All":
+        filters["gender"] = [gender_filter]
+    if disposition_filter:
+        filters["disposition"] = disposition_filter
+    return filters
+
+def cohort_cubes(df, resolution):
+    """Filtrelenmiş kohort satırlarından (ziyaret küpü, tanı küpü); kohortta başvuru
+    zamanı yoksa (None, None). Her ED başvurusu ziyaret küpünde bir kez sayılır."""
+    stay_column = next((column for column in ("stay_id", "stay_id_x") if column in df.columns), None)
+    if df.empty or stay_column is None or "intime" not in df.columns:
+        return None, None
+    df = df.rename(columns={stay_column: "stay_id"})
+    stays = df.drop_duplicates(subset=["stay_id"])
+    if "outtime" in stays.columns:
+        stays = stays.assign(los_hours=(stays["outtime"] - stays["intime"]).dt.total_seconds() / 3600)
+    else:
+        stays = stays.assign(los_hours=np.nan)
+    diagnoses = build_kind_cube("ed_diagnoses", df, "month") if "icd_code" in df.columns else None
+    return build_kind_cube("ed_stays", stays, resolution), diagnoses
+
+with st.expander("📈 Acil Servis Eğilimleri"):
+    scope_col, resolution_col, group_col, metric_col = st.columns(4)
+    scope = TREND_SCOPES[scope_col.selectbox("Kapsam", list(TREND_SCOPES), key="trend_scope")]
+    resolution = TREND_RESOLUTIONS[resolution_col.selectbox("Çözünürlük", list(TREND_RESOLUTIONS), index=1, key="trend_resolution")]
+    group_column = TREND_GROUPS[group_col.selectbox("Gruplama", list(TREND_GROUPS), key="trend_group")]
+    metric_label = metric_col.selectbox("Ölçü", list(TREND_METRICS), key="trend_metric")
+    metric = TREND_METRICS[metric_label]
+    group_by = [group_column] if group_column else []
+
+    if scope == "all":
+        stays_cube = REGISTRY.get(cube_name("ed_stays", resolution)) if dataset_exists(cube_name("ed_stays", resolution)) else None
+        diagnoses_cube = REGISTRY.get(cube_name("ed_diagnoses", "month")) if dataset_exists(cube_name("ed_diagnoses", "month")) else None
+        trend_filters = cube_filters()
+        if stays_cube is None:
+            st.info("Eğilim küpleri bulunamadı; prepare_data.py çalıştırıldığında oluşturulur.")
+        else:
+            st.caption(
+                "Kohort değil, tüm ED başvuruları gösterilir. Kenar çubuğundan yalnızca cinsiyet ve çıkış "
+                "durumu uygulanır; şikâyet, tanı, ICD kodu, yaş ve kabul filtreleri bu grafiklere yansımaz."
+            )
+    else:
+        stays_cube, diagnoses_cube = cohort_cubes(df_summary, resolution)
+        # Kohort satırları kenar çubuğundaki tüm filtrelerle zaten daraltılmıştır
+        trend_filters = {}
+        if stays_cube is None:
+            st.info("Filtrelerle eşleşen, başvuru zamanı bilinen kohort kaydı yok.")
+        else:
+            st.caption(f"Kenar çubuğundaki tüm filtrelerle daraltılmış kohort: {int(stays_cube['visits'].sum()):,} ED başvurusu.")
+
+    if stays_cube is not None:
+        series = query_cube(stays_cube, group_by, trend_filters)
+        if metric == "los_mean":
+            series["los_mean"] = series["los_hours_sum"] / series["los_count"].where(series["los_count"] > 0)
+        series = downsample(series.dropna(subset=[metric]), BUCKET_COLUMN, metric, group_by)
+        st.plotly_chart(
+            px.line(series, x=BUCKET_COLUMN, y=metric, color=group_column, labels={BUCKET_COLUMN: "Tarih", metric: metric_label}),
+            use_container_width=True,
+        )
+
+    if stays_cube is not None and diagnoses_cube is not None:
+        diagnoses = query_cube(diagnoses_cube, ["icd_code", "long_title"], trend_filters)
+        top_diagnoses = (
+            diagnoses.groupby(["icd_code", "long_title"], observed=True)["diagnoses"].sum()
+            .nlargest(TOP_DIAGNOSES).reset_index().sort_values("diagnoses")
+        )
+        scope_title = "filtrelenmiş kohort" if scope == "cohort" else "tüm ED başvuruları"
+        st.plotly_chart(
+            px.bar(top_diagnoses, x="diagnoses", y="long_title", orientation="h", hover_data=["icd_code"],
+                   labels={"diagnoses": "Tanı sayısı", "long_title": "Tanı"},
+                   title=f"En sık {TOP_DIAGNOSES} tanı ({scope_title})"),
+            use_container_width=True,
+        )
 
 if not df_summary.empty:
     st.subheader("📋 Major Depresif Hasta Özeti")
@@ -163,6 +304,18 @@ if not df_summary.empty:
     unique_patients = df_summary['subject_id'].nunique()
     st.write(f"Toplam sonuç sayısı: {total_rows:,} | Toplam hasta sayısı: {unique_patients:,}")
 
+    note_paths = [dataset_path(dataset) for dataset in NOTE_SOURCES]
+    refresh_notes_index(repr(file_signatures({path: path for path in note_paths})))
+    cohort_search_query = st.text_input(
+        "🔎 Tüm Hastaların Notlarında Ara", value="", key="cohort_note_search",
+        placeholder='örneğin: "suicidal ideation" AND NOT alcohol',
+    )
+    if cohort_search_query:
+        note_hits = search_notes(cohort_search_query)
+        st.caption(f"En iyi {len(note_hits)} eşleşme (bm25 sırasıyla)")
+        for hit in note_hits.itertuples(index=False):
+            st.markdown(f"**{hit.note_id}** · Hasta {hit.subject_id} · {hit.charttime} · {hit.note_type}  \n{hit.snippet}")
+
     selected_row = st.selectbox("Detayını görüntülemek istediğiniz hastayı seçin:", df_summary["subject_id"].unique())
     hasta_detay = df_summary[df_summary["subject_id"] == selected_row]
 
@@ -179,9 +332,31 @@ if not df_summary.empty:
             </div>
             """, unsafe_allow_html=True)
 
+        hasta_stays = patient_stays(selected_row)
+        stay_labels = {
+            f"Başvuru {stay.stay_id} · {stay.intime:%Y-%m-%d %H:%M} → {stay.outtime:%Y-%m-%d %H:%M}"
+            if pd.notna(stay.intime) and pd.notna(stay.outtime) else f"Başvuru {stay.stay_id}": stay.stay_id
+            for stay in hasta_stays.itertuples(index=False)
+        }
+        selected_stay_label = st.selectbox(
+            "🏥 Başvuru", list(stay_labels) + ["Tüm başvurular"], key=f"stay_{selected_row}",
+            help="Olaylar başvurunun giriş-çıkış aralığına, aralık dışındakiler yatış kimliğiyle atanır",
+        )
+        selected_stay = stay_labels.get(selected_stay_label)
+        hasta_events = stay_events(selected_row, StayAligner(hasta_stays), selected_stay)
+
+        timeline = stay_timeline(hasta_events)
+        if not timeline.empty:
+            st.markdown("### 🕒 Başvuru Zaman Çizelgesi")
+            fig = px.scatter(timeline, x="Zaman", y="Kaynak", color="Kaynak", hover_data=["Ayrıntı"])
+            shown_stays = hasta_stays if selected_stay is None else hasta_stays[hasta_stays["stay_id"] == selected_stay]
+            for stay in shown_stays.dropna(subset=["intime", "outtime"]).itertuples(index=False):
+                fig.add_vrect(x0=stay.intime, x1=stay.outtime, fillcolor="LightSalmon", opacity=0.2, line_width=0)
+            fig.update_layout(showlegend=False)
+            st.plotly_chart(fig, use_container_width=True)
+
         try:
-            labs_df = load_optional_data("data/depress_labs.csv")
-            hasta_labs = labs_df[labs_df['subject_id'] == selected_row]
+            hasta_labs = hasta_events["labs"]
             if not hasta_labs.empty:
                 st.markdown("### 🔬 Laboratuvar Sonuçları")
                 st.dataframe(
@@ -195,17 +370,17 @@ if not df_summary.empty:
         except Exception as e:
             st.warning(f"Laboratuvar verisi gösterilemedi: {e}")
 
-        hasta_meds = meds_df[meds_df['subject_id'] == selected_row] if 'subject_id' in meds_df.columns else pd.DataFrame()
+        hasta_meds = hasta_events["meds"]
         if not hasta_meds.empty:
             st.markdown("### 💊 Kullanılan İlaçlar")
             st.dataframe(hasta_meds, use_container_width=True)
 
-        hasta_medrec = medrecon_df[medrecon_df['subject_id'] == selected_row] if 'subject_id' in medrecon_df.columns else pd.DataFrame()
+        hasta_medrec = hasta_events["medrecon"]
         if not hasta_medrec.empty:
             st.markdown("### 🗂️ İlaç Geçmişi (Medication Reconciliation)")
             st.dataframe(hasta_medrec, use_container_width=True)
 
-        hasta_pyxis = pyxis_df[pyxis_df['subject_id'] == selected_row] if 'subject_id' in pyxis_df.columns else pd.DataFrame()
+        hasta_pyxis = hasta_events["pyxis"]
         if not hasta_pyxis.empty:
             st.markdown("### 💉 Acil Serviste Verilen İlaçlar (Pyxis)")
             st.dataframe(
@@ -216,18 +391,35 @@ if not df_summary.empty:
                 use_container_width=True
             )
 
-        hasta_notes = notes_df[notes_df['subject_id'] == selected_row]
+        hasta_notes = hasta_events["notes"]
 
         note_search_query = st.text_input("🔍 Klinik Notlarda Ara", value="", placeholder="örneğin: chest pain, discharge plan...")
-        if note_search_query:
-            hasta_notes = hasta_notes[hasta_notes['text'].str.contains(note_search_query, case=False, na=False)]
+        if note_search_query and 'note_id' in hasta_notes.columns:
+            note_hits = search_notes(note_search_query, subject_id=selected_row, limit=max(len(hasta_notes), 1))
+            hasta_notes = hasta_notes[hasta_notes['note_id'].isin(note_hits['note_id'])]
 
         if not hasta_notes.empty:
             st.markdown("### 📝 Klinik Notlar")
-            for _, note in hasta_notes.iterrows():
-                formatted_note = highlight_keywords(note['text'])
-                st.markdown(f"<div style='white-space: pre-wrap; font-family: monospace; background-color: #f4f4f4; padding: 10px; border-radius: 5px;'>\n<b>Zaman:</b> {note['charttime']}<br><b>Not Tipi:</b> {note['note_type']}<br><b>Yatış ID:</b> {note.get('hadm_id', '-')}</div>", unsafe_allow_html=True)
-                st.markdown(f"<div style='white-space: pre-wrap; font-family: monospace; background-color: #fdfdfd; padding: 10px; border-radius: 5px;'>{formatted_note}</div>", unsafe_allow_html=True)
+            page_count = (len(hasta_notes) - 1) // NOTES_PER_PAGE + 1
+            notes_page = st.number_input(
+                f"Not sayfası (toplam {len(hasta_notes)} not)", min_value=1, max_value=page_count, value=1,
+                key=f"notes_page_{selected_row}_{selected_stay}",
+            )
+            page_start = (notes_page - 1) * NOTES_PER_PAGE
+            for note in hasta_notes.iloc[page_start:page_start + NOTES_PER_PAGE].itertuples(index=False):
+                text = note.text if isinstance(note.text, str) else ""
+                sections = note_sections(note.note_id, text)
+                st.markdown(f"<div style='white-space: pre-wrap; font-family: monospace; background-color: #f4f4f4; padding: 10px; border-radius: 5px;'>\n<b>Zaman:</b> {note.charttime}<br><b>Not Tipi:</b> {note.note_type}<br><b>Yatış ID:</b> {getattr(note, 'hadm_id', '-')}</div>", unsafe_allow_html=True)
+                # Bölüm gövdeleri yalnızca seçildiğinde gönderilir
+                labels = [f"{i + 1}. {title}" for i, (title, _, _) in enumerate(sections)]
+                selected_sections = st.pills("Bölümler", labels, selection_mode="multi", key=f"note_sections_{note.note_id}")
+                for label, (title, start, end) in zip(labels, sections):
+                    if label in selected_sections:
+                        st.markdown(f"#### {title}")
+                        st.markdown(f"<div style='white-space: pre-wrap; font-family: monospace; background-color: #fdfdfd; padding: 10px; border-radius: 5px;'>{text[start:end]}</div>", unsafe_allow_html=True)
                 st.markdown("---")
 else:
-    st.warning("Major Depresif tanısı almış hasta bulunamadı.")
\ No newline at end of file
+    st.warning("Major Depresif tanısı almış hasta bulunamadı.")
+# Süreç genelindeki veri kümesi kaydının durumu (tüm oturumlar için ortak)
+with st.sidebar.expander("📦 Veri Kümesi Önbelleği"):
+    st.dataframe(REGISTRY.stats(), use_container_width=True)
@@ -0,0 +1,172 @@
+"""Sorgu sonucu önbelleği: TTL, bayt sınırlı LRU tahliyesi, isteğe bağlı disk
+kalıcılığı ve tablo yeniden yüklendiğinde geçersiz kılma."""
+import hashlib
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+QUERY_CACHE_MAX_MB = int(os.getenv("QUERY_CACHE_MAX_MB", "256"))
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "600"))
+# Boş bırakılırsa sonuçlar yalnızca bellekte tutulur
+QUERY_CACHE_DIR = os.getenv("QUERY_CACHE_DIR", "")
+# importcsv.py bir tabloyu yeniden yüklediğinde buradaki damga dosyasına dokunur
+INVALIDATION_DIR = os.getenv("QUERY_CACHE_INVALIDATION_DIR", os.path.join(".cache", "invalidation"))
+
+TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*\.[A-Za-z_]\w*)", re.IGNORECASE)
+
+def normalize_query(query):
+    """Boşluk farkları aynı önbellek anahtarını üretsin."""
+    return " ".join(query.split())
+
+def referenced_tables(query):
+    return sorted({table.lower() for table in TABLE_PATTERN.findall(query)})
+
+def invalidate_tables(tables, invalidation_dir=INVALIDATION_DIR):
+    """Verilen tabloları okuyan önbellek kayıtlarını tüm süreçlerde geçersiz kıl."""
+    os.makedirs(invalidation_dir, exist_ok=True)
+    for table in tables:
+        stamp_path = os.path.join(invalidation_dir, table.lower())
+        with open(stamp_path, "a", encoding="utf-8"):
+            pass
+        os.utime(stamp_path)
+
+def _table_stamp(table, invalidation_dir):
+    try:
+        return os.path.getmtime(os.path.join(invalidation_dir, table))
+    except OSError:
+        return 0.0
+
+class CacheEntry:
+    __slots__ = ("value", "nbytes", "created", "tables")
+
+    def __init__(self, value, nbytes, created, tables):
+        self.value = value
+        self.nbytes = nbytes
+        self.created = created
+        self.tables = tables
+
+class QueryCache:
+    """Normalize edilmiş sorgu + parametre anahtarlı, iş parçacığı güvenli önbellek."""
+
+    def __init__(self, max_bytes=QUERY_CACHE_MAX_MB * 1024 * 1024, ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+                 disk_dir=QUERY_CACHE_DIR, invalidation_dir=INVALIDATION_DIR):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.invalidation_dir = invalidation_dir
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(query, params=None):
+        payload = normalize_query(query) + "\x00" + repr(params or [])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _is_fresh(self, entry):
+        if time.time() - entry.created > self.ttl_seconds:
+            return False
+        return all(_table_stamp(table, self.invalidation_dir) < entry.created for table in entry.tables)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _load_from_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if not self._is_fresh(entry):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Başka bir süreç/iş parçacığı aynı eski kaydı zaten silmiş olabilir
+                pass
+            return None
+        return entry
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry.nbytes
+
+    def get(self, key):
+        """Taze kayıt varsa değerini, yoksa None döndür."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not self._is_fresh(entry):
+                self._remove(key)
+                entry = None
+            if entry is None and self.disk_dir:
+                entry = self._load_from_disk(key)
+                if entry is not None:
+                    self._store(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def _store(self, key, entry):
+        if key in self.entries:
+            self._remove(key)
+        if entry.nbytes > self.max_bytes:
+            return
+        self.entries[key] = entry
+        self.total_bytes += entry.nbytes
+        while self.total_bytes > self.max_bytes:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def put(self, key, df, query):
+        """DataFrame sonucunu sakla; boyutu bellek sınırına sayılır."""
+        entry = CacheEntry(df, int(df.memory_usage(deep=True).sum()), time.time(), referenced_tables(query))
+        with self.lock:
+            self._store(key, entry)
+        if self.disk_dir:
+            # Eşzamanlı put çağrıları birbirinin geçici dosyasını ezmesin diye benzersiz ad
+            fd, tmp_path = tempfile.mkstemp(prefix=f"{key}.", suffix=".pkl.tmp", dir=self.disk_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._disk_path(key))
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except FileNotFoundError:
+                    pass
+                raise
+
+    def get_or_load(self, query, params, loader):
+        """Önbellekte yoksa ``loader()`` ile yükleyip sakla."""
+        key = self.make_key(query, params)
+        df = self.get(key)
+        if df is None:
+            df = loader()
+            if not df.empty:
+                self.put(key, df, query)
+        return df
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+            }
@@ -0,0 +1,110 @@
+"""Filtrelenmiş sonuç kümesi için toplam sayı servisi: önce planlayıcı tahmini,
+kesin COUNT(*) arka planda hesaplanıp filtre kombinasyonu başına önbelleğe alınır."""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.db import COUNT_WORKERS, query_df
+from backend.queries import build_count_query, build_estimate_query
+
+# Başarısız (ör. statement_timeout) kesin sayım bu süre (saniye) yeniden denenmez
+COUNT_RETRY_SECONDS = int(os.getenv("COUNT_RETRY_SECONDS", "600"))
+
+logger = logging.getLogger("mimic.counts")
+
+def plan_rows(plan_df):
+    """EXPLAIN (FORMAT JSON) çıktısındaki kök düğümün satır tahmini."""
+    plan = plan_df.iloc[0, 0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+class CountService:
+    """Tahmini sayıyı hemen döndürür, kesin sayımı arka planda tamamlar."""
+
+    def __init__(self, cache, pool, workers=COUNT_WORKERS):
+        self.cache = cache
+        self.pool = pool
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exact-count")
+        self.pending = {}
+        # anahtar -> başarısız kesin sayımın zamanı (time.monotonic)
+        self.failed = {}
+        self.lock = threading.Lock()
+
+    def _run_exact(self, key, query, params):
+        try:
+            df = query_df(query, params, label="exact_count", pool=self.pool)
+            self.cache.put(key, df, query)
+            return df
+        except Exception:
+            logger.exception("exact count failed, not retried for %d s", COUNT_RETRY_SECONDS)
+            with self.lock:
+                self.failed[key] = time.monotonic()
+            return None
+
+    def _recently_failed(self, key):
+        with self.lock:
+            failed_at = self.failed.get(key)
+            if failed_at is None:
+                return False
+            if time.monotonic() - failed_at < COUNT_RETRY_SECONDS:
+                return True
+            del self.failed[key]
+            return False
+
+    def _finish_exact(self, key, future):
+        with self.lock:
+            if self.pending.get(key) is future:
+                del self.pending[key]
+
+    def _start_exact(self, key, query, params):
+        """Aynı anahtar için kuyrukta bekleyen sayım varsa onun future'ını döndür."""
+        with self.lock:
+            future = self.pending.get(key)
+            if future is not None:
+                return future
+            future = self.executor.submit(self._run_exact, key, query, params)
+            self.pending[key] = future
+        future.add_done_callback(lambda done: self._finish_exact(key, done))
+        return future
+
+    def estimate(self, filter_sql, filter_params):
+        query, params = build_estimate_query(filter_sql, filter_params)
+        plan_df = self.cache.get_or_load(
+            query, params,
+            lambda: query_df(query, params, label="count_estimate", prepare=False, pool=self.pool),
+        )
+        return plan_rows(plan_df)
+
+    def counting(self, filter_sql, filter_params):
+        """Bu filtre için kesin sayım kuyrukta ya da çalışıyor mu (arayüz buna göre yoklar)."""
+        query, params = build_count_query(filter_sql, filter_params)
+        key = self.cache.make_key(query, params)
+        with self.lock:
+            return key in self.pending
+
+    def get(self, filter_sql, filter_params):
+        """(sayı, kesin_mi): kesin sayım önbellekteyse o, değilse planlayıcı tahmini.
+
+        Kesin sayım yakın zamanda başarısız olduysa COUNT_RETRY_SECONDS boyunca
+        yeniden başlatılmaz; tahmin de alınamazsa toplam bilinmez: (None, False).
+        """
+        query, params = build_count_query(filter_sql, filter_params)
+        key = self.cache.make_key(query, params)
+        exact_df = self.cache.get(key)
+        if exact_df is not None:
+            return int(exact_df.iloc[0, 0]), True
+
+        future = None if self._recently_failed(key) else self._start_exact(key, query, params)
+        try:
+            return self.estimate(filter_sql, filter_params), False
+        except Exception:
+            logger.exception("count estimate failed")
+            if future is None:
+                return None, False
+            # Aynı sayımı ikinci kez çalıştırmak yerine kuyruktakini bekle
+            exact_df = future.result()
+            return (int(exact_df.iloc[0, 0]), True) if exact_df is not None else (None, False)
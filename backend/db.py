@@ -0,0 +1,130 @@
+"""PostgreSQL erişim katmanı: süreç genelinde bağlantı havuzu, sunucu tarafında
+hazırlanmış parametreli sorgular, sorgu zaman aşımı ve gecikme kaydı."""
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import streamlit as st
+from dotenv import load_dotenv
+
+# .env dosyasından veritabanı bilgilerini yükle
+load_dotenv()
+DB_CONFIG = {
+    "dbname": os.getenv("DB_NAME", "mimic"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "password"),
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": os.getenv("DB_PORT", "5432")
+}
+
+POOL_MIN_CONN = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX_CONN = int(os.getenv("DB_POOL_MAX", "8"))
+# Arka planda kesin COUNT(*) çalıştıran iş parçacıkları (backend/counts.py);
+# havuz bunlar için ayrıca yer ayırır, sayfa sorguları POOL_MAX_CONN'u paylaşır
+COUNT_WORKERS = int(os.getenv("COUNT_WORKERS", "2"))
+# Havuz doluyken boşalacak bağlantının en fazla beklenme süresi (saniye)
+POOL_WAIT_SECONDS = float(os.getenv("DB_POOL_WAIT_SECONDS", "30"))
+STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+# Bir bağlantıda tutulacak en fazla hazırlanmış ifade; aşılınca hepsi silinir
+MAX_PREPARED_PER_CONN = 256
+
+logger = logging.getLogger("mimic.db")
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """Hangi ifadelerin bu oturumda PREPARE edildiğini hatırlayan bağlantı."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+class BoundedConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """Dolduğunda hemen PoolError vermek yerine boşalan bağlantıyı bekleyen havuz.
+
+    Bağlantı alma, havuz boyutundaki bir semaforla sınırlanır; ``timeout``
+    saniye içinde yer açılmazsa PoolError yükseltilir.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=POOL_WAIT_SECONDS, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.slots = threading.BoundedSemaphore(maxconn)
+        self.timeout = timeout
+
+    def getconn(self, key=None):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise psycopg2.pool.PoolError(f"{self.timeout:g} sn içinde boş veritabanı bağlantısı bulunamadı")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self.slots.release()
+
+@st.cache_resource
+def get_pool():
+    """Tüm Streamlit oturumlarının paylaştığı bağlantı havuzu."""
+    return BoundedConnectionPool(
+        POOL_MIN_CONN,
+        POOL_MAX_CONN + COUNT_WORKERS,
+        connection_factory=PreparingConnection,
+        options=f"-c statement_timeout={STATEMENT_TIMEOUT_MS}",
+        **DB_CONFIG,
+    )
+
+def _to_positional(query):
+    """psycopg2 %s yer tutucularını PREPARE için $1, $2, ... biçimine çevir."""
+    counter = iter(range(1, query.count("%s") + 1))
+    return re.sub(r"%s", lambda _: f"${next(counter)}", query)
+
+def _execute_prepared(cursor, query, params):
+    """Sorguyu bağlantıda bir kez PREPARE et, sonra EXECUTE ile çalıştır."""
+    conn = cursor.connection
+    name = "q_" + hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+    if name not in conn.prepared:
+        if len(conn.prepared) >= MAX_PREPARED_PER_CONN:
+            cursor.execute("DEALLOCATE ALL;")
+            conn.prepared.clear()
+        positional = _to_positional(query.strip().rstrip(";"))
+        cursor.execute(f"PREPARE {name} AS {positional}")
+        conn.prepared.add(name)
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+def query_df(query, params=None, label=None, prepare=True, pool=None):
+    """Parametreli sorguyu havuzdan alınan bağlantıda çalıştırıp DataFrame döndür.
+
+    Süre ``mimic.db`` logger'ına yazılır; hata durumunda istisna yükseltilir.
+    Arka plan iş parçacıkları Streamlit bağlamı dışında olduğundan havuzu
+    ``pool`` ile kendileri verir.
+    """
+    pool = pool or get_pool()
+    conn = pool.getconn()
+    conn.autocommit = True
+    label = label or " ".join(query.split())[:60]
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            if prepare:
+                _execute_prepared(cursor, query, params or [])
+            else:
+                cursor.execute(query, params or None)
+            columns = [col[0] for col in cursor.description]
+            df = pd.DataFrame(cursor.fetchall(), columns=columns)
+    finally:
+        logger.info("%s: %.1f ms", label, (time.perf_counter() - started) * 1000)
+        # Kopan bağlantılar havuza geri konmaz, kapatılır
+        pool.putconn(conn, close=bool(conn.closed))
+    return df
@@ -0,0 +1,204 @@
+"""SQL used by the MIMIC-IV viewer (app.py), shared with the import tooling."""
+
+# Hasta → yatış → yoğun bakım → tanı → ICD tanımı zinciri
+PATIENT_JOIN = """
+    FROM mimiciv_hosp.patients
+    LEFT JOIN mimiciv_hosp.admissions ON patients.subject_id = admissions.subject_id AND admissions.admission_type IS NOT NULL
+    LEFT JOIN mimiciv_icu.icustays ON admissions.hadm_id = icustays.hadm_id
+    LEFT JOIN mimiciv_hosp.diagnoses_icd ON admissions.hadm_id = diagnoses_icd.hadm_id AND diagnoses_icd.icd_code IS NOT NULL
+    LEFT JOIN mimiciv_hosp.d_icd_diagnoses ON diagnoses_icd.icd_code = d_icd_diagnoses.icd_code AND d_icd_diagnoses.long_title IS NOT NULL
+"""
+
+PAGE_COLUMNS = """
+        patients.subject_id,
+        admissions.hadm_id,
+        patients.gender,
+        patients.anchor_age,
+        admissions.race,
+        admissions.marital_status,
+        patients.dod AS date_of_death,
+        icustays.first_careunit AS first_care_unit,
+        icustays.last_careunit AS last_care_unit,
+        admissions.admission_type,
+        admissions.admission_location,
+        admissions.discharge_location,
+        diagnoses_icd.icd_code,
+        d_icd_diagnoses.long_title
+"""
+
+# Kenar çubuğu filtreleri içe aktarımda oluşturulan sözlükten okunur
+# (build_filter_dictionary.py); tam listeler tarayıcıya gönderilmez.
+FILTER_DICTIONARY_VALUES_QUERY = """
+    SELECT value, label, frequency FROM mimiciv_meta.filter_dictionary
+    WHERE dimension = %s
+    ORDER BY frequency DESC, value
+"""
+
+FILTER_DICTIONARY_SEARCH_QUERY = """
+    SELECT value, label, frequency FROM mimiciv_meta.filter_dictionary
+    WHERE dimension = %s AND (value ILIKE %s OR label ILIKE %s)
+    ORDER BY frequency DESC, value
+    LIMIT %s
+"""
+
+FILTER_DICTIONARY_VERSION_QUERY = "SELECT version, built_at FROM mimiciv_meta.filter_dictionary_version"
+
+def like_pattern(term):
+    """Kullanıcı metnini ILIKE için kaçışlı bir 'içerir' desenine çevir."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+def build_filter_sql(gender=None, age_range=None, icd_codes=(), long_titles=(), admission_types=()):
+    """Kenar çubuğu filtrelerinden WHERE parçası ve parametreleri.
+
+    Değerler SQL'e gömülmez, %s yer tutucularıyla gönderilir; böylece aynı
+    sorgu şekli için Postgres planı yeniden kullanılabilir.
+    """
+    conditions, params = [], []
+    if gender:
+        conditions.append("patients.gender = %s")
+        params.append(gender)
+    if age_range:
+        conditions.append("patients.anchor_age BETWEEN %s AND %s")
+        params.extend(age_range)
+    if icd_codes:
+        conditions.append("diagnoses_icd.icd_code = ANY(%s)")
+        params.append(list(icd_codes))
+    if long_titles:
+        conditions.append("d_icd_diagnoses.long_title = ANY(%s)")
+        params.append(list(long_titles))
+    if admission_types:
+        conditions.append("admissions.admission_type = ANY(%s)")
+        params.append(list(admission_types))
+    return "".join(f"\n    AND {condition}" for condition in conditions), params
+
+def build_count_query(filter_sql="", filter_params=()):
+    """Filtrelenmiş birleşik sonuç kümesinin toplam satır sayısı."""
+    query = f"""
+    SELECT COUNT(*)
+    {PATIENT_JOIN}
+    WHERE patients.anchor_age IS NOT NULL
+    {filter_sql}
+"""
+    return query, list(filter_params)
+
+def build_estimate_query(filter_sql="", filter_params=()):
+    """Planlayıcının satır tahmini; sorgu çalıştırılmaz, yalnızca EXPLAIN edilir."""
+    query = f"""
+    EXPLAIN (FORMAT JSON)
+    SELECT 1
+    {PATIENT_JOIN}
+    WHERE patients.anchor_age IS NOT NULL
+    {filter_sql}
+"""
+    return query, list(filter_params)
+
+# Sıralama ölçütleri ve eşit değerleri ayıran anahtarlar düz sütunlardır; NULL
+# değerler her iki yönde en büyük değer sayılır (ASC NULLS LAST, DESC NULLS FIRST),
+# böylece btree indeksleri ileri ya da geri taranarak sıralamayı verebilir.
+SORT_KEYS = {
+    "anchor_age": "patients.anchor_age",
+    "gender": "patients.gender",
+    "admission_type": "admissions.admission_type",
+    "icd_code": "diagnoses_icd.icd_code",
+}
+
+# Birleşik satırı tekil yapan, eşit sıralama değerlerini ayıran anahtarlar
+TIEBREAK_KEYS = [
+    "patients.subject_id",
+    "admissions.hadm_id",
+    "icustays.stay_id",
+    "diagnoses_icd.seq_num",
+    "diagnoses_icd.icd_code",
+]
+
+# Birleşim hastalardan başlar; bu ölçütlerde (ölçüt, subject_id) indeksi sıralamayı
+# verir ve önceki sayfanın anahtarı indeks aralığına çevrilir (provision_indexes.py).
+# Değer: sütun NULL olabilir mi (anchor_age WHERE ile NULL dışı tutulur)
+INDEXED_SORT_KEYS = {
+    "anchor_age": False,
+    "gender": True,
+}
+
+def page_keys(sort_key):
+    return [SORT_KEYS[sort_key]] + TIEBREAK_KEYS
+
+def order_by_sql(keys, descending=False):
+    direction = "DESC NULLS FIRST" if descending else "ASC NULLS LAST"
+    return ", ".join(f"{key} {direction}" for key in keys)
+
+def seek_condition(keys, after, descending=False):
+    """Sıralamada ``after`` anahtarından sonra gelen satırlar için koşul ve parametreler.
+
+    Satır karşılaştırması NULL ile çalışmadığından koşul sütun sütun açılır;
+    NULL anahtar değerleri parametre yerine ``IS NULL`` dallarıyla yazılır.
+    """
+    key, value = keys[0], after[0]
+    if value is None:
+        later, later_params = (f"{key} IS NOT NULL" if descending else "FALSE"), []
+        equal, equal_params = f"{key} IS NULL", []
+    else:
+        later = f"{key} < %s" if descending else f"({key} > %s OR {key} IS NULL)"
+        later_params = [value]
+        equal, equal_params = f"{key} = %s", [value]
+    if len(keys) == 1:
+        return later, later_params
+    rest, rest_params = seek_condition(keys[1:], after[1:], descending)
+    return f"({later} OR ({equal} AND {rest}))", later_params + equal_params + rest_params
+
+def index_seek_condition(sort_key, after, descending=False):
+    """``seek_condition`` ile aynı satırları kapsayan, indekste aralık olarak
+    kullanılabilen (ölçüt, subject_id) koşulu; kullanılamıyorsa boş."""
+    if sort_key not in INDEXED_SORT_KEYS or after[0] is None:
+        return "", []
+    condition = f"({SORT_KEYS[sort_key]}, patients.subject_id) {'<=' if descending else '>='} (%s, %s)"
+    if INDEXED_SORT_KEYS[sort_key] and not descending:
+        # Artan sırada NULL değerler sona, yani anahtardan sonraya düşer
+        condition = f"({condition} OR {SORT_KEYS[sort_key]} IS NULL)"
+    return f"AND {condition}", [after[0], after[1]]
+
+def build_page_query(sort_key, descending=False, filter_sql="", filter_params=(), page_size=25, after=None, offset=0):
+    """Keyset (seek) sayfalama: ``after`` önceki sayfanın son satırının anahtarıdır.
+
+    Sorgu ve parametre listesini döndürür. Sonuçtaki ``page_key_*`` sütunları
+    bir sonraki sayfanın ``after`` değeri için kullanılır.
+    """
+    keys = page_keys(sort_key)
+    seek_sql = ""
+    params = list(filter_params)
+    if after is not None:
+        index_sql, index_params = index_seek_condition(sort_key, after, descending)
+        condition, condition_params = seek_condition(keys, after, descending)
+        seek_sql = f"{index_sql}\n    AND {condition}"
+        params.extend(index_params + condition_params)
+    key_columns = ",\n        ".join(f"{key} AS page_key_{i}" for i, key in enumerate(keys))
+    query = f"""
+    SELECT
+        {PAGE_COLUMNS.strip()},
+        {key_columns}
+    {PATIENT_JOIN}
+    WHERE patients.anchor_age IS NOT NULL
+    {filter_sql}
+    {seek_sql}
+    ORDER BY {order_by_sql(keys, descending)}
+    LIMIT %s OFFSET %s;
+"""
+    return query, params + [int(page_size), int(offset)]
+
+def build_bookmark_query(sort_key, descending=False, filter_sql="", filter_params=(), stride=500):
+    """Sıralı sonuçta her ``stride``. satırın anahtarı; sayfaya atlama bunlardan başlar."""
+    keys = page_keys(sort_key)
+    key_columns = ", ".join(f"{key} AS page_key_{i}" for i, key in enumerate(keys))
+    query = f"""
+    SELECT {', '.join(f"page_key_{i}" for i in range(len(keys)))}
+    FROM (
+        SELECT {key_columns},
+               row_number() OVER (ORDER BY {order_by_sql(keys, descending)}) AS rn
+        {PATIENT_JOIN}
+        WHERE patients.anchor_age IS NOT NULL
+        {filter_sql}
+    ) AS ordered
+    WHERE mod(rn, %s) = 0
+    ORDER BY rn;
+"""
+    return query, list(filter_params) + [int(stride)]
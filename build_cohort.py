@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+from datasets import compact_frame, dataset_columns, dataset_exists, dataset_path, frame_memory, memory_report, read_dataset
+
+# ED paneli (app_ed.py) için birleştirilmiş, tipleri belirlenmiş kohort tablosu.
+# Girdi dosyalarının içerik özeti değişmedikçe tablo yeniden oluşturulmaz.
+COHORT_PATH = "data/depress_cohort.parquet"
+MANIFEST_PATH = "data/depress_cohort.json"
+
+# Girdi adı → veri kümesi adı (datasets.py; Parquet yoksa CSV okunur)
+COHORT_INPUTS = {
+    "patients": "depress_patients",
+    "diagnoses": "depress_diagnoses",
+    "base_patients": "patients",
+    "admissions": "admissions",
+    "triage": "triage",
+}
+REQUIRED_INPUTS = ("patients", "diagnoses")
+
+ID_COLUMNS = ["subject_id", "hadm_id", "stay_id", "seq_num"]
+DATETIME_COLUMNS = ["intime", "outtime"]
+
+BASE_PATIENT_COLUMNS = ["subject_id", "anchor_age"]
+ADMISSION_COLUMNS = ["subject_id", "hadm_id", "admission_type", "admission_location", "discharge_location"]
+TRIAGE_COLUMNS = ["subject_id", "stay_id", "chiefcomplaint"]
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def input_paths(inputs=COHORT_INPUTS):
+    """Girdi adı → şu an okunacak dosya yolu."""
+    return {name: dataset_path(dataset) for name, dataset in inputs.items()}
+
+def file_signatures(inputs):
+    """Girdilerin (boyut, değişiklik zamanı) bilgisi; olmayan dosya None."""
+    signatures = {}
+    for name, path in inputs.items():
+        if os.path.exists(path):
+            stat = os.stat(path)
+            signatures[name] = [stat.st_size, stat.st_mtime]
+        else:
+            signatures[name] = None
+    return signatures
+
+def inputs_version(inputs):
+    """Mevcut girdilerin içeriğinden hesaplanan sürüm özeti."""
+    digest = hashlib.sha256()
+    for name, path in sorted(inputs.items()):
+        digest.update(name.encode("utf-8") + b"\x00")
+        if not os.path.exists(path):
+            digest.update(b"missing\x00")
+            continue
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+def read_input(dataset, columns, filters=None):
+    """Kümenin yalnızca gereken sütunlarını oku; küme ya da sütunlardan biri yoksa boş tablo."""
+    if not dataset_exists(dataset) or not set(columns) <= set(dataset_columns(dataset)):
+        return pd.DataFrame()
+    return read_dataset(dataset, columns=columns, filters=filters)
+
+def build_cohort_frame(inputs=COHORT_INPUTS):
+    """app_ed.py'nin her yeniden çalıştırmada yaptığı birleştirmeleri bir kez yap.
+
+    Filtreler uygulanmaz; panel bunları bu tablo üzerinde maske olarak uygular.
+    """
+    patients_df = read_dataset(inputs["patients"])
+    diagnoses_df = read_dataset(inputs["diagnoses"])
+    base_patients_df = read_input(inputs["base_patients"], BASE_PATIENT_COLUMNS)
+    admissions_df = read_input(inputs["admissions"], ADMISSION_COLUMNS)
+    triage_df = read_input(inputs["triage"], TRIAGE_COLUMNS)
+
+    if not base_patients_df.empty:
+        patients_df = pd.merge(patients_df, base_patients_df, on="subject_id", how="left")
+
+    if not admissions_df.empty:
+        if "hadm_id" in patients_df.columns:
+            patients_df = pd.merge(patients_df, admissions_df, on=["subject_id", "hadm_id"], how="left")
+        else:
+            patients_df = pd.merge(patients_df, admissions_df, on="subject_id", how="left")
+
+    if not triage_df.empty:
+        patients_df = pd.merge(patients_df, triage_df, on=["subject_id", "stay_id"], how="left")
+
+    merge_keys = ["subject_id"]
+    if "hadm_id" in patients_df.columns and "hadm_id" in diagnoses_df.columns:
+        merge_keys.append("hadm_id")
+
+    cohort_df = apply_types(pd.merge(patients_df, diagnoses_df, on=merge_keys, how="inner"))
+    # Panel tabloyu her oturumda bellekte tuttuğundan küçük tiplerle yazılır
+    before = frame_memory(cohort_df)
+    cohort_df = compact_frame(cohort_df)
+    print(memory_report("kohort", before, frame_memory(cohort_df)))
+    return cohort_df
+
+def apply_types(df):
+    """Kimlikler tamsayı (boş olabilir), yaş sayısal, zamanlar datetime."""
+    for col in df.columns:
+        if col in ID_COLUMNS or col.startswith(("stay_id_", "hadm_id_")):
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    if "anchor_age" in df.columns:
+        df["anchor_age"] = pd.to_numeric(df["anchor_age"], errors="coerce")
+    for col in DATETIME_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+    return df
+
+def read_manifest(manifest_path=MANIFEST_PATH):
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_manifest(manifest, manifest_path=MANIFEST_PATH):
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def build_cohort(inputs=COHORT_INPUTS, output_path=COHORT_PATH, manifest_path=MANIFEST_PATH):
+    """Kohort tablosunu Parquet olarak yaz ve sürümünü manifest'e kaydet."""
+    started = time.perf_counter()
+    paths = input_paths(inputs)
+    version = inputs_version(paths)
+    cohort_df = build_cohort_frame(inputs)
+    tmp_path = f"{output_path}.tmp"
+    cohort_df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, output_path)
+    write_manifest({
+        "version": version,
+        "rows": len(cohort_df),
+        "inputs": file_signatures(paths),
+    }, manifest_path)
+    print(f"✅ {output_path} oluşturuldu: {len(cohort_df):,} satır, sürüm {version} ({time.perf_counter() - started:.1f}s)")
+    return version
+
+def ensure_cohort(inputs=COHORT_INPUTS, output_path=COHORT_PATH, manifest_path=MANIFEST_PATH):
+    """Kohort güncelse sürümünü döndür, değilse yeniden oluştur.
+
+    Dosya boyutu/zamanı değişmediyse içerik özeti hiç hesaplanmaz; değiştiyse
+    özet karşılaştırılır ve yalnızca içerik farklıysa tablo yeniden yazılır.
+    """
+    manifest = read_manifest(manifest_path)
+    if manifest is None or not os.path.exists(output_path):
+        return build_cohort(inputs, output_path, manifest_path)
+    paths = input_paths(inputs)
+    signatures = file_signatures(paths)
+    if manifest.get("inputs") == signatures:
+        return manifest["version"]
+    if inputs_version(paths) != manifest.get("version"):
+        return build_cohort(inputs, output_path, manifest_path)
+    # Yalnızca dosya zamanları değişmiş; bir dahaki kontrolde özet hesaplanmasın
+    manifest["inputs"] = signatures
+    write_manifest(manifest, manifest_path)
+    return manifest["version"]
+
+if __name__ == "__main__":
+    missing = [COHORT_INPUTS[name] for name in REQUIRED_INPUTS if not dataset_exists(COHORT_INPUTS[name])]
+    if missing:
+        print(f"❌ Gerekli dosyalar bulunamadı: {', '.join(missing)}")
+        exit(1)
+    build_cohort()
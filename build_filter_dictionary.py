@@ -0,0 +1,126 @@
+import psycopg2
+import os
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+from backend.cache import invalidate_tables
+
+# Load environment variables
+load_dotenv()
+
+DB_CONFIG = {
+    "dbname": os.getenv("DB_NAME", "mimiciv"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "password"),
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": os.getenv("DB_PORT", "5432")
+}
+
+# (value, label, frequency) per sidebar filter dimension
+DIMENSION_QUERIES = {
+    "gender": """
+        SELECT gender, NULL, COUNT(*) FROM mimiciv_hosp.patients
+        WHERE gender IS NOT NULL GROUP BY gender
+    """,
+    "anchor_age": """
+        SELECT anchor_age::TEXT, NULL, COUNT(*) FROM mimiciv_hosp.patients
+        WHERE anchor_age IS NOT NULL GROUP BY anchor_age
+    """,
+    "admission_type": """
+        SELECT admission_type, NULL, COUNT(*) FROM mimiciv_hosp.admissions
+        WHERE admission_type IS NOT NULL GROUP BY admission_type
+    """,
+    "icd_code": """
+        SELECT diagnoses_icd.icd_code, MIN(d_icd_diagnoses.long_title), COUNT(*)
+        FROM mimiciv_hosp.diagnoses_icd
+        LEFT JOIN mimiciv_hosp.d_icd_diagnoses ON diagnoses_icd.icd_code = d_icd_diagnoses.icd_code
+        WHERE diagnoses_icd.icd_code IS NOT NULL GROUP BY diagnoses_icd.icd_code
+    """,
+    "long_title": """
+        SELECT d_icd_diagnoses.long_title, MIN(d_icd_diagnoses.icd_code), COUNT(diagnoses_icd.icd_code)
+        FROM mimiciv_hosp.d_icd_diagnoses
+        LEFT JOIN mimiciv_hosp.diagnoses_icd ON diagnoses_icd.icd_code = d_icd_diagnoses.icd_code
+        WHERE d_icd_diagnoses.long_title IS NOT NULL GROUP BY d_icd_diagnoses.long_title
+    """,
+}
+
+def create_dictionary_tables(cursor):
+    cursor.execute("CREATE SCHEMA IF NOT EXISTS mimiciv_meta;")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mimiciv_meta.filter_dictionary (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            label TEXT,
+            frequency BIGINT NOT NULL,
+            version TEXT NOT NULL,
+            PRIMARY KEY (dimension, value)
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS mimiciv_meta.filter_dictionary_version (
+            version TEXT NOT NULL,
+            built_at TIMESTAMP NOT NULL
+        );
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS filter_dictionary_frequency_idx "
+        "ON mimiciv_meta.filter_dictionary (dimension, frequency DESC);"
+    )
+
+def create_search_indexes(cursor):
+    """Trigram indexes for the sidebar's ILIKE type-ahead; skipped without pg_trgm."""
+    cursor.execute("SAVEPOINT trgm;")
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS filter_dictionary_value_trgm_idx "
+            "ON mimiciv_meta.filter_dictionary USING gin (value gin_trgm_ops);"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS filter_dictionary_label_trgm_idx "
+            "ON mimiciv_meta.filter_dictionary USING gin (label gin_trgm_ops);"
+        )
+        cursor.execute("RELEASE SAVEPOINT trgm;")
+    except psycopg2.Error as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT trgm;")
+        print(f"⚠️ pg_trgm unavailable, type-ahead search will scan the dictionary: {e.pgerror or e}")
+
+def build_filter_dictionary(conn):
+    """Rebuild the sidebar filter dictionary in one transaction and stamp a new version."""
+    started = time.perf_counter()
+    version = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    conn.autocommit = False
+    cursor = conn.cursor()
+    try:
+        create_dictionary_tables(cursor)
+        cursor.execute("DELETE FROM mimiciv_meta.filter_dictionary;")
+        for dimension, query in DIMENSION_QUERIES.items():
+            cursor.execute(
+                f"INSERT INTO mimiciv_meta.filter_dictionary (dimension, value, label, frequency, version) "
+                f"SELECT %s, source.*, %s FROM ({query}) AS source;",
+                (dimension, version),
+            )
+            print(f"   {dimension}: {cursor.rowcount:,} values")
+        cursor.execute("DELETE FROM mimiciv_meta.filter_dictionary_version;")
+        cursor.execute(
+            "INSERT INTO mimiciv_meta.filter_dictionary_version (version, built_at) VALUES (%s, now());",
+            (version,),
+        )
+        create_search_indexes(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    invalidate_tables(["mimiciv_meta.filter_dictionary", "mimiciv_meta.filter_dictionary_version"])
+    print(f"✅ Filter dictionary {version} built in {time.perf_counter() - started:.1f}s")
+    return version
+
+if __name__ == "__main__":
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        build_filter_dictionary(conn)
+    finally:
+        conn.close()
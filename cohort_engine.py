@@ -0,0 +1,112 @@
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from datasets import coerce_frame, dataset_schema, iter_csv, write_dataset
+
+# ICD tanılarına dayalı kohortlar. Tanımlar cohorts.json'da adlandırılmış
+# kurallar olarak tutulur (anahtar kelime, düzenli ifade, ICD kodu öneki).
+# Kurallar tanı satırlarına değil farklı ICD tanımlarına (d_icd_diagnoses) bir kez
+# uygulanır; tanı tablosu tek geçişte okunur ve her satır eşleşen kod kümesiyle
+# hash semi-join ile seçilir. Birden çok kohort aynı geçişi paylaşır.
+COHORTS_PATH = os.getenv("COHORTS_PATH", "cohorts.json")
+
+DIAGNOSIS_PATH = "data/diagnosis.csv"
+ICD_DEF_PATH = "data/d_icd_diagnoses.csv"
+EDSTAYS_PATH = "data/edstays.csv"
+
+ICD_KEYS = ["icd_code", "icd_version"]
+DIAGNOSIS_COLUMNS = ["subject_id", "stay_id", "seq_num", "icd_code", "icd_version", "icd_title"]
+
+def load_definitions(path=COHORTS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def definition_pattern(definition):
+    """Anahtar kelimeler (düz metin) ve düzenli ifadeler tek bir desende birleşir."""
+    parts = [re.escape(keyword.lower()) for keyword in definition.get("keywords", [])]
+    parts += definition.get("regex", [])
+    return "|".join(f"(?:{part})" for part in parts) if parts else None
+
+def match_icd_codes(icd_df, definition):
+    """Tanıma uyan ICD tanımları için boolean dizi (``icd_df`` satır sırasıyla)."""
+    matched = np.zeros(len(icd_df), dtype=bool)
+    pattern = definition_pattern(definition)
+    if pattern:
+        titles = icd_df["long_title"].fillna("").str.lower()
+        matched |= titles.str.contains(pattern, regex=True).to_numpy()
+    prefixes = tuple(prefix.upper() for prefix in definition.get("icd_prefixes", []))
+    if prefixes:
+        matched |= icd_df["icd_code"].fillna("").str.upper().str.startswith(prefixes).to_numpy()
+    return matched
+
+class CohortMatcher:
+    """Eşleşen ICD kodları → kohort üyelik matrisi (satır: kod, sütun: kohort)."""
+
+    def __init__(self, icd_df, definitions):
+        self.names = list(definitions)
+        membership = np.column_stack([match_icd_codes(icd_df, definitions[name]) for name in self.names])
+        matched = membership.any(axis=1)
+        codes = coerce_frame(icd_df.loc[matched, ICD_KEYS + ["long_title"]], dataset_schema(ICD_KEYS + ["long_title"]))
+        self.codes = codes.reset_index(drop=True)
+        self.membership = membership[matched]
+        self.index = pd.MultiIndex.from_frame(self.codes[ICD_KEYS])
+
+    def code_counts(self):
+        return dict(zip(self.names, self.membership.sum(axis=0).tolist()))
+
+    def match(self, chunk):
+        """Parçadaki satırların kod konumları (-1: hiçbir kohortta değil)."""
+        return self.index.get_indexer(pd.MultiIndex.from_frame(chunk[ICD_KEYS]))
+
+def build_cohorts(names=None, definitions_path=COHORTS_PATH, diagnosis_path=DIAGNOSIS_PATH,
+                  icd_path=ICD_DEF_PATH, edstays_path=EDSTAYS_PATH):
+    """Kohortların ``<ad>_diagnoses`` ve ``<ad>_patients`` veri kümelerini oluştur."""
+    started = time.perf_counter()
+    definitions = load_definitions(definitions_path)
+    names = names or list(definitions)
+    unknown = [name for name in names if name not in definitions]
+    if unknown:
+        raise KeyError(f"{definitions_path} içinde tanımsız kohort: {', '.join(unknown)}")
+
+    icd_df = pd.read_csv(icd_path, dtype={"icd_code": str})
+    matcher = CohortMatcher(icd_df, {name: definitions[name] for name in names})
+    print(f"🔎 {len(icd_df):,} ICD tanımı tarandı: " + ", ".join(f"{name} {count:,} kod" for name, count in matcher.code_counts().items()))
+
+    # Tanı tablosu tek geçişte okunur; her parça tüm kohortlara dağıtılır
+    frames = {name: [] for name in names}
+    for chunk in iter_csv(diagnosis_path, DIAGNOSIS_COLUMNS):
+        positions = matcher.match(chunk)
+        hit = positions >= 0
+        if not hit.any():
+            continue
+        chunk, positions = chunk[hit], positions[hit]
+        chunk = chunk.assign(long_title=matcher.codes["long_title"].to_numpy()[positions])
+        for i, name in enumerate(names):
+            selected = matcher.membership[positions, i]
+            if selected.any():
+                frames[name].append(chunk[selected])
+
+    edstays_df = pd.read_csv(edstays_path)
+    for name in names:
+        diagnoses_df = pd.concat(frames[name], ignore_index=True) if frames[name] else \
+            pd.DataFrame(columns=DIAGNOSIS_COLUMNS + ["long_title"])
+        patients_df = edstays_df[edstays_df["subject_id"].isin(diagnoses_df["subject_id"].unique())]
+        diag_path = write_dataset(diagnoses_df, f"{name}_diagnoses")
+        patients_path = write_dataset(patients_df, f"{name}_patients")
+        print(f"✅ {name}: {diag_path} ({len(diagnoses_df):,} tanı), {patients_path} ({len(patients_df):,} başvuru, "
+              f"{patients_df['subject_id'].nunique():,} hasta)")
+    print(f"⏱️ {len(names)} kohort {time.perf_counter() - started:.1f}s içinde oluşturuldu")
+
+if __name__ == "__main__":
+    # python cohort_engine.py [kohort ...]  (ad verilmezse cohorts.json'daki tümü)
+    try:
+        build_cohorts(sys.argv[1:] or None)
+    except (OSError, KeyError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,153 @@
+import io
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+
+from datasets import DatasetWriter, field_type, read_dataset, sort_keys
+
+# prepare_*.py betiklerinin ortak kohort çıkarıcısı: kaynak tablolar sabit
+# boyutlu parçalar halinde okunur, kohorttaki hastaların satırları çıktıya
+# parça parça eklenir. Bellek kullanımı kaynak dosyanın boyutuna bağlı değildir.
+EXTRACT_CHUNK_SIZE = int(os.getenv("EXTRACT_CHUNK_SIZE", "500000"))
+# Büyük kaynaklar satır sınırlarında bu boyutta bayt aralıklarına bölünüp
+# süreç havuzunda filtrelenir; 1 işçi sıralı okuma demektir
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+EXTRACT_SHARD_MB = int(os.getenv("EXTRACT_SHARD_MB", "128"))
+COHORT_PATIENTS_DATASET = "depress_patients"
+
+# prepare_*.py betikleri __main__ koruması olmadan çalıştığından işçiler
+# yalnızca fork ile başlatılabilir; fork yoksa okuma sıralı yapılır
+FORK_CONTEXT = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+
+class ExtractSource:
+    """Bir kaynak tablo ve okuma/dönüştürme ayarları.
+
+    ``transform`` her filtrelenmiş parçaya uygulanır ve DataFrame döndürmelidir.
+    ``columns`` verilirse çıktı bu sütunlara (bu sırayla) indirgenir.
+    Tırnak içinde satır sonu barındıran dosyalar (ör. klinik notlar) bayt
+    aralıklarına bölünemez; bunlar için ``shardable=False`` verilmelidir.
+    """
+
+    def __init__(self, path, usecols=None, dtype=None, transform=None, columns=None, shardable=True):
+        self.path = path
+        self.usecols = usecols
+        self.dtype = dtype
+        self.transform = transform
+        self.columns = columns
+        self.shardable = shardable
+
+def load_cohort_ids(dataset=COHORT_PATIENTS_DATASET, id_column="subject_id"):
+    """Kohort hastalarının kimlik kümesi (yalnızca kimlik sütunu okunur)."""
+    ids = read_dataset(dataset, columns=[id_column])[id_column].dropna()
+    return set(ids.astype("int64"))
+
+def shard_ranges(path, shard_bytes):
+    """Başlıktan sonraki içeriği satır sınırlarında kesilmiş (başlangıç, bitiş) bayt aralıklarına böl."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        f.readline()
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + shard_bytes, size))
+            # Aralık bir sonraki satır başında biter
+            f.readline()
+            end = min(f.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+def read_dtypes(source, header):
+    """Şemada metin olan (ya da hiç kaydı olmayan) sütunlar her zaman str okunur.
+
+    Aksi halde pandas tipi her parçada ayrı tahmin eder; aynı değer bir parçada
+    "1", boş değer içeren bir başkasında "1.0" olarak yazılabilir. Şemadaki
+    sayı/zaman sütunları zaten yazılırken şema tipine çevrilir.
+    """
+    columns = source.usecols if source.usecols is not None else header
+    dtype = {column: str for column in columns if field_type(column) == pa.string()}
+    dtype.update(source.dtype or {})
+    return dtype
+
+def filter_cohort(chunk, cohort_ids, id_column):
+    ids = chunk[id_column]
+    if ids.dtype == object:
+        # dtype=str ile okunan kimlikler tamsayı kümesiyle karşılaştırılabilsin
+        ids = pd.to_numeric(ids, errors="coerce")
+    return chunk[ids.isin(cohort_ids)]
+
+_worker_cohort_ids = None
+
+def _init_worker(cohort_ids):
+    global _worker_cohort_ids
+    _worker_cohort_ids = cohort_ids
+
+def _read_shard(path, start, end, usecols, dtype, id_column, chunksize):
+    """İşçi sürecinde bir bayt aralığını okuyup kohort satırlarını döndür."""
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(start)
+        data = f.read(end - start)
+    frames = [
+        filter_cohort(chunk, _worker_cohort_ids, id_column)
+        for chunk in pd.read_csv(io.BytesIO(header + data), usecols=usecols, dtype=dtype, chunksize=chunksize)
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+def _iter_shards(source, ranges, dtype, cohort_ids, id_column, chunksize, workers):
+    """Aralıkları havuzda işle; sonuçlar dosya sırasıyla, en fazla 2×işçi kadarı bellekte tutularak döner."""
+    with ProcessPoolExecutor(workers, mp_context=FORK_CONTEXT, initializer=_init_worker, initargs=(cohort_ids,)) as pool:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(pool.submit(_read_shard, source.path, start, end, source.usecols, dtype, id_column, chunksize))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def iter_cohort_chunks(source, cohort_ids, id_column="subject_id", chunksize=EXTRACT_CHUNK_SIZE, workers=EXTRACT_WORKERS):
+    """Kaynaktaki kohort satırlarını dosya sırasıyla parça parça üret (boş parçalar dahil)."""
+    header = pd.read_csv(source.path, nrows=0).columns
+    if id_column not in header:
+        raise ValueError(f"{source.path}: '{id_column}' sütunu bulunamadı")
+    dtype = read_dtypes(source, header)
+    ranges = []
+    if workers > 1 and source.shardable and FORK_CONTEXT is not None:
+        ranges = shard_ranges(source.path, EXTRACT_SHARD_MB * 1024 * 1024)
+    if len(ranges) > 1:
+        frames = _iter_shards(source, ranges, dtype, cohort_ids, id_column, chunksize, min(workers, len(ranges)))
+    else:
+        frames = (
+            filter_cohort(chunk, cohort_ids, id_column)
+            for chunk in pd.read_csv(source.path, usecols=source.usecols, dtype=dtype, chunksize=chunksize)
+        )
+    for chunk in frames:
+        if source.transform is not None:
+            chunk = source.transform(chunk)
+        if source.columns is not None:
+            chunk = chunk[source.columns]
+        yield chunk
+
+def extract_cohort(cohort_ids, sources, output, id_column="subject_id", chunksize=EXTRACT_CHUNK_SIZE,
+                   workers=EXTRACT_WORKERS):
+    """Kaynakların kohort satırlarını ``output`` veri kümesine (datasets.py) akış halinde yaz.
+
+    Çıktı DATASETS'teki sütunlara göre dış sıralamayla (sıralı ara dosyalar ve
+    birleştirme) sıralanır; önce geçici dosyaya yazılır, yarıda kalan bir çalışma
+    önceki çıktıyı bozmaz. Yazılan satır sayısını döndürür.
+    """
+    started = time.perf_counter()
+    with DatasetWriter(output, sort_by=sort_keys(output)) as writer:
+        for source in sources:
+            source_started = time.perf_counter()
+            source_rows = writer.rows
+            for chunk in iter_cohort_chunks(source, cohort_ids, id_column, chunksize, workers):
+                writer.write(chunk)
+            print(f"   {source.path}: {writer.rows - source_rows:,} satır ({time.perf_counter() - source_started:.1f}s)")
+    print(f"✅ {writer.path}: {writer.rows:,} satır yazıldı ({time.perf_counter() - started:.1f}s)")
+    return writer.rows
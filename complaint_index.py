@@ -0,0 +1,70 @@
+import bisect
+import re
+
+import numpy as np
+import pandas as pd
+
+# Başvuru şikayetleri (chiefcomplaint) için ters dizin: normalize edilmiş
+# kelime → şikayet kodları. Kohortta aynı şikayet metni binlerce kez tekrar
+# ettiğinden yalnızca farklı metinler parçalanır; satırlar kategori kodlarıyla
+# eşleştirilir. Filtre bir küme araması ve tek bir np.isin olur.
+TOKEN_PATTERN = re.compile(r"\w+")
+PREFIX_MARKER = "*"
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text).lower())
+
+def parse_query(query):
+    """Sorgu → [(kelime, önek mi)]; "depress*" öneğe göre eşleşir."""
+    terms = []
+    for part in query.split():
+        prefix = part.endswith(PREFIX_MARKER)
+        tokens = tokenize(part)
+        for i, token in enumerate(tokens):
+            # "s/p*" gibi terimlerde yalnızca son parça önektir
+            terms.append((token, prefix and i == len(tokens) - 1))
+    return terms
+
+class ComplaintIndex:
+    """Şikayet sütunu için kelime → satır eşleşmesi.
+
+    Birden çok terim VE ile birleşir; bir kelime, başka bir kelimenin parçası
+    olarak eşleşmez (ör. "si" "sick" ile eşleşmez).
+    """
+
+    def __init__(self, complaints):
+        if not isinstance(complaints.dtype, pd.CategoricalDtype):
+            complaints = complaints.astype("category")
+        # -1 boş şikayet demektir ve hiçbir kelimeyle eşleşmez
+        self.codes = complaints.cat.codes.to_numpy()
+        postings = {}
+        for code, text in enumerate(complaints.cat.categories):
+            for token in set(tokenize(text)):
+                postings.setdefault(token, []).append(code)
+        self.tokens = sorted(postings)
+        self.postings = [np.array(postings[token], dtype=self.codes.dtype) for token in self.tokens]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def term_codes(self, token, prefix=False):
+        """Kelimeyi (veya öneki) içeren şikayetlerin kodları."""
+        start = bisect.bisect_left(self.tokens, token)
+        if not prefix:
+            if start < len(self.tokens) and self.tokens[start] == token:
+                return self.postings[start]
+            return np.empty(0, dtype=self.codes.dtype)
+        stop = bisect.bisect_left(self.tokens, token + "\U0010ffff", lo=start)
+        if stop == start:
+            return np.empty(0, dtype=self.codes.dtype)
+        return np.unique(np.concatenate(self.postings[start:stop]))
+
+    def mask(self, query):
+        """Sorgudaki tüm terimleri içeren satırlar için boolean dizi; terim yoksa hepsi True."""
+        codes = None
+        for token, prefix in parse_query(query):
+            matched = self.term_codes(token, prefix)
+            codes = matched if codes is None else np.intersect1d(codes, matched, assume_unique=True)
+        if codes is None:
+            return np.ones(len(self.codes), dtype=bool)
+        return np.isin(self.codes, codes)
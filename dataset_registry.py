@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from build_cohort import COHORT_PATH, inputs_version
+from datasets import dataset_path, frame_memory, load_dataset
+from patient_store import PatientStore, store_paths
+
+# Sunucu süreci boyunca paylaşılan veri kümesi kaydı. Her küme süreçte bir kez
+# yüklenir ve tüm Streamlit oturumlarına aynı (salt okunur) nesne olarak verilir;
+# dosyanın boyutu/zamanı değişirse içerik özeti karşılaştırılır ve yalnızca
+# içerik farklıysa küme yeniden yüklenir. Dönen nesneler yerinde değiştirilmemelidir.
+
+class RegistryEntry:
+    def __init__(self, name, path, loader, memory_mapped=False):
+        self.name = name
+        self.path = path
+        self.loader = loader
+        self.memory_mapped = memory_mapped
+        self.lock = threading.Lock()
+        self.data = None
+        self.signature = None
+        self.version = None
+        self.rows = None
+        self.memory = 0
+        self.load_seconds = 0.0
+        self.loads = 0
+        self.hits = 0
+        self.loaded_at = None
+
+def data_memory(data):
+    if isinstance(data, pd.DataFrame):
+        return frame_memory(data)
+    return int(getattr(data, "nbytes", 0))
+
+class DatasetRegistry:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path, loader, memory_mapped=False):
+        """``path`` o anki dosya yolunu, ``loader`` yüklenen nesneyi döndüren çağrılabilirlerdir."""
+        with self._lock:
+            if name not in self._entries:
+                self._entries[name] = RegistryEntry(name, path, loader, memory_mapped)
+            return self._entries[name]
+
+    def entry(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            # Kayıtlı olmayan adlar datasets.py kümesi olarak yüklenir
+            entry = self.register(name, lambda: dataset_path(name), lambda: load_dataset(name))
+        return entry
+
+    def get(self, name):
+        """Kümenin paylaşılan kopyası; dosya yoksa FileNotFoundError."""
+        entry = self.entry(name)
+        with entry.lock:
+            path = entry.path()
+            stat = os.stat(path)
+            signature = (path, stat.st_size, stat.st_mtime_ns)
+            if entry.data is not None and entry.signature == signature:
+                entry.hits += 1
+                return entry.data
+            version = inputs_version({name: path})
+            if entry.data is not None and entry.version == version:
+                # Yalnızca dosya zamanı değişmiş
+                entry.signature = signature
+                entry.hits += 1
+                return entry.data
+            started = time.perf_counter()
+            data = entry.loader()
+            entry.load_seconds = time.perf_counter() - started
+            entry.data, entry.signature, entry.version = data, signature, version
+            entry.rows = len(data)
+            entry.memory = data_memory(data)
+            entry.loads += 1
+            entry.loaded_at = time.strftime("%Y-%m-%d %H:%M:%S")
+            print(f"📦 {name}: {path} yüklendi, {entry.rows:,} satır, {entry.memory / 1e6:.1f} MB ({entry.load_seconds:.2f}s)")
+            return data
+
+    def version(self, name):
+        """Son yüklenen içeriğin özeti (türetilmiş önbellekler için anahtar)."""
+        return self.entry(name).version
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        return pd.DataFrame([
+            {
+                "Küme": entry.name,
+                "Dosya": entry.signature[0] if entry.signature else None,
+                "Satır": entry.rows,
+                "Bellek (MB)": round(entry.memory / 1e6, 2),
+                "Paylaşım": "bellek eşlemeli" if entry.memory_mapped else "süreç içi",
+                "Yükleme (s)": round(entry.load_seconds, 3),
+                "Yükleme": entry.loads,
+                "İsabet": entry.hits,
+                "Sürüm": entry.version,
+                "Yüklenme zamanı": entry.loaded_at,
+            }
+            for entry in entries if entry.data is not None
+        ])
+
+REGISTRY = DatasetRegistry()
+
+REGISTRY.register("cohort", lambda: COHORT_PATH, lambda: pd.read_parquet(COHORT_PATH))
+
+def patient_store(name):
+    """Hasta deposunun (patient_store.py) paylaşılan, bellek eşlemeli görünümü."""
+    REGISTRY.register(f"store:{name}", lambda: store_paths(name)[0], lambda: PatientStore(name), memory_mapped=True)
+    return REGISTRY.get(f"store:{name}")
@@ -0,0 +1,552 @@
+import os
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.dataset as pads
+import pyarrow.parquet as pq
+
+# data/ altındaki türetilmiş veri kümelerinin kaydı. Kümeler açık şemalı,
+# sıkıştırılmış Parquet olarak yazılır; okuyucular sütun seçimi ve satır grubu
+# istatistikleriyle filtreleme (predicate pushdown) kullanır. Parquet yoksa
+# aynı adlı CSV okunup şemaya dönüştürülür; CSV yalnızca dışa aktarım içindir.
+DATA_DIR = "data"
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd")
+PARQUET_ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", "100000"))
+# "1" ise her Parquet çıktısının yanına CSV kopyası da yazılır
+DATASET_CSV_EXPORT = os.getenv("DATASET_CSV_EXPORT", "0") == "1"
+# Sıralı akış yazımında (DatasetWriter sort_by) bellekte biriktirilen en fazla
+# satır; dolunca sıralanıp diske ara dosya (run) olarak yazılır
+SORT_RUN_ROWS = int(os.getenv("DATASET_SORT_RUN_ROWS", "1000000"))
+# Run dosyalarının satır grubu; birleştirme her run'dan bir grubu bellekte tuttuğundan küçüktür
+SORT_RUN_GROUP_ROWS = 10000
+
+# Sütun adı → Arrow tipi. Birleştirmelerden gelen _x/_y ekli sütunlar ekinden
+# arındırılmış adıyla eşlenir; kayıtta olmayan sütunlar metin (string) olur.
+FIELD_TYPES = {
+    "subject_id": pa.int64(),
+    "hadm_id": pa.int64(),
+    "stay_id": pa.int64(),
+    "aligned_stay_id": pa.int64(),
+    "aligned_hadm_id": pa.int64(),
+    "seq_num": pa.int32(),
+    "note_seq": pa.int32(),
+    "itemid": pa.int32(),
+    "icd_version": pa.int8(),
+    "admit_provider_id": pa.string(),
+    "anchor_age": pa.int16(),
+    "anchor_year": pa.int16(),
+    "hospital_expire_flag": pa.int8(),
+    "valuenum": pa.float64(),
+    "ref_range_lower": pa.float64(),
+    "ref_range_upper": pa.float64(),
+    "temperature": pa.float64(),
+    "heartrate": pa.float64(),
+    "resprate": pa.float64(),
+    "o2sat": pa.float64(),
+    "sbp": pa.float64(),
+    "dbp": pa.float64(),
+    "acuity": pa.float64(),
+    "los_hours": pa.float64(),
+    "lab_mean": pa.float64(),
+    "frequency": pa.int64(),
+    "visits": pa.int64(),
+    "diagnoses": pa.int64(),
+    "los_hours_sum": pa.float64(),
+    "los_count": pa.int64(),
+    "bucket": pa.timestamp("us"),
+    "intime": pa.timestamp("us"),
+    "outtime": pa.timestamp("us"),
+    "charttime": pa.timestamp("us"),
+    "storetime": pa.timestamp("us"),
+    "starttime": pa.timestamp("us"),
+    "stoptime": pa.timestamp("us"),
+    "admittime": pa.timestamp("us"),
+    "dischtime": pa.timestamp("us"),
+    "deathtime": pa.timestamp("us"),
+    "edregtime": pa.timestamp("us"),
+    "edouttime": pa.timestamp("us"),
+    "dod": pa.date32(),
+    "visit_day": pa.date32(),
+}
+
+# Bellekte kategori olarak tutulan, az sayıda farklı değer alan metin sütunları.
+# Kayıtta olmayan metin sütunları da farklı değer oranı CATEGORY_MAX_RATIO'nun
+# altındaysa kategoriye çevrilir.
+CATEGORY_COLUMNS = {
+    "gender", "race", "marital_status", "language", "insurance",
+    "disposition", "arrival_transport", "admission_type", "admission_location",
+    "discharge_location", "admit_provider_id", "icd_code", "icd_title", "long_title", "test_name", "label", "fluid", "category",
+    "valueuom", "flag", "priority", "note_type", "route", "drug_type",
+    "status", "pain", "chiefcomplaint", "complaint", "diagnosis", "aligned_by",
+}
+CATEGORY_MAX_RATIO = float(os.getenv("CATEGORY_MAX_RATIO", "0.5"))
+# Serbest metin sütunları hiçbir zaman kategoriye çevrilmez
+TEXT_COLUMNS = {"text", "snippet"}
+
+# Küme adı → Parquet'e yazmadan önce sıralama sütunları. subject_id'ye göre
+# sıralı satır grupları hasta filtrelerinde çoğu grubun atlanmasını sağlar;
+# kayıtta olmayan kümeler (ör. yeni kohortlar) subject_id'ye göre sıralanır.
+# Akış halinde yazılan kümeler (DatasetWriter) yalnızca sort_by verilirse sıralanır.
+DATASETS = {
+    "patients": ["subject_id"],
+    "admissions": ["subject_id", "hadm_id"],
+    "triage": ["subject_id", "stay_id"],
+    "full_patient": [],
+    "demo": ["subject_id"],
+    "top_diagnoses": [],
+    "los": ["subject_id"],
+    "trend": ["visit_day"],
+    "complaint_diag": [],
+    "depress_patients": ["subject_id", "stay_id"],
+    "depress_diagnoses": ["subject_id", "stay_id", "seq_num"],
+    "depress_labs": ["subject_id", "charttime"],
+    "depress_meds": ["subject_id"],
+    "depress_medrecon": ["subject_id"],
+    "depress_pyxis": ["subject_id"],
+    "depress_notes": ["subject_id", "charttime"],
+    "neuro_psych_patients": ["subject_id", "stay_id"],
+    "neuro_psych_diagnoses": ["subject_id", "stay_id", "seq_num"],
+    "neuro_psych_labs": ["subject_id", "charttime"],
+    "neuro_psych_notes": ["subject_id", "charttime"],
+    "ml_input_data": ["subject_id"],
+    "ed_stays_day": ["bucket"],
+    "ed_stays_week": ["bucket"],
+    "ed_stays_month": ["bucket"],
+    "ed_diagnoses_month": ["bucket"],
+}
+
+# Özellik matrisi sütunları (lab_features.py: lab_<itemid>_<pencere>_<istatistik>)
+# adlarının sonundaki istatistiğe göre tiplenir
+FEATURE_PREFIX = "lab_"
+FEATURE_STAT_TYPES = {
+    "abnormal_rate": pa.float32(),
+    "count": pa.int32(),
+    "min": pa.float32(),
+    "max": pa.float32(),
+    "mean": pa.float32(),
+    "last": pa.float32(),
+}
+
+PANDAS_INT_TYPES = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+}
+
+def parquet_path(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{name}.parquet")
+
+def csv_path(name, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"{name}.csv")
+
+def dataset_path(name, data_dir=DATA_DIR):
+    """Okunacak dosya: Parquet varsa o, yoksa CSV; hiçbiri yoksa Parquet yolu."""
+    path = parquet_path(name, data_dir)
+    if not os.path.exists(path) and os.path.exists(csv_path(name, data_dir)):
+        return csv_path(name, data_dir)
+    return path
+
+def dataset_exists(name, data_dir=DATA_DIR):
+    return os.path.exists(dataset_path(name, data_dir))
+
+def base_column(column):
+    return column[:-2] if column.endswith(("_x", "_y")) else column
+
+def field_type(column):
+    column = base_column(column)
+    if column not in FIELD_TYPES and column.startswith(FEATURE_PREFIX):
+        for stat, stat_type in FEATURE_STAT_TYPES.items():
+            if column.endswith(f"_{stat}"):
+                return stat_type
+    return FIELD_TYPES.get(column, pa.string())
+
+def dataset_schema(columns):
+    return pa.schema([(column, field_type(column)) for column in columns])
+
+def coerce_frame(df, schema):
+    """DataFrame sütunlarını şemadaki tiplere çevir; çevrilemeyen değerler boş olur."""
+    df = df.copy()
+    for field in schema:
+        column = df[field.name]
+        # Zaten sayı/zaman olan sütunlar yeniden ayrıştırılmaz
+        if pa.types.is_integer(field.type):
+            if not pd.api.types.is_numeric_dtype(column.dtype):
+                column = pd.to_numeric(column, errors="coerce")
+            df[field.name] = column.astype(PANDAS_INT_TYPES[field.type])
+        elif pa.types.is_floating(field.type):
+            if not pd.api.types.is_numeric_dtype(column.dtype):
+                column = pd.to_numeric(column, errors="coerce")
+            df[field.name] = column.astype("float64")
+        elif pa.types.is_timestamp(field.type):
+            df[field.name] = pd.to_datetime(column, errors="coerce").astype("datetime64[us]")
+        elif pa.types.is_date(field.type):
+            df[field.name] = pd.to_datetime(column, errors="coerce").dt.date
+        else:
+            if isinstance(column.dtype, pd.CategoricalDtype):
+                column = column.astype(object)
+            if pd.api.types.infer_dtype(column, skipna=True) not in ("string", "empty"):
+                column = column.where(column.isna(), column.astype(str))
+            df[field.name] = column
+    return df
+
+def frame_memory(df):
+    """DataFrame'in bellekte kapladığı bayt (nesne sütunlarının içeriği dahil)."""
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+def compact_frame(df):
+    """Bellekte daha az yer tutan tiplere çevir.
+
+    Kimlik ve diğer tamsayılar değer aralığına sığan en küçük (boş değer alabilen)
+    tamsayı tipine, ondalıklı sayılar float32'ye iner; şemada zaman/tarih olan
+    sütunlar ayrıştırılır; az sayıda farklı değer alan metin sütunları kategori olur.
+    """
+    df = df.copy()
+    for column in df.columns:
+        series = df[column]
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if pd.api.types.is_bool_dtype(dtype):
+            continue
+        if pd.api.types.is_integer_dtype(dtype):
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif pd.api.types.is_float_dtype(dtype):
+            df[column] = pd.to_numeric(series, downcast="float")
+        elif dtype == object or pd.api.types.is_string_dtype(dtype):
+            if pa.types.is_timestamp(field_type(column)) or pa.types.is_date(field_type(column)):
+                # Tarih nesneleri de datetime64 olarak tutulur (yazarken yeniden tarihe iner)
+                df[column] = pd.to_datetime(series, errors="coerce").astype("datetime64[us]")
+            elif base_column(column) in TEXT_COLUMNS:
+                continue
+            elif base_column(column) in CATEGORY_COLUMNS or series.nunique() < CATEGORY_MAX_RATIO * len(series):
+                df[column] = series.astype("category")
+    return df
+
+def memory_report(label, before, after):
+    return f"🧮 {label}: bellek {before / 1e6:.1f} MB → {after / 1e6:.1f} MB"
+
+def to_table(df, schema=None):
+    schema = schema or dataset_schema(df.columns)
+    return pa.Table.from_pandas(coerce_frame(df, schema), schema=schema, preserve_index=False)
+
+def to_pandas(table):
+    """Tamsayı sütunları boş değer içerse de float'a dönüşmesin."""
+    return table.to_pandas(types_mapper=PANDAS_INT_TYPES.get)
+
+def sort_keys(name):
+    """Kümenin DATASETS'teki sıralama sütunları (kayıtta yoksa subject_id)."""
+    return DATASETS.get(name, ["subject_id"])
+
+def write_dataset(df, name, data_dir=DATA_DIR, csv_export=DATASET_CSV_EXPORT):
+    """Kümeyi sıralanmış, satır gruplu Parquet olarak yaz; yazılan yolu döndür."""
+    sort_by = [column for column in sort_keys(name) if column in df.columns]
+    if sort_by:
+        df = df.sort_values(sort_by, kind="stable")
+    table = to_table(df)
+    path = parquet_path(name, data_dir)
+    os.makedirs(data_dir, exist_ok=True)
+    pq.write_table(table, f"{path}.tmp", compression=PARQUET_COMPRESSION, row_group_size=PARQUET_ROW_GROUP_ROWS)
+    os.replace(f"{path}.tmp", path)
+    if csv_export:
+        export_csv(name, data_dir)
+    return path
+
+def _iter_row_groups(path):
+    """Parquet dosyasını satır grubu satır grubu oku (iter_batches'ten farklı olarak
+    bellekte aynı anda yalnızca bir grup tutulur)."""
+    parquet_file = pq.ParquetFile(path)
+    for group in range(parquet_file.num_row_groups):
+        yield parquet_file.read_row_group(group)
+
+def _through_key(table, sort_by, key):
+    """Sıralı ``table``'ın ``key`` anahtarına kadar (dahil) olan satır sayısı.
+
+    Karşılaştırma Arrow sıralamasıyla aynıdır: sütun sütun artan, boş değerler en sonda.
+    """
+    mask = None
+    for column, value in reversed(list(zip(sort_by, key))):
+        values = table.column(column)
+        if value.is_valid:
+            before = pc.fill_null(pc.less(values, value), False)
+            equal = pc.fill_null(pc.equal(values, value), False)
+        else:
+            before, equal = pc.is_valid(values), pc.is_null(values)
+        mask = pc.or_(before, equal) if mask is None else pc.or_(before, pc.and_(equal, mask))
+    return pc.sum(mask).as_py() or 0
+
+class DatasetWriter:
+    """Parça parça gelen DataFrame'leri tek bir Parquet kümesine akış halinde yazar.
+
+    Şema ilk parçanın sütunlarından çıkarılır. ``sort_by`` verilmezse parçalar
+    geldikleri sırayla satır grubu olarak eklenir. Verilirse dış sıralama yapılır:
+    parçalar en fazla ``run_rows`` satır biriktirilip sıralanarak ara dosyalara
+    (run) yazılır, kapanışta run'lar blok blok k-yollu birleştirilir; bellekte hiçbir
+    zaman çıktının tamamı tutulmaz.
+    """
+
+    def __init__(self, name, data_dir=DATA_DIR, csv_export=DATASET_CSV_EXPORT, sort_by=None,
+                 run_rows=SORT_RUN_ROWS):
+        self.name = name
+        self.data_dir = data_dir
+        self.csv_export = csv_export
+        self.path = parquet_path(name, data_dir)
+        self.sort_by = list(sort_by or [])
+        self.run_rows = run_rows
+        self.schema = None
+        self.writer = None
+        self.rows = 0
+        self.buffer = []
+        self.buffered_rows = 0
+        self.runs = []
+
+    def _open(self):
+        self.writer = pq.ParquetWriter(f"{self.path}.tmp", self.schema, compression=PARQUET_COMPRESSION)
+
+    def write(self, df):
+        if self.schema is None:
+            os.makedirs(self.data_dir, exist_ok=True)
+            self.schema = dataset_schema(df.columns)
+            self.sort_by = [column for column in self.sort_by if column in self.schema.names]
+            if not self.sort_by:
+                self._open()
+        if df.empty:
+            return
+        table = to_table(df, self.schema)
+        self.rows += len(df)
+        if not self.sort_by:
+            self.writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_ROWS)
+            return
+        self.buffer.append(table)
+        self.buffered_rows += len(df)
+        if self.buffered_rows >= self.run_rows:
+            self._flush_run()
+
+    def _sorted_buffer(self):
+        table = pa.concat_tables(self.buffer).sort_by([(column, "ascending") for column in self.sort_by])
+        self.buffer, self.buffered_rows = [], 0
+        return table
+
+    def _flush_run(self):
+        path = f"{self.path}.run{len(self.runs)}.tmp"
+        pq.write_table(self._sorted_buffer(), path, compression=PARQUET_COMPRESSION, row_group_size=SORT_RUN_GROUP_ROWS)
+        self.runs.append(path)
+
+    def _merge_runs(self):
+        """Sıralı run'ları birleştir: her turda run'ların bellekteki bloklarının son
+        anahtarlarının en küçüğüne kadar olan satırlar yazılır; o anahtara ulaşan
+        run'ın bloğu biter ve bir sonraki blok okunur."""
+        readers = [_iter_row_groups(path) for path in self.runs]
+        pending = [None] * len(readers)
+        out, out_rows = [], 0
+        while True:
+            for i, reader in enumerate(readers):
+                while reader is not None and (pending[i] is None or pending[i].num_rows == 0):
+                    pending[i] = next(reader, None)
+                    if pending[i] is None:
+                        readers[i] = reader = None
+            tables = [table for table in pending if table is not None]
+            if not tables:
+                break
+            cutoff = min(
+                (tuple(table.column(column)[table.num_rows - 1] for column in self.sort_by) for table in tables),
+                key=lambda key: tuple((not value.is_valid, value.as_py()) for value in key),
+            )
+            emitted = []
+            for i, table in enumerate(pending):
+                if table is None:
+                    continue
+                count = _through_key(table, self.sort_by, cutoff)
+                if count:
+                    emitted.append(table.slice(0, count))
+                    pending[i] = table.slice(count)
+            # Sıralama satırları kopyalar; dilimlerin bağlı olduğu bloklar bellekte kalmaz
+            out.append(pa.concat_tables(emitted).sort_by([(column, "ascending") for column in self.sort_by]))
+            out_rows += out[-1].num_rows
+            if out_rows >= PARQUET_ROW_GROUP_ROWS:
+                self.writer.write_table(pa.concat_tables(out), row_group_size=PARQUET_ROW_GROUP_ROWS)
+                out, out_rows = [], 0
+        if out:
+            self.writer.write_table(pa.concat_tables(out), row_group_size=PARQUET_ROW_GROUP_ROWS)
+
+    def _remove_runs(self):
+        for path in self.runs:
+            if os.path.exists(path):
+                os.remove(path)
+        self.runs = []
+
+    def close(self):
+        if self.schema is None:
+            return
+        if self.sort_by:
+            self._open()
+            if self.runs:
+                if self.buffer:
+                    self._flush_run()
+                self._merge_runs()
+                self._remove_runs()
+            elif self.buffer:
+                self.writer.write_table(self._sorted_buffer(), row_group_size=PARQUET_ROW_GROUP_ROWS)
+        self.writer.close()
+        os.replace(f"{self.path}.tmp", self.path)
+        if self.csv_export:
+            export_csv(self.name, self.data_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        self._remove_runs()
+        if self.writer is not None:
+            self.writer.close()
+            os.remove(f"{self.path}.tmp")
+
+def dataset_columns(name, data_dir=DATA_DIR):
+    path = dataset_path(name, data_dir)
+    if path.endswith(".parquet"):
+        return pq.read_schema(path).names
+    return pd.read_csv(path, nrows=0).columns.tolist()
+
+def _apply_filters(df, filters):
+    """CSV yedeği için pyarrow biçimindeki [(sütun, işleç, değer)] filtreleri."""
+    for column, op, value in filters or []:
+        series = df[column]
+        if op in ("=", "=="):
+            mask = series == value
+        elif op == "!=":
+            mask = series != value
+        elif op == "in":
+            mask = series.isin(value)
+        elif op == "not in":
+            mask = ~series.isin(value)
+        elif op == "<":
+            mask = series < value
+        elif op == "<=":
+            mask = series <= value
+        elif op == ">":
+            mask = series > value
+        elif op == ">=":
+            mask = series >= value
+        else:
+            raise ValueError(f"Desteklenmeyen filtre işleci: {op}")
+        df = df[mask.fillna(False).astype(bool)]
+    return df
+
+def subject_filter(subject_ids):
+    """Yalnızca verilen hastaların satırları için ``filters`` değeri."""
+    ids = pd.Series(list(subject_ids), dtype="object").dropna().astype("int64").unique()
+    return [("subject_id", "in", sorted(ids.tolist()))]
+
+def read_dataset(name, columns=None, filters=None, data_dir=DATA_DIR):
+    """Kümeyi oku; ``columns`` yalnızca bu sütunları, ``filters`` yalnızca eşleşen satırları getirir.
+
+    Filtreler pyarrow biçimindedir, ör. ``[("subject_id", "in", ids)]``.
+    """
+    path = dataset_path(name, data_dir)
+    if path.endswith(".parquet"):
+        return to_pandas(pq.read_table(path, columns=columns, filters=filters or None))
+    df = pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=True)
+    df = coerce_frame(df, dataset_schema(df.columns))
+    return _apply_filters(df, filters).reset_index(drop=True)
+
+def load_dataset(name, columns=None, filters=None, data_dir=DATA_DIR):
+    """``read_dataset`` + ``compact_frame``; bellek kazancını yazdırır."""
+    df = read_dataset(name, columns=columns, filters=filters, data_dir=data_dir)
+    before = frame_memory(df)
+    df = compact_frame(df)
+    print(memory_report(name, before, frame_memory(df)))
+    return df
+
+def iter_dataset(name, columns=None, batch_size=PARQUET_ROW_GROUP_ROWS, filters=None, data_dir=DATA_DIR):
+    """Kümeyi en fazla ``batch_size`` satırlık DataFrame parçaları halinde oku.
+
+    ``filters`` read_dataset'teki gibidir; Parquet'te eşleşmeyen satır grupları
+    istatistiklerine bakılarak hiç okunmaz.
+    """
+    path = dataset_path(name, data_dir)
+    if path.endswith(".parquet"):
+        if filters:
+            batches = pads.dataset(path, format="parquet").to_batches(
+                columns=columns, filter=pq.filters_to_expression(filters), batch_size=batch_size
+            )
+        else:
+            batches = pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns)
+        for batch in batches:
+            if batch.num_rows:
+                yield to_pandas(pa.Table.from_batches([batch]))
+        return
+    for chunk in pd.read_csv(path, usecols=columns, dtype=str, chunksize=batch_size):
+        chunk = coerce_frame(chunk, dataset_schema(chunk.columns))
+        yield _apply_filters(chunk, filters).reset_index(drop=True) if filters else chunk
+
+def iter_csv(path, columns, block_size=64 * 1024 * 1024):
+    """Ham CSV'yi Arrow'un akışlı okuyucusuyla şemadaki tiplerle blok blok oku.
+
+    Dosyada olmayan sütunlar boş gelir; her blok bir DataFrame olarak döner.
+    """
+    schema = dataset_schema(columns)
+    reader = pacsv.open_csv(
+        path,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            column_types={field.name: field.type for field in schema},
+            include_columns=list(columns),
+            include_missing_columns=True,
+            # pandas gibi boş metin de boş değer sayılır
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        yield to_pandas(pa.Table.from_batches([batch]))
+
+def export_csv(name, data_dir=DATA_DIR):
+    """Parquet kümesini aynı adlı CSV olarak dışa aktar."""
+    path = csv_path(name, data_dir)
+    header = True
+    with open(f"{path}.tmp", "w", encoding="utf-8", newline="") as out:
+        for chunk in iter_dataset(name, data_dir=data_dir):
+            chunk.to_csv(out, index=False, header=header)
+            header = False
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def is_lfs_pointer(path):
+    """İndirilmemiş git-lfs dosyaları yalnızca bir işaretçi metni içerir."""
+    with open(path, "rb") as f:
+        return f.read(40).startswith(b"version https://git-lfs")
+
+def convert_csv(name, data_dir=DATA_DIR):
+    """Eski CSV çıktısını şemalı Parquet'e çevir."""
+    started = time.perf_counter()
+    source = csv_path(name, data_dir)
+    df = pd.read_csv(source, dtype=str)
+    path = write_dataset(df, name, data_dir, csv_export=False)
+    print(f"✅ {source} → {path}: {len(df):,} satır, {os.path.getsize(source) / 1e6:.1f} MB → {os.path.getsize(path) / 1e6:.1f} MB ({time.perf_counter() - started:.1f}s)")
+    return path
+
+if __name__ == "__main__":
+    # python datasets.py convert [küme ...]  |  python datasets.py export küme ...
+    command, names = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ("convert", [])
+    if command == "convert":
+        for name in names or DATASETS:
+            if os.path.exists(csv_path(name)) and not os.path.exists(parquet_path(name)):
+                if is_lfs_pointer(csv_path(name)):
+                    print(f"⏭️ {csv_path(name)} bir git-lfs işaretçisi, atlandı")
+                    continue
+                try:
+                    convert_csv(name)
+                except (ValueError, pd.errors.ParserError) as e:
+                    print(f"⚠️ {csv_path(name)} çevrilemedi: {e}")
+    elif command == "export":
+        for name in names:
+            print(f"✅ {export_csv(name)}")
+    else:
+        print("Kullanım: python datasets.py convert [küme ...] | export küme ...")
+        sys.exit(1)
@@ -1,8 +1,19 @@
 import psycopg2
+import psycopg2.pool
 import pandas as pd
+import io
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from backend.cache import invalidate_tables
+from build_filter_dictionary import build_filter_dictionary
+from provision_indexes import provision
+from schema_inference import infer_csv_schema, render_create_table, write_ddl
+
 # Load environment variables
 load_dotenv()
 
@@ -17,56 +28,264 @@ DB_CONFIG = {
 # Base folder where CSV files are stored
 base_path = "D:\\NeuroScience\\mimicived"  # Update this if your path is different
 
-def create_table_if_not_exists(cursor, table_name, df):
-    """Create table dynamically based on CSV file structure if it does not exist."""
-    column_types = []
-    for col in df.columns:
-        sample_value = df[col].dropna().iloc[0] if not df[col].dropna().empty else ""
-        if isinstance(sample_value, int):
-            column_types.append(f"{col} BIGINT")
-        elif isinstance(sample_value, float):
-            column_types.append(f"{col} FLOAT")
-        elif "time" in col.lower():  # Handle timestamp columns
-            column_types.append(f"{col} TIMESTAMP")
-        else:
-            column_types.append(f"{col} TEXT")
-
-    create_table_query = f"CREATE TABLE IF NOT EXISTS mimiciv_ed.{table_name} ({', '.join(column_types)});"
-    cursor.execute(create_table_query)
-
-def import_csv_to_postgres(csv_path, table_name):
-    """Import a CSV file into PostgreSQL."""
-    conn = psycopg2.connect(**DB_CONFIG)
-    cursor = conn.cursor()
+# Bulk load settings: rows parsed per COPY chunk and rows merged per transaction
+CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "100000"))
+COMMIT_EVERY = int(os.getenv("IMPORT_COMMIT_EVERY", "500000"))
 
-    if not os.path.exists(csv_path):
-        print(f"⚠️ File {csv_path} not found! Skipping...")
+# Parallel import settings: concurrent tables/connections and the resume file
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+CHECKPOINT_FILE = os.getenv("IMPORT_CHECKPOINT_FILE", "import_checkpoints.json")
+
+# Inferred CREATE TABLE statements are written here for review
+DDL_DIR = os.getenv("IMPORT_DDL_DIR", "ddl")
+
+def create_table_if_not_exists(cursor, table_name, csv_path, schema="mimiciv_ed"):
+    """Create the table with types inferred from the whole CSV if it does not exist."""
+    cursor.execute("SELECT to_regclass(%s);", (f"{schema}.{table_name}",))
+    if cursor.fetchone()[0] is not None:
         return
 
-    df = pd.read_csv(csv_path)
+    column_types = infer_csv_schema(csv_path)
+    ddl_path = write_ddl(DDL_DIR, schema, table_name, column_types)
+    print(f"   {table_name}: schema written to {ddl_path}")
+    cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema};")
+    cursor.execute(render_create_table(schema, table_name, column_types))
+
+def create_schemas(conn, schemas):
+    """Create target schemas up front; concurrent CREATE SCHEMA IF NOT EXISTS
+    calls for a missing schema can fail with a unique violation on pg_namespace."""
+    with conn.cursor() as cursor:
+        for schema in sorted(set(schemas)):
+            cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema};")
+    conn.commit()
+
+def merge_staging(cursor, schema, table_name, columns):
+    """Move staged rows into the target table and empty the staging table."""
+    column_list = ', '.join(columns)
+    cursor.execute(
+        f"INSERT INTO {schema}.{table_name} ({column_list}) "
+        f"SELECT {column_list} FROM {schema}.{table_name}_staging ON CONFLICT DO NOTHING;"
+    )
+    cursor.execute(f"TRUNCATE {schema}.{table_name}_staging;")
 
-    # Ensure the table exists before inserting data
-    create_table_if_not_exists(cursor, table_name, df)
+def import_csv_to_postgres(csv_path, table_name, schema="mimiciv_ed", conn=None,
+                           chunksize=CHUNK_SIZE, commit_every=COMMIT_EVERY,
+                           start_row=0, on_commit=None):
+    """Bulk load a CSV file into PostgreSQL with COPY FROM STDIN.
+
+    The file is read in chunks, each chunk is streamed into an unlogged
+    staging table and every ``commit_every`` rows the staging table is merged
+    into the target table and committed. ``start_row`` skips data rows that
+    an earlier run already committed and ``on_commit(rows, chunks)`` is called
+    after every commit. Returns the number of rows read, including skipped ones.
+    """
+    if not os.path.exists(csv_path):
+        print(f"⚠️ File {csv_path} not found! Skipping...")
+        return 0
 
-    for _, row in df.iterrows():
-        columns = ', '.join(row.index)
-        values_placeholders = ', '.join(['%s'] * len(row.values))  # Ensure all values are properly placed
-        escaped_values = [str(v).replace("'", "''") if isinstance(v, str) else v for v in row.values]
-        query = f"INSERT INTO mimiciv_ed.{table_name} ({columns}) VALUES ({values_placeholders}) ON CONFLICT DO NOTHING;"
-        cursor.execute(query, tuple(row.values))
+    own_conn = conn is None
+    if own_conn:
+        conn = psycopg2.connect(**DB_CONFIG)
+    cursor = conn.cursor()
 
+    # Ensure the table exists before loading data
+    create_table_if_not_exists(cursor, table_name, csv_path, schema)
+    cursor.execute(
+        f"CREATE UNLOGGED TABLE IF NOT EXISTS {schema}.{table_name}_staging "
+        f"(LIKE {schema}.{table_name});"
+    )
+    cursor.execute(f"TRUNCATE {schema}.{table_name}_staging;")
+    conn.commit()
 
+    # Values are passed through as text so COPY parses them with the column types.
+    # Resuming skips the header plus ``start_row`` CSV records (not physical lines)
+    # with an integer skiprows instead of a list of row numbers.
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    reader = pd.read_csv(csv_path, chunksize=chunksize, dtype=str,
+                         keep_default_na=False, na_values=[""],
+                         header=None, names=header, skiprows=start_row + 1)
+    started = time.perf_counter()
+    total_rows = start_row
+    staged_rows = 0
+    chunks = start_row // chunksize
+    columns = []
+    for chunk in reader:
+        columns = list(chunk.columns)
+        buffer = io.StringIO()
+        chunk.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {schema}.{table_name}_staging ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv);",
+            buffer,
+        )
+        total_rows += len(chunk)
+        staged_rows += len(chunk)
+        chunks += 1
 
+        if staged_rows >= commit_every:
+            merge_staging(cursor, schema, table_name, columns)
+            conn.commit()
+            if on_commit:
+                on_commit(total_rows, chunks)
+            elapsed = time.perf_counter() - started
+            print(f"   {table_name}: {total_rows:,} rows ({(total_rows - start_row) / max(elapsed, 1e-9):,.0f} rows/s)")
+            staged_rows = 0
 
+    if columns:
+        merge_staging(cursor, schema, table_name, columns)
+    cursor.execute(f"DROP TABLE IF EXISTS {schema}.{table_name}_staging;")
     conn.commit()
+    if on_commit:
+        on_commit(total_rows, chunks)
     cursor.close()
-    conn.close()
-    print(f"✅ Imported {csv_path} into {table_name}")
+    if own_conn:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Imported {csv_path} into {table_name}: {total_rows:,} rows in {elapsed:.1f}s "
+          f"({(total_rows - start_row) / max(elapsed, 1e-9):,.0f} rows/s)")
+    return total_rows
+
+class ImportCheckpoints:
+    """Per-table progress of an import run, persisted as JSON so it can resume."""
+
+    def __init__(self, path=CHECKPOINT_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    @staticmethod
+    def file_signature(csv_path):
+        stat = os.stat(csv_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def resume_row(self, key, csv_path):
+        """Committed row count for ``key``, or 0 if the CSV changed since then."""
+        with self.lock:
+            entry = self.state.get(key)
+        if not entry or entry.get("file") != self.file_signature(csv_path):
+            return 0
+        return entry["rows"]
+
+    def is_complete(self, key, csv_path):
+        with self.lock:
+            entry = self.state.get(key)
+        return bool(entry) and entry.get("complete", False) \
+            and entry.get("file") == self.file_signature(csv_path)
+
+    def record(self, key, csv_path, rows, chunks):
+        with self.lock:
+            self.state[key] = {
+                "file": self.file_signature(csv_path),
+                "rows": rows,
+                "chunks": chunks,
+                "complete": False,
+            }
+            self._save()
+
+    def mark_complete(self, key):
+        with self.lock:
+            self.state[key]["complete"] = True
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def import_table_with_checkpoint(pool, checkpoints, csv_path, table_name, schema):
+    """Import one table on a pooled connection, resuming from its checkpoint."""
+    key = f"{schema}.{table_name}"
+    if checkpoints.is_complete(key, csv_path):
+        return {"table": key, "status": "skipped", "rows": 0, "seconds": 0.0}
+
+    start_row = checkpoints.resume_row(key, csv_path)
+    conn = pool.getconn()
+    started = time.perf_counter()
+    try:
+        total_rows = import_csv_to_postgres(
+            csv_path, table_name, schema=schema, conn=conn, start_row=start_row,
+            on_commit=lambda rows, chunks: checkpoints.record(key, csv_path, rows, chunks),
+        )
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+    checkpoints.mark_complete(key)
+    # Cached dashboard results that read this table are stale now
+    invalidate_tables([key])
+    return {
+        "table": key,
+        "status": "resumed" if start_row else "loaded",
+        "rows": total_rows - start_row,
+        "seconds": time.perf_counter() - started,
+    }
+
+def run_parallel_import(folders, workers=IMPORT_WORKERS, checkpoint_file=CHECKPOINT_FILE):
+    """Import every table in ``folders`` concurrently over a bounded connection pool."""
+    jobs = []
+    for folder, tables in folders.items():
+        for table in tables:
+            csv_path = os.path.join(base_path, folder, f"{table}.csv")
+            if not os.path.exists(csv_path):
+                print(f"⚠️ File {csv_path} not found! Skipping...")
+                continue
+            jobs.append((csv_path, table, f"mimiciv_{folder}"))
+    if not jobs:
+        return []
+
+    checkpoints = ImportCheckpoints(checkpoint_file)
+    workers = max(1, min(workers, len(jobs)))
+    pool = psycopg2.pool.ThreadedConnectionPool(1, workers, **DB_CONFIG)
+    results = []
+    try:
+        conn = pool.getconn()
+        try:
+            create_schemas(conn, [schema for _, _, schema in jobs])
+        finally:
+            pool.putconn(conn)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(import_table_with_checkpoint, pool, checkpoints, *job): job
+                for job in jobs
+            }
+            for future in as_completed(futures):
+                csv_path, table, schema = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"❌ {schema}.{table} failed: {e}")
+                    results.append({"table": f"{schema}.{table}", "status": "failed", "rows": 0, "seconds": 0.0})
+    finally:
+        pool.closeall()
+
+    print("\n📊 Import summary")
+    for result in sorted(results, key=lambda r: r["table"]):
+        rate = result["rows"] / result["seconds"] if result["seconds"] else 0
+        print(f"   {result['table']:<28} {result['status']:<8} {result['rows']:>12,} rows "
+              f"{result['seconds']:>8.1f}s {rate:>12,.0f} rows/s")
+    return results
 
 # Define folders and tables
-data_folders = {"ed": ["diagnosis", "edstays", "medrecon","pyxis","triage","vitalsign"]}
+data_folders = {
+    "ed": ["diagnosis", "edstays", "medrecon","pyxis","triage","vitalsign"],
+    "hosp": ["patients", "admissions", "diagnoses_icd", "d_icd_diagnoses"],
+    "icu": ["icustays"],
+}
 
-for folder, tables in data_folders.items():
-    for table in tables:
-        csv_path = os.path.join(base_path, folder, f"{table}.csv")
-        import_csv_to_postgres(csv_path, table)
+if __name__ == "__main__":
+    run_parallel_import(data_folders)
+
+    # Keys, indexes and statistics for the freshly loaded tables, then the
+    # viewer's sidebar filter dictionary
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        provision(conn)
+        build_filter_dictionary(conn)
+    finally:
+        conn.close()
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from build_cohort import file_signatures, inputs_version, read_manifest, write_manifest
+from datasets import DATA_DIR, FEATURE_PREFIX, dataset_columns, dataset_exists, dataset_path, iter_dataset, parquet_path, read_dataset, subject_filter, write_dataset
+from stay_events import SubjectIntervals
+
+# Makine öğrenmesi için başvuru (stay_id) başına laboratuvar özellik matrisi.
+# Her test (itemid) ve zaman penceresi için min, max, ortalama, son değer,
+# sonuç sayısı ve anormal sonuç oranı hesaplanır. Lab dosyası parça parça
+# okunur; her sonuç hastanın pencereleri kapsayan en son başvurusuna ikili
+# aramayla atanır (stay_events.py), ardından parça (başvuru, pencere, test)
+# düzeyinde kısmi toplamlara indirgenir
+# ve kısmi toplamlar birleştirilir, yani bellekte hiçbir zaman dosyanın tamamı
+# bulunmaz. Girdiler ve ayarlar değişmedikçe matris yeniden hesaplanmaz.
+
+# Pencere adı=başlangıç:bitiş (acil servise geliş zamanına göre saat)
+LAB_WINDOWS = os.getenv("LAB_WINDOWS", "24h=0:24,72h=0:72")
+# En sık ölçülen kaç test özellik olur (0: tümü)
+LAB_TOP_ITEMS = int(os.getenv("LAB_TOP_ITEMS", "50"))
+LAB_BATCH_ROWS = int(os.getenv("LAB_BATCH_ROWS", "500000"))
+# Kısmi toplamlar bu satır sayısını aşınca ara birleştirme yapılır
+LAB_PARTIAL_ROWS = int(os.getenv("LAB_PARTIAL_ROWS", "2000000"))
+
+LAB_COLUMNS = ["subject_id", "itemid", "charttime", "valuenum", "flag", "test_name"]
+REQUIRED_LAB_COLUMNS = ["subject_id", "itemid", "charttime"]
+STAY_COLUMNS = ["subject_id", "stay_id", "intime"]
+GROUP_KEYS = ["stay_id", "window", "itemid"]
+STATS = ["min", "max", "mean", "last", "count", "abnormal_rate"]
+
+def parse_windows(spec=LAB_WINDOWS):
+    """"24h=0:24,72h=0:72" → [("24h", 0.0, 24.0), ("72h", 0.0, 72.0)]"""
+    windows = []
+    for part in spec.split(","):
+        name, span = part.strip().split("=")
+        start, end = (float(value) for value in span.split(":"))
+        windows.append((name, start, end))
+    return windows
+
+def feature_inputs(cohort):
+    return {"stays": f"{cohort}_patients", "labs": f"{cohort}_labs"}
+
+def feature_paths(cohort, data_dir=DATA_DIR):
+    name = f"{cohort}_lab_features"
+    return name, parquet_path(name, data_dir), os.path.join(data_dir, f"{name}.json")
+
+def feature_version(paths, windows, top_items):
+    """Girdi içerikleri + pencere ve test sayısı ayarlarından sürüm özeti."""
+    payload = {"inputs": inputs_version(paths), "windows": windows, "top_items": top_items}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def window_intervals(stays, windows):
+    """Her başvuru için tüm pencereleri kapsayan [geliş + en erken, geliş + en geç] aralığı."""
+    first = min(start for _, start, _ in windows)
+    last = max(end for _, _, end in windows)
+    return SubjectIntervals(
+        stays["subject_id"],
+        stays["intime"] + pd.Timedelta(hours=first),
+        stays["intime"] + pd.Timedelta(hours=last),
+    )
+
+def partial_stats(chunk, stays, intervals, windows):
+    """Lab parçasını başvurulara ata, (başvuru, pencere, test) kısmi toplamları döndür."""
+    chunk = chunk.dropna(subset=["subject_id", "itemid", "charttime"])
+    positions = intervals.lookup(chunk["subject_id"], chunk["charttime"])
+    rows = chunk[positions >= 0].astype({"itemid": "int64"})
+    positions = positions[positions >= 0]
+    if rows.empty:
+        return None
+    hours = (rows["charttime"].to_numpy() - stays["intime"].to_numpy()[positions]) / np.timedelta64(1, "h")
+    stay_ids = stays["stay_id"].to_numpy()[positions]
+    values = rows["valuenum"].to_numpy(dtype="float64", na_value=np.nan)
+    abnormal = (rows["flag"] == "abnormal").fillna(False).to_numpy(dtype="int64")
+    parts = []
+    for position, (_, start, end) in enumerate(windows):
+        inside = (hours >= start) & (hours < end)
+        if not inside.any():
+            continue
+        parts.append(pd.DataFrame({
+            "stay_id": stay_ids[inside],
+            "window": np.int8(position),
+            "itemid": rows["itemid"].to_numpy()[inside],
+            "charttime": rows["charttime"].to_numpy()[inside],
+            "value": values[inside],
+            "abnormal": abnormal[inside],
+        }))
+    if not parts:
+        return None
+    frame = pd.concat(parts, ignore_index=True)
+    stats = frame.groupby(GROUP_KEYS, sort=False).agg(
+        min=("value", "min"), max=("value", "max"), sum=("value", "sum"),
+        count=("value", "count"), results=("value", "size"), abnormal=("abnormal", "sum"),
+    )
+    # Son değer: sayısal sonucu olan en geç ölçüm
+    latest = (
+        frame[~np.isnan(frame["value"].to_numpy())]
+        .sort_values("charttime", kind="stable")
+        .drop_duplicates(GROUP_KEYS, keep="last")
+        .set_index(GROUP_KEYS)[["charttime", "value"]]
+        .rename(columns={"charttime": "last_time", "value": "last"})
+    )
+    return stats.join(latest).reset_index()
+
+def combine_stats(parts):
+    """Kısmi toplamları tek (başvuru, pencere, test) satırına indir."""
+    frame = pd.concat(parts, ignore_index=True)
+    stats = frame.groupby(GROUP_KEYS, sort=False).agg(
+        min=("min", "min"), max=("max", "max"), sum=("sum", "sum"),
+        count=("count", "sum"), results=("results", "sum"), abnormal=("abnormal", "sum"),
+    )
+    latest = (
+        frame.dropna(subset=["last_time"])
+        .sort_values("last_time", kind="stable")
+        .drop_duplicates(GROUP_KEYS, keep="last")
+        .set_index(GROUP_KEYS)[["last_time", "last"]]
+    )
+    return stats.join(latest).reset_index()
+
+def feature_frame(stats, stays, windows, top_items):
+    """Kısmi toplamları başvuru başına tek satırlık geniş matrise çevir.
+
+    Sütunlar ``lab_<itemid>_<pencere>_<istatistik>``; lab sonucu olmayan
+    başvurularda sayılar 0, diğer istatistikler boştur.
+    """
+    frequency = stats.groupby("itemid")["results"].sum().sort_values(ascending=False, kind="stable")
+    items = frequency.index if top_items <= 0 else frequency.index[:top_items]
+    keys = stays[["subject_id", "stay_id"]].reset_index(drop=True)
+    if len(items) == 0:
+        return keys, items
+    stats = stats[stats["itemid"].isin(items)]
+    values = pd.DataFrame({
+        "stay_id": stats["stay_id"].to_numpy(),
+        "itemid": stats["itemid"].to_numpy(),
+        "window": stats["window"].to_numpy(),
+        "min": stats["min"].to_numpy(dtype="float32"),
+        "max": stats["max"].to_numpy(dtype="float32"),
+        "mean": (stats["sum"] / stats["count"].where(stats["count"] > 0)).to_numpy(dtype="float32"),
+        "last": stats["last"].to_numpy(dtype="float32", na_value=np.nan),
+        "count": stats["count"].to_numpy(dtype="int32"),
+        "abnormal_rate": (stats["abnormal"] / stats["results"]).to_numpy(dtype="float32"),
+    })
+    wide = values.set_index(["stay_id", "itemid", "window"])[STATS].unstack(["itemid", "window"])
+    columns = [
+        (stat, itemid, position)
+        for itemid in sorted(items)
+        for position in range(len(windows))
+        for stat in STATS
+    ]
+    wide = wide.reindex(columns=pd.MultiIndex.from_tuples(columns), index=stays["stay_id"].to_numpy())
+    wide.columns = [f"{FEATURE_PREFIX}{itemid}_{windows[position][0]}_{stat}" for stat, itemid, position in columns]
+    wide = wide.astype("float32")
+    count_columns = [column for column in wide.columns if column.endswith("_count")]
+    wide[count_columns] = wide[count_columns].fillna(0).astype("int32")
+    return pd.concat([keys, wide.reset_index(drop=True)], axis=1), items
+
+def build_lab_features(cohort="depress", windows_spec=LAB_WINDOWS, top_items=LAB_TOP_ITEMS, data_dir=DATA_DIR):
+    """``<kohort>_lab_features`` kümesini oluştur ve sürümünü manifest'e kaydet."""
+    started = time.perf_counter()
+    inputs = feature_inputs(cohort)
+    name, output_path, manifest_path = feature_paths(cohort, data_dir)
+    windows = parse_windows(windows_spec)
+    paths = {key: dataset_path(dataset, data_dir) for key, dataset in inputs.items()}
+    version = feature_version(paths, windows, top_items)
+
+    stays = read_dataset(inputs["stays"], columns=STAY_COLUMNS, data_dir=data_dir)
+    stays = stays.dropna(subset=["subject_id", "stay_id", "intime"]).drop_duplicates("stay_id")
+    stays = stays.astype({"subject_id": "int64", "stay_id": "int64"})
+    stays = stays.sort_values(["subject_id", "stay_id"]).reset_index(drop=True)
+    # Pencereleri örtüşen başvurularda sonuç yalnızca en son başvuruya sayılır
+    intervals = window_intervals(stays, windows)
+
+    lab_columns = [column for column in LAB_COLUMNS if column in dataset_columns(inputs["labs"], data_dir)]
+    parts, part_rows, lab_rows = [], 0, 0
+    test_names = {}
+    # Başvurusu olan hastaların sonuçları okunur; subject_id'ye göre sıralı kümede diğer satır grupları atlanır
+    labs = iter_dataset(inputs["labs"], columns=lab_columns, batch_size=LAB_BATCH_ROWS,
+                        filters=subject_filter(stays["subject_id"]), data_dir=data_dir)
+    for chunk in labs:
+        lab_rows += len(chunk)
+        for column in ("valuenum", "flag"):
+            if column not in chunk.columns:
+                chunk[column] = np.nan
+        if "test_name" in chunk.columns:
+            names = chunk.dropna(subset=["itemid", "test_name"]).drop_duplicates("itemid")
+            for itemid, test_name in zip(names["itemid"].tolist(), names["test_name"].tolist()):
+                test_names.setdefault(int(itemid), test_name)
+        part = partial_stats(chunk, stays, intervals, windows)
+        if part is None:
+            continue
+        parts.append(part)
+        part_rows += len(part)
+        if part_rows > LAB_PARTIAL_ROWS:
+            parts = [combine_stats(parts)]
+            part_rows = len(parts[0])
+
+    stats = combine_stats(parts) if parts else pd.DataFrame(columns=GROUP_KEYS + ["min", "max", "sum", "count", "results", "abnormal", "last_time", "last"])
+    features, items = feature_frame(stats, stays, windows, top_items)
+    write_dataset(features, name, data_dir)
+    write_manifest({
+        "version": version,
+        "rows": len(features),
+        "windows": {window: [start, end] for window, start, end in windows},
+        "top_items": top_items,
+        "items": {str(itemid): test_names.get(int(itemid)) for itemid in sorted(items)},
+        "inputs": file_signatures(paths),
+    }, manifest_path)
+    print(f"✅ {output_path}: {len(features):,} başvuru × {features.shape[1] - 2:,} özellik "
+          f"({lab_rows:,} lab satırı, {len(items):,} test, sürüm {version}, {time.perf_counter() - started:.1f}s)")
+    return version
+
+def ensure_lab_features(cohort="depress", windows_spec=LAB_WINDOWS, top_items=LAB_TOP_ITEMS, data_dir=DATA_DIR):
+    """Özellik matrisi güncelse sürümünü döndür, değilse yeniden oluştur.
+
+    Girdilerden biri yoksa veya lab dosyasında gerekli sütunlar yoksa (ör.
+    indirilmemiş git-lfs işaretçisi) None döner. Ayarlar değiştiğinde de matris
+    yeniden oluşur.
+    """
+    inputs = feature_inputs(cohort)
+    if not all(dataset_exists(dataset, data_dir) for dataset in inputs.values()):
+        return None
+    if not set(REQUIRED_LAB_COLUMNS) <= set(dataset_columns(inputs["labs"], data_dir)):
+        print(f"⚠️ {dataset_path(inputs['labs'], data_dir)}: {', '.join(REQUIRED_LAB_COLUMNS)} sütunları yok, lab özellikleri oluşturulmadı")
+        return None
+    _, output_path, manifest_path = feature_paths(cohort, data_dir)
+    manifest = read_manifest(manifest_path)
+    if manifest is None or not os.path.exists(output_path):
+        return build_lab_features(cohort, windows_spec, top_items, data_dir)
+    paths = {key: dataset_path(dataset, data_dir) for key, dataset in inputs.items()}
+    windows = parse_windows(windows_spec)
+    settings = {"windows": {window: [start, end] for window, start, end in windows}, "top_items": top_items}
+    if manifest.get("inputs") == file_signatures(paths) and manifest.get("windows") == settings["windows"] \
+            and manifest.get("top_items", top_items) == top_items:
+        return manifest["version"]
+    version = feature_version(paths, windows, top_items)
+    if version != manifest.get("version"):
+        return build_lab_features(cohort, windows_spec, top_items, data_dir)
+    # Yalnızca dosya zamanları değişmiş; bir dahaki kontrolde özet hesaplanmasın
+    manifest["inputs"] = file_signatures(paths)
+    write_manifest(manifest, manifest_path)
+    return manifest["version"]
+
+def load_feature_matrix(cohort="depress", data_dir=DATA_DIR):
+    """Eğitim işleri için (anahtarlar, sütun adları, float32 matris)."""
+    name, _, _ = feature_paths(cohort, data_dir)
+    df = read_dataset(name, data_dir=data_dir)
+    columns = [column for column in df.columns if column.startswith(FEATURE_PREFIX)]
+    matrix = df[columns].to_numpy(dtype="float32", na_value=np.nan)
+    return df[["subject_id", "stay_id"]], columns, matrix
+
+if __name__ == "__main__":
+    # python lab_features.py [kohort]  (varsayılan: depress)
+    cohort = sys.argv[1] if len(sys.argv) > 1 else "depress"
+    missing = [dataset for dataset in feature_inputs(cohort).values() if not dataset_exists(dataset)]
+    if missing:
+        print(f"❌ Lab özellikleri oluşturulamadı; bulunamayan kümeler: {', '.join(missing)}")
+        sys.exit(1)
+    # Lab kümesinde gerekli sütunlar yoksa (ör. git-lfs işaretçisi) uyarı yazdırılıp çıkılır; hata sayılmaz
+    ensure_lab_features(cohort)
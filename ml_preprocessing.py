@@ -1,43 +1,44 @@
 # Makine Öğrenmesi için veri hazırlık scripti
 import pandas as pd
-import os
-
-# Gerekli dosyaları yükle
-patients_df = pd.read_csv("data/depress_patients.csv")
-admissions_df = pd.read_csv("data/admissions.csv")
-diag_df = pd.read_csv("data/depress_diagnoses.csv")
-labs_df = pd.read_csv("data/depress_labs.csv")
-
-# hadm_id sütunlarını normalize et, varsa uygula
-for df in [patients_df, admissions_df]:
-    if 'hadm_id' in df.columns:
-        df['hadm_id'] = df['hadm_id'].astype(str).str.extract(r'(\d+)')
-
-if 'hadm_id' in diag_df.columns:
-    diag_df['hadm_id'] = diag_df['hadm_id'].astype(str).str.extract(r'(\d+)')
-
-# Gerekli birleştirmeleri yap
-if 'hadm_id' in diag_df.columns and 'hadm_id' in patients_df.columns:
-    base = pd.merge(patients_df, admissions_df, on=["subject_id", "hadm_id"], how="left")
-    base = pd.merge(base, diag_df, on=["subject_id", "hadm_id"], how="left")
-else:
-    base = pd.merge(patients_df, admissions_df, on=["subject_id"], how="left")
-    base = pd.merge(base, diag_df, on=["subject_id"], how="left")
-
-# Laboratuvar sonuçlarını ortalama değerler olarak grupla
-if not labs_df.empty:
-    lab_agg = labs_df.groupby("subject_id")["valuenum"].mean().reset_index()
-    lab_agg.rename(columns={"valuenum": "lab_mean"}, inplace=True)
-    base = pd.merge(base, lab_agg, on="subject_id", how="left")
+
+from datasets import load_dataset, write_dataset
+from lab_features import ensure_lab_features
+
+# Gerekli veri kümelerini küçük tiplerle yükle (kimlikler şemada tamsayı
+# olduğundan hadm_id ayrıca normalize edilmeden birleştirilebilir)
+patients_df = load_dataset("depress_patients")
+admissions_df = load_dataset("admissions")
+diag_df = load_dataset("depress_diagnoses")
+
+# Başvuru başına pencereli laboratuvar özellikleri (lab_features.py); matris
+# girdiler ve ayarlar değişmedikçe önbellekteki sürümünden okunur
+if ensure_lab_features("depress") is not None:
+    lab_features_df = load_dataset("depress_lab_features").drop(columns=["subject_id"])
+    patients_df = pd.merge(patients_df, lab_features_df, on="stay_id", how="left")
+
+# Her başvuru yalnızca kendi yatışı ve kendi tanılarıyla birleştirilir; ortak
+# kimlik yoksa hasta düzeyine düşülür (diğer başvuruların kayıtları karışır)
+def join_keys(left, right, candidates):
+    return next(keys for keys in candidates if set(keys) <= set(left.columns) & set(right.columns))
+
+admission_keys = join_keys(patients_df, admissions_df, [["subject_id", "hadm_id"], ["subject_id"]])
+base = pd.merge(patients_df, admissions_df, on=admission_keys, how="left")
+diag_keys = join_keys(base, diag_df, [["subject_id", "stay_id"], ["subject_id", "hadm_id"], ["subject_id"]])
+base = pd.merge(base, diag_df, on=diag_keys, how="left")
+
 
 # Gereksiz sütunları temizle
 base = base.drop(columns=["icd_title", "long_title"], errors="ignore")
 
 # Eksik verileri işle
 base = base.dropna(subset=["disposition"])  # hedef değişken eksikse çıkar
-base.fillna("unknown", inplace=True)
+# Sayısal/zaman sütunları tiplerini korusun; yalnızca metin sütunları doldurulur
+for column in base.select_dtypes(include=["object", "category"]).columns:
+    if isinstance(base[column].dtype, pd.CategoricalDtype) and "unknown" not in base[column].cat.categories:
+        base[column] = base[column].cat.add_categories("unknown")
+    base[column] = base[column].fillna("unknown")
 
 # Veriyi kaydet
-base.to_csv("data/ml_input_data.csv", index=False)
+output_path = write_dataset(base, "ml_input_data")
 
-print("Makine öğrenmesi için veri hazırlandı ve 'ml_input_data.csv' dosyasına kaydedildi.")
+print(f"Makine öğrenmesi için veri hazırlandı ve '{output_path}' dosyasına kaydedildi.")
@@ -0,0 +1,157 @@
+import os
+import re
+import sqlite3
+import time
+
+import pandas as pd
+
+from build_cohort import file_signatures
+from datasets import dataset_columns, dataset_path, iter_dataset
+
+# Klinik notlar için disk üzerinde SQLite FTS5 ters dizini. Sıralı (bm25),
+# tırnaklı ifade ("chest pain") ve AND/OR/NOT sorgularını destekler; yeni
+# notlar note_id'ye göre eklenir, mevcutlar yeniden dizinlenmez.
+NOTES_INDEX_PATH = "data/notes_index.sqlite"
+
+# Not veri kümeleri (datasets.py)
+NOTE_SOURCES = [
+    "depress_notes",
+    "neuro_psych_notes",
+]
+NOTE_COLUMNS = ["note_id", "subject_id", "hadm_id", "note_type", "charttime", "category"]
+
+INDEX_CHUNK_SIZE = 5000
+SEARCH_LIMIT = 50
+
+def connect(index_path=NOTES_INDEX_PATH):
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS notes (
+            id INTEGER PRIMARY KEY,
+            note_id TEXT NOT NULL UNIQUE,
+            subject_id INTEGER,
+            hadm_id INTEGER,
+            note_type TEXT,
+            charttime TEXT,
+            category TEXT
+        );
+        CREATE INDEX IF NOT EXISTS notes_subject_idx ON notes (subject_id);
+        CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(text, tokenize = 'porter unicode61');
+        CREATE TABLE IF NOT EXISTS index_sources (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime REAL
+        );
+    """)
+    return conn
+
+def _nullable_int(value):
+    return None if pd.isna(value) else int(value)
+
+def _nullable_text(value):
+    return None if pd.isna(value) else str(value)
+
+def index_notes(conn, notes_df):
+    """Dizinde olmayan notları ekle; eklenen not sayısını döndür."""
+    added = 0
+    for note in notes_df.itertuples(index=False):
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO notes (note_id, subject_id, hadm_id, note_type, charttime, category) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                str(note.note_id),
+                _nullable_int(note.subject_id),
+                _nullable_int(note.hadm_id),
+                _nullable_text(note.note_type),
+                _nullable_text(note.charttime),
+                _nullable_text(note.category),
+            ),
+        )
+        if cursor.rowcount:
+            conn.execute(
+                "INSERT INTO notes_fts (rowid, text) VALUES (?, ?)",
+                (cursor.lastrowid, _nullable_text(note.text) or ""),
+            )
+            added += 1
+    return added
+
+def index_source(conn, dataset, chunksize=INDEX_CHUNK_SIZE):
+    """Bir not kümesini parça parça dizine ekle ve dosya imzasını kaydet."""
+    started = time.perf_counter()
+    source_path = dataset_path(dataset)
+    header = dataset_columns(dataset)
+    if "note_id" not in header or "text" not in header:
+        print(f"⚠️ {source_path}: note_id/text sütunu yok, dizinlenmedi")
+        return 0
+    usecols = [col for col in NOTE_COLUMNS + ["text"] if col in header]
+    added = 0
+    for chunk in iter_dataset(dataset, columns=usecols, batch_size=chunksize):
+        chunk = chunk.reindex(columns=NOTE_COLUMNS + ["text"])
+        added += index_notes(conn, chunk)
+        conn.commit()
+    size, mtime = file_signatures({source_path: source_path})[source_path]
+    conn.execute("INSERT OR REPLACE INTO index_sources (path, size, mtime) VALUES (?, ?, ?)", (source_path, size, mtime))
+    conn.commit()
+    print(f"✅ {source_path}: {added:,} yeni not dizinlendi ({time.perf_counter() - started:.1f}s)")
+    return added
+
+def update_notes_index(sources=NOTE_SOURCES, index_path=NOTES_INDEX_PATH):
+    """Boyutu veya zamanı değişen kaynakları dizine ekle; toplam yeni not sayısı."""
+    conn = connect(index_path)
+    try:
+        known = {path: [size, mtime] for path, size, mtime in conn.execute("SELECT path, size, mtime FROM index_sources")}
+        added = 0
+        for dataset in sources:
+            path = dataset_path(dataset)
+            signature = file_signatures({path: path})[path]
+            if signature is None or known.get(path) == signature:
+                continue
+            added += index_source(conn, dataset)
+        return added
+    finally:
+        conn.close()
+
+def _normalize_query(query):
+    """FTS5'te NOT ikili bir işleçtir; alışılmış "a AND NOT b" yazımını kabul et."""
+    return re.sub(r"\bAND\s+NOT\b", "NOT", query.strip())
+
+def _quote_terms(query):
+    """FTS5 söz dizimine uymayan metni tırnaklı terimlerin AND'ine çevir."""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+def search_notes(query, subject_id=None, limit=SEARCH_LIMIT, index_path=NOTES_INDEX_PATH):
+    """bm25 ile sıralı eşleşmeler ve vurgulu metin parçaları.
+
+    Sorgu FTS5 söz dizimiyle yorumlanır; geçersizse terimler tırnaklanarak
+    yeniden denenir.
+    """
+    if not query.strip() or not os.path.exists(index_path):
+        return pd.DataFrame(columns=NOTE_COLUMNS + ["snippet", "score"])
+    sql = """
+        SELECT notes.note_id, notes.subject_id, notes.hadm_id, notes.note_type, notes.charttime, notes.category,
+               snippet(notes_fts, 0, '**', '**', ' … ', 16) AS snippet,
+               bm25(notes_fts) AS score
+        FROM notes_fts
+        JOIN notes ON notes.id = notes_fts.rowid
+        WHERE notes_fts MATCH ?
+    """
+    query = _normalize_query(query)
+    params = []
+    if subject_id is not None:
+        sql += " AND notes.subject_id = ?"
+        params.append(int(subject_id))
+    sql += " ORDER BY score LIMIT ?"
+    params.append(int(limit))
+    conn = sqlite3.connect(index_path)
+    try:
+        try:
+            return pd.read_sql_query(sql, conn, params=[query] + params)
+        except (sqlite3.OperationalError, pd.errors.DatabaseError):
+            return pd.read_sql_query(sql, conn, params=[_quote_terms(query)] + params)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    update_notes_index()
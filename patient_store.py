@@ -0,0 +1,150 @@
+import json
+import os
+import time
+
+import numpy as np
+import pyarrow as pa
+
+from build_cohort import file_signatures
+from datasets import compact_frame, dataset_columns, dataset_exists, dataset_path, frame_memory, memory_report, read_dataset, subject_filter, to_pandas
+
+# Hasta detay panelleri için subject_id'ye göre sıralı Arrow IPC dosyaları ve
+# subject_id → satır aralığı dizini. Dosya bellek eşlemeli açıldığından bir
+# hastanın satırları okunurken dosyanın geri kalanına dokunulmaz.
+STORE_DIR = "data/patient_store"
+# Depoya yalnızca bu kohortun hastaları alınır
+COHORT_DATASET = "depress_patients"
+
+# Panel adı → veri kümesi adı (datasets.py)
+DETAIL_SOURCES = {
+    "labs": "depress_labs",
+    "meds": "depress_meds",
+    "medrecon": "depress_medrecon",
+    "pyxis": "depress_pyxis",
+    "notes": "depress_notes",
+}
+
+def store_paths(name, store_dir=STORE_DIR):
+    base = os.path.join(store_dir, name)
+    return f"{base}.arrow", f"{base}.index.npz", f"{base}.json"
+
+def cohort_filter():
+    """Kohort hastalarıyla sınırlayan filtre; kohort kümesi yoksa None (tüm satırlar)."""
+    if not dataset_exists(COHORT_DATASET):
+        return None
+    return subject_filter(read_dataset(COHORT_DATASET, columns=["subject_id"])["subject_id"])
+
+def store_signature(name, dataset):
+    """Kaynak küme ve kohort dosyalarının (boyut, zaman) bilgisi."""
+    signatures = file_signatures({name: dataset_path(dataset), "cohort": dataset_path(COHORT_DATASET)})
+    return [signatures[name], signatures["cohort"]]
+
+def store_version(signature):
+    return "-".join(str(value) for part in signature if part is not None for value in part)
+
+def write_manifest(manifest_path, manifest):
+    with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+def build_patient_store(name, dataset, store_dir=STORE_DIR):
+    """Kümeyi subject_id'ye göre sırala, Arrow IPC olarak yaz ve dizini çıkar.
+
+    subject_id sütunu olmayan dosyalar (ör. indirilmemiş git-lfs işaretçileri)
+    için depo oluşturulmaz ve None döner.
+    """
+    started = time.perf_counter()
+    table_path, index_path, manifest_path = store_paths(name, store_dir)
+    source_path = dataset_path(dataset)
+    signature = store_signature(name, dataset)
+    os.makedirs(store_dir, exist_ok=True)
+    if "subject_id" not in dataset_columns(dataset):
+        print(f"⚠️ {source_path}: subject_id sütunu yok, hasta deposu oluşturulmadı")
+        # Kaynak değişene kadar yeniden denenmesin
+        write_manifest(manifest_path, {"source": source_path, "signature": signature, "rows": None})
+        return None
+    df = read_dataset(dataset, filters=cohort_filter())
+    df = df.dropna(subset=["subject_id"])
+    df["subject_id"] = df["subject_id"].astype("int64")
+    df = df.sort_values("subject_id", kind="stable").reset_index(drop=True)
+    # Kategoriler Arrow sözlük sütunu olarak yazılır; dilimler de kategori döner
+    before = frame_memory(df)
+    df = compact_frame(df)
+    print(memory_report(name, before, frame_memory(df)))
+
+    subject_ids = df["subject_id"].to_numpy()
+    subjects, starts = np.unique(subject_ids, return_index=True)
+    stops = np.append(starts[1:], len(subject_ids))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Sıkıştırmasız yazılır; bellek eşlemeli okumada kopya yapılmaz
+    with pa.OSFile(f"{table_path}.tmp", "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(f"{table_path}.tmp", table_path)
+    with open(f"{index_path}.tmp", "wb") as f:
+        np.savez(f, subjects=subjects, starts=starts, stops=stops)
+    os.replace(f"{index_path}.tmp", index_path)
+
+    write_manifest(manifest_path, {"source": source_path, "signature": signature, "rows": len(df), "patients": len(subjects)})
+    print(f"✅ {table_path}: {len(df):,} satır, {len(subjects):,} hasta ({time.perf_counter() - started:.1f}s)")
+    return signature
+
+def ensure_patient_store(name, dataset=None, store_dir=STORE_DIR):
+    """Depo kaynak küme ile güncelse sürümünü döndür, değilse yeniden oluştur.
+
+    Kaynak yoksa veya depolanamıyorsa None döner. Kaynak CSV'den Parquet'e
+    geçtiğinde ya da kohort değiştiğinde imza değiştiği için depo yeniden oluşturulur.
+    """
+    dataset = dataset or DETAIL_SOURCES[name]
+    if not dataset_exists(dataset):
+        return None
+    table_path, index_path, manifest_path = store_paths(name, store_dir)
+    signature = store_signature(name, dataset)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = None
+    if manifest is not None and manifest.get("signature") == signature:
+        if manifest.get("rows") is None:
+            return None
+        if os.path.exists(table_path):
+            return store_version(signature)
+    signature = build_patient_store(name, dataset, store_dir)
+    return None if signature is None else store_version(signature)
+
+class PatientStore:
+    """Bellek eşlemeli, subject_id dizinli hasta satırları."""
+
+    def __init__(self, name, store_dir=STORE_DIR):
+        table_path, index_path, _ = store_paths(name, store_dir)
+        self.source = pa.memory_map(table_path, "r")
+        self.table = pa.ipc.open_file(self.source).read_all()
+        with np.load(index_path) as index:
+            self.subjects = index["subjects"]
+            self.starts = index["starts"]
+            self.stops = index["stops"]
+
+    def __len__(self):
+        return self.table.num_rows
+
+    @property
+    def nbytes(self):
+        """Eşlenen tablo ve bellekteki dizin boyutu (tablo sayfaları işletim sistemi önbelleğinde paylaşılır)."""
+        return self.table.nbytes + self.subjects.nbytes + self.starts.nbytes + self.stops.nbytes
+
+    def rows(self, subject_id):
+        """Yalnızca bu hastanın satırları; hasta yoksa boş DataFrame."""
+        position = np.searchsorted(self.subjects, subject_id)
+        if position == len(self.subjects) or self.subjects[position] != subject_id:
+            return to_pandas(self.table.schema.empty_table())
+        start, stop = int(self.starts[position]), int(self.stops[position])
+        return to_pandas(self.table.slice(start, stop - start))
+
+if __name__ == "__main__":
+    for name, dataset in DETAIL_SOURCES.items():
+        if dataset_exists(dataset):
+            build_patient_store(name, dataset)
+        else:
+            print(f"⏭️ {dataset_path(dataset)} bulunamadı, atlandı")
@@ -1,68 +1,122 @@
 import pandas as pd
+import numpy as np
 import os
 
+from aggregates import build_kind_cubes, combine_cubes
+from datasets import DatasetWriter, coerce_frame, dataset_schema, iter_csv, write_dataset
+from stream_join import JOIN_BLOCK_MB, Dimension, join_chunk, stream_join
+
 # Klasörleri belirt
 hosp_dir = "hosp"
 ed_dir = "ed"
 data_dir = "data"
 os.makedirs(data_dir, exist_ok=True)
 
+# Bellek: yalnızca boyut tabloları (edstays, triage, patients, admissions,
+# d_icd_diagnoses) tümüyle yüklenir. En büyük tablo olan ED tanıları hiçbir zaman
+# tümüyle okunmaz; JOIN_BLOCK_MB'lık bloklar halinde iki kez taranır. Bloklardan
+# türeyen full_patient ve complaint_diag satırları geldikleri sırayla diske yazılır,
+# sonradan okunup sıralanmaz. Bloklar dışında bellekte ICD kodu başına sayılar,
+# aylık tanı küpü ve triage satırı başına birer bayt eşleşme işareti tutulur.
+diagnosis_path = os.path.join(ed_dir, "diagnosis.csv")
+diagnosis_columns = ["subject_id", "stay_id", "seq_num", "icd_code", "icd_version", "icd_title"]
+diagnosis_block_bytes = JOIN_BLOCK_MB * 1024 * 1024
+
 # Gerekli CSV'leri yükle
 print("CSV dosyaları yükleniyor...")
-diagnosis = pd.read_csv(os.path.join(ed_dir, "diagnosis.csv"))
 edstays = pd.read_csv(os.path.join(ed_dir, "edstays.csv"))
 triage = pd.read_csv(os.path.join(ed_dir, "triage.csv"))
 patients = pd.read_csv(os.path.join(hosp_dir, "patients.csv"))
 admissions = pd.read_csv(os.path.join(hosp_dir, "admissions.csv"))
-d_icd = pd.read_csv(os.path.join(hosp_dir, "d_icd_diagnoses.csv"))
+# ICD kodları metin olarak okunur; sayı gibi görünen kodların baştaki sıfırları korunur
+d_icd = pd.read_csv(os.path.join(hosp_dir, "d_icd_diagnoses.csv"), dtype={"icd_code": str})
 
 # FULL PATIENT
-print("full_patient.csv oluşturuluyor...")
-df_full = diagnosis.merge(edstays, on=["subject_id", "stay_id"], how="left") \
-                 .merge(patients, on="subject_id", how="left") \
-                 .merge(admissions, on="hadm_id", how="left") \
-                 .merge(d_icd, on="icd_code", how="left")
-df_full.to_csv(os.path.join(data_dir, "full_patient.csv"), index=False)
-
-# TOP DIAGNOSES
-print("top_diagnoses.csv oluşturuluyor...")
-df_top = diagnosis.merge(patients, on="subject_id", how="left") \
-                 .merge(d_icd, on="icd_code", how="left")
-top_diag = df_top.groupby(["icd_code", "long_title"]).size().reset_index(name="frequency")
-top_diag = top_diag.sort_values("frequency", ascending=False)
-top_diag.to_csv(os.path.join(data_dir, "top_diagnoses.csv"), index=False)
+# Tanı tablosu parça parça okunur, küçük tablolar bellekte dizinlenip her parçaya
+# eklenir (stream_join.py); her sütun bir kez ve sabit adla yer alır
+print("full_patient oluşturuluyor...")
+full_patient_dimensions = [
+    Dimension("edstays", edstays, ["subject_id", "stay_id"],
+              ["hadm_id", "intime", "outtime", "gender", "race", "arrival_transport", "disposition"]),
+    Dimension("patients", patients, ["subject_id"], ["anchor_age", "anchor_year", "anchor_year_group", "dod"]),
+    Dimension("admissions", admissions, ["subject_id", "hadm_id"],
+              ["admittime", "dischtime", "deathtime", "admission_type", "admission_location", "discharge_location",
+               "insurance", "language", "marital_status", "hospital_expire_flag"]),
+    Dimension("d_icd_diagnoses", d_icd, ["icd_code", "icd_version"], ["long_title"]),
+]
+stream_join(diagnosis_path, diagnosis_columns, full_patient_dimensions, "full_patient", data_dir=data_dir)
 
 # LOS
-print("los.csv oluşturuluyor...")
+print("los oluşturuluyor...")
 edstays["intime"] = pd.to_datetime(edstays["intime"])
 edstays["outtime"] = pd.to_datetime(edstays["outtime"])
 edstays["los_hours"] = (edstays["outtime"] - edstays["intime"]).dt.total_seconds() / 3600
-edstays[["subject_id", "stay_id", "los_hours"]].to_csv(os.path.join(data_dir, "los.csv"), index=False)
+write_dataset(edstays[["subject_id", "stay_id", "los_hours"]], "los", data_dir)
 
 # TREND
-print("trend.csv oluşturuluyor...")
+print("trend oluşturuluyor...")
 edstays["visit_day"] = edstays["intime"].dt.date
 trend = edstays.groupby("visit_day").size().reset_index(name="visits")
-trend.to_csv(os.path.join(data_dir, "trend.csv"), index=False)
+write_dataset(trend, "trend", data_dir)
 
 # TRIAGE
-print("triage.csv kaydediliyor...")
-triage.to_csv(os.path.join(data_dir, "triage.csv"), index=False)
+print("triage kaydediliyor...")
+write_dataset(triage, "triage", data_dir)
 
 # DEMO
-print("demo.csv oluşturuluyor...")
+print("demo oluşturuluyor...")
 demo = admissions.merge(patients, on="subject_id", how="left")
-demo.to_csv(os.path.join(data_dir, "demo.csv"), index=False)
+write_dataset(demo, "demo", data_dir)
 
-# COMPLAINT - DIAGNOSIS
-print("complaint_diag.csv oluşturuluyor...")
-if "chiefcomplaint" in triage.columns:
-    complaint_diag = triage[["subject_id", "stay_id", "chiefcomplaint"]].merge(
-        diagnosis, on=["subject_id", "stay_id"], how="left")
-    complaint_diag = complaint_diag.merge(d_icd, on="icd_code", how="left")
-    complaint_diag = complaint_diag.rename(columns={"chiefcomplaint": "complaint", "long_title": "diagnosis"})
-    complaint_diag.to_csv(os.path.join(data_dir, "complaint_diag.csv"), index=False)
+# TANIDAN TÜRETİLEN KÜMELER
+# Tanı tablosu bir kez daha blok blok taranır; top_diagnoses sayıları, şikâyet-tanı
+# satırları ve aylık tanı küpü her bloktan güncellenir
+print("top_diagnoses, complaint_diag ve tanı küpü oluşturuluyor...")
+has_complaint = "chiefcomplaint" in triage.columns
+if has_complaint:
+    complaints = triage[["subject_id", "stay_id", "chiefcomplaint"]].assign(triage_row=np.arange(len(triage)))
+    # Hiç tanısı olmayan triage satırları da (boş tanıyla) yazılmalı
+    complaint_matched = np.zeros(len(complaints), dtype=bool)
 else:
     print("triage.csv dosyasında 'chiefcomplaint' alanı bulunamadı.")
 
-print("Tüm CSV dosyaları 'data/' klasörüne kaydedildi.")
+def complaint_rows(complaints, diagnoses, how):
+    rows = complaints.merge(diagnoses, on=["subject_id", "stay_id"], how=how)
+    rows = rows.merge(d_icd, on="icd_code", how="left")
+    return rows.rename(columns={"chiefcomplaint": "complaint", "long_title": "diagnosis"})
+
+diagnosis_cube_dimensions = [
+    Dimension("edstays", edstays, ["subject_id", "stay_id"], ["intime", "gender", "disposition"]),
+    Dimension("d_icd_diagnoses", d_icd, ["icd_code", "icd_version"], ["long_title"]),
+]
+code_counts = pd.Series(dtype="int64")
+diagnosis_cubes = {}
+with DatasetWriter("complaint_diag", data_dir) as complaint_writer:
+    for chunk in iter_csv(diagnosis_path, diagnosis_columns, block_size=diagnosis_block_bytes):
+        code_counts = code_counts.add(chunk["icd_code"].value_counts(), fill_value=0)
+        for name, cube in build_kind_cubes("ed_diagnoses", join_chunk(chunk, diagnosis_cube_dimensions)).items():
+            diagnosis_cubes[name] = combine_cubes("ed_diagnoses", [diagnosis_cubes[name], cube]) if name in diagnosis_cubes else cube
+        if has_complaint:
+            rows = complaint_rows(complaints, chunk, "inner")
+            complaint_matched[rows["triage_row"].to_numpy()] = True
+            complaint_writer.write(rows.drop(columns="triage_row"))
+    if has_complaint:
+        no_diagnosis = coerce_frame(pd.DataFrame(columns=diagnosis_columns), dataset_schema(diagnosis_columns))
+        rows = complaint_rows(complaints[~complaint_matched], no_diagnosis, "left")
+        complaint_writer.write(rows.drop(columns="triage_row"))
+
+# TOP DIAGNOSES
+# Kod başına tanı sayısı, koda ait her başlık satırına (ICD-9/10 aynı kod) yazılır
+top_diag = d_icd[["icd_code", "long_title"]].merge(
+    code_counts.astype("int64").rename("frequency").rename_axis("icd_code").reset_index(), on="icd_code")
+top_diag = top_diag.groupby(["icd_code", "long_title"])["frequency"].sum().reset_index()
+top_diag = top_diag.sort_values("frequency", ascending=False, kind="stable")
+write_dataset(top_diag, "top_diagnoses", data_dir)
+
+# AGGREGATION CUBES (panel grafikleri için gün/hafta/ay küpleri)
+print("ED veri küpleri oluşturuluyor...")
+for name, cube in {**build_kind_cubes("ed_stays", edstays), **diagnosis_cubes}.items():
+    write_dataset(cube, name, data_dir)
+    print(f"   {name}: {len(cube):,} satır")
+
+print("Tüm veri kümeleri 'data/' klasörüne Parquet olarak kaydedildi.")
@@ -1,13 +1,9 @@
-import pandas as pd
+from cohort_extract import ExtractSource, extract_cohort, load_cohort_ids
 
-# Dosyaları oku
-depress_patients = pd.read_csv("data/depress_patients.csv")  # major depresif hastalar
-prescriptions = pd.read_csv("data/prescriptions.csv")  # tüm ilaçlar
+# Major depresif hastalar
+subject_ids = load_cohort_ids("depress_patients")
 
-# Yalnızca major depresif hastalara ait ilaçları al
-filtered_meds = prescriptions[prescriptions["subject_id"].isin(depress_patients["subject_id"].unique())]
+# Tüm ilaçlar parça parça okunur; yalnızca major depresif hastalara ait olanlar yazılır
+extract_cohort(subject_ids, [ExtractSource("data/prescriptions.csv")], "depress_meds")
 
-# Yeni dosya olarak kaydet
-filtered_meds.to_csv("data/depress_meds.csv", index=False)
-
-print("depress_meds.csv başarıyla oluşturuldu.")
+print("depress_meds başarıyla oluşturuldu.")
@@ -1,23 +1,22 @@
-import pandas as pd
+from cohort_extract import ExtractSource, extract_cohort, load_cohort_ids
 
-# Dosyaları yükle
-depress_patients = pd.read_csv("data/depress_patients.csv")
-pyxis = pd.read_csv("data/pyxis.csv")
-
-# Filtrele: sadece depresyon hastalarına ait kayıtlar
-filtered_pyxis = pyxis[pyxis['subject_id'].isin(depress_patients['subject_id'].unique())]
+# Depresyon hastalarının kimlikleri
+subject_ids = load_cohort_ids("depress_patients")
 
 # Kolonları yeniden adlandır (uygulamadaki görsel tutarlılık için)
-filtered_pyxis = filtered_pyxis.rename(columns={
-    "charttime": "starttime",
-    "name": "medication"
-})
-
-# İsteğe bağlı: sadece kullanılan kolonları tut
-columns_to_keep = ["subject_id", "stay_id", "starttime", "medication"]
-filtered_pyxis = filtered_pyxis[columns_to_keep]
+def rename_columns(chunk):
+    return chunk.rename(columns={
+        "charttime": "starttime",
+        "name": "medication"
+    })
 
-# Kaydet
-filtered_pyxis.to_csv("data/depress_pyxis.csv", index=False)
+# Filtrele: sadece depresyon hastalarına ait kayıtlar, yalnızca kullanılan kolonlar
+pyxis = ExtractSource(
+    "data/pyxis.csv",
+    usecols=["subject_id", "stay_id", "charttime", "name"],
+    transform=rename_columns,
+    columns=["subject_id", "stay_id", "starttime", "medication"],
+)
+extract_cohort(subject_ids, [pyxis], "depress_pyxis")
 
-print("✅ depress_pyxis.csv dosyası başarıyla oluşturuldu.")
+print("✅ depress_pyxis veri kümesi başarıyla oluşturuldu.")
@@ -1,31 +1,25 @@
 import pandas as pd
 
-# Nöropsikiyatrik hastaların olduğu dosyayı yükle
-neuro_df = pd.read_csv("data/depress_patients.csv")
-subject_ids = set(neuro_df["subject_id"])  # Hızlı filtreleme için set'e çeviriyoruz
+from cohort_extract import ExtractSource, extract_cohort, load_cohort_ids
+
+# Nöropsikiyatrik hastaların subject_id'lerini al (hızlı filtreleme için set)
+subject_ids = load_cohort_ids("depress_patients")
 
 # Yalnızca gerekli sütunları belirleyin
 cols = ["subject_id", "hadm_id", "charttime", "itemid", "value", "valuenum", "valueuom", "flag"]
+dtypes = {"value": "str", "valueuom": "str", "flag": "str"}
 
-# labevents.csv dosyasını parça parça oku
-chunksize = 100000
-filtered_chunks = []
-
-for chunk in pd.read_csv("data/labevents.csv", usecols=cols, chunksize=chunksize):
-    # Nöropsikiyatrik hastaları filtrele
-    filtered_chunk = chunk[chunk["subject_id"].isin(subject_ids)]
-    filtered_chunks.append(filtered_chunk)
-
-# Parçaları birleştir
-filtered_labs = pd.concat(filtered_chunks, ignore_index=True)
-
-# Test ismini itemid ile eşleştir
+# Test ismini itemid ile eşleştirmek için etiket tablosu (küçük, bir kez okunur)
 labitems_df = pd.read_csv("data/d_labitems.csv")
-if "itemid" in filtered_labs.columns and "itemid" in labitems_df.columns:
-    labitems_df = labitems_df[["itemid", "label"]].drop_duplicates()
-    filtered_labs = filtered_labs.merge(labitems_df, on="itemid", how="left")
-    filtered_labs.rename(columns={"label": "test_name"}, inplace=True)
+labitems_df = labitems_df[["itemid", "label"]].drop_duplicates().rename(columns={"label": "test_name"})
+
+def add_test_name(chunk):
+    return chunk.merge(labitems_df, on="itemid", how="left")
 
-# Sonuçları kaydet
-filtered_labs.to_csv("data/depress_labs.csv", index=False)
-print(f"✅ Filtered lab data saved. Total rows: {len(filtered_labs)}")
+# labevents.csv dosyasını parça parça oku ve eşleşen satırları doğrudan yaz
+total = extract_cohort(
+    subject_ids,
+    [ExtractSource("data/labevents.csv", usecols=cols, dtype=dtypes, transform=add_test_name)],
+    "depress_labs",
+)
+print(f"✅ Filtered lab data saved. Total rows: {total}")
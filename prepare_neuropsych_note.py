@@ -1,31 +1,35 @@
-import pandas as pd
+import os
+
+from cohort_extract import ExtractSource, extract_cohort, load_cohort_ids
+from notes_index import update_notes_index
 
 # Nöropsikiyatrik hastaların subject_id'lerini al
-neuro_psych_ids = pd.read_csv("data/depress_patients.csv")["subject_id"].unique()
+neuro_psych_ids = load_cohort_ids("depress_patients")
 
-# Discharge ve radyoloji notlarını yükle
-try:
-    discharge = pd.read_csv("data/discharge.csv")
-    radiology = pd.read_csv("data/radiology.csv")
-except FileNotFoundError:
+# Discharge ve radyoloji notları
+if not (os.path.exists("data/discharge.csv") and os.path.exists("data/radiology.csv")):
     print("Discharge veya Radiology dosyası bulunamadı")
     exit()
 
-# Nöropsikiyatrik hastalara ait notları filtrele
-neuro_notes_discharge = discharge[discharge["subject_id"].isin(neuro_psych_ids)]
-neuro_notes_radiology = radiology[radiology["subject_id"].isin(neuro_psych_ids)]
+# Ortak sütunları birleştirecek şekilde normalize et (text, subject_id, hadm_id, charttime)
+source_cols = ["note_id", "subject_id", "hadm_id", "note_type", "note_seq", "charttime", "storetime", "text"]
+common_cols = source_cols + ["category"]
 
 # Kategori sütunu ekleyelim
-neuro_notes_discharge["category"] = "Discharge"
-neuro_notes_radiology["category"] = "Radiology"
+def with_category(category):
+    return lambda chunk: chunk.assign(category=category)
 
-# Ortak sütunları birleştirecek şekilde normalize et (text, subject_id, hadm_id, charttime)
-common_cols = ["note_id", "Hasta ID", "hadm_id", "note_type", "note_seq", "charttime", "storetime", "text", "category"]
-all_neuro_notes = pd.concat([
-    neuro_notes_discharge[common_cols],
-    neuro_notes_radiology[common_cols]
-], ignore_index=True)
+# Notlar uzun, çok satırlı metin içerdiğinden küçük parçalarla ve bölünmeden okunur
+extract_cohort(
+    neuro_psych_ids,
+    [
+        ExtractSource("data/discharge.csv", usecols=source_cols, transform=with_category("Discharge"), columns=common_cols, shardable=False),
+        ExtractSource("data/radiology.csv", usecols=source_cols, transform=with_category("Radiology"), columns=common_cols, shardable=False),
+    ],
+    "depress_notes",
+    chunksize=20000,
+)
+print("depress_notes veri kümesi başarıyla oluşturuldu.")
 
-# Dosyayı kaydet
-all_neuro_notes.to_csv("data/depress_notes.csv", index=False)
-print("depress_notes.csv dosyası başarıyla oluşturuldu.")
+# Arama dizinine yalnızca yeni notları ekle
+update_notes_index()
@@ -0,0 +1,160 @@
+import psycopg2
+import json
+import os
+import time
+from dotenv import load_dotenv
+
+from backend.cache import invalidate_tables
+from backend.queries import build_count_query, build_page_query
+
+# Load environment variables
+load_dotenv()
+
+DB_CONFIG = {
+    "dbname": os.getenv("DB_NAME", "mimiciv"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "password"),
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": os.getenv("DB_PORT", "5432")
+}
+
+# Natural keys; duplicate rows are removed before the key is added
+PRIMARY_KEYS = {
+    "mimiciv_hosp.patients": ["subject_id"],
+    "mimiciv_hosp.admissions": ["hadm_id"],
+    "mimiciv_icu.icustays": ["stay_id"],
+    "mimiciv_hosp.diagnoses_icd": ["hadm_id", "seq_num", "icd_code"],
+    "mimiciv_hosp.d_icd_diagnoses": ["icd_code", "icd_version"],
+    "mimiciv_ed.edstays": ["stay_id"],
+    "mimiciv_ed.triage": ["stay_id"],
+    "mimiciv_ed.diagnosis": ["stay_id", "seq_num"],
+}
+
+# (table, columns, method): join columns first, then the viewer's filter columns.
+# The (sort column, subject_id) indexes also serve the viewer's keyset pages
+# ordered by a patients column (backend/queries.py INDEXED_SORT_KEYS)
+INDEXES = [
+    ("mimiciv_hosp.admissions", ["subject_id"], "btree"),
+    ("mimiciv_icu.icustays", ["hadm_id"], "btree"),
+    ("mimiciv_hosp.diagnoses_icd", ["icd_code"], "btree"),
+    ("mimiciv_ed.edstays", ["subject_id"], "btree"),
+    ("mimiciv_ed.edstays", ["hadm_id"], "btree"),
+    ("mimiciv_ed.diagnosis", ["subject_id"], "btree"),
+    ("mimiciv_ed.diagnosis", ["icd_code"], "btree"),
+    ("mimiciv_ed.medrecon", ["stay_id"], "btree"),
+    ("mimiciv_ed.pyxis", ["stay_id"], "btree"),
+    ("mimiciv_ed.vitalsign", ["stay_id"], "btree"),
+    ("mimiciv_hosp.patients", ["gender", "subject_id"], "btree"),
+    ("mimiciv_hosp.patients", ["anchor_age", "subject_id"], "btree"),
+    ("mimiciv_hosp.admissions", ["admission_type"], "btree"),
+    ("mimiciv_hosp.d_icd_diagnoses", ["long_title"], "btree"),
+    ("mimiciv_hosp.diagnoses_icd", ["icd_code"], "trgm"),
+    ("mimiciv_hosp.d_icd_diagnoses", ["long_title"], "trgm"),
+]
+
+# (query, params) the viewer runs on a default (unfiltered) page load; the
+# sidebar options come from the filter dictionary and are not benchmarked here
+DASHBOARD_QUERIES = {
+    "total_count": build_count_query(),
+    "first_page": build_page_query("anchor_age"),
+}
+
+def table_exists(cursor, table):
+    cursor.execute("SELECT to_regclass(%s);", (table,))
+    return cursor.fetchone()[0] is not None
+
+def has_primary_key(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p';",
+        (table,),
+    )
+    return cursor.fetchone() is not None
+
+def add_primary_key(cursor, table, columns):
+    """Drop duplicate key rows, then add the primary key."""
+    match = " AND ".join(f"a.{col} = b.{col}" for col in columns)
+    cursor.execute(f"DELETE FROM {table} a USING {table} b WHERE a.ctid < b.ctid AND {match};")
+    if cursor.rowcount:
+        print(f"   {table}: removed {cursor.rowcount:,} duplicate rows")
+    cursor.execute(f"ALTER TABLE {table} ADD PRIMARY KEY ({', '.join(columns)});")
+
+def create_index(cursor, table, columns, method):
+    name = f"{table.split('.')[1]}_{'_'.join(columns)}_{method}_idx"
+    if method == "trgm":
+        column_sql = ", ".join(f"{col} gin_trgm_ops" for col in columns)
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column_sql});")
+    else:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)});")
+
+def explain_timings(cursor):
+    """Execution time in ms of every dashboard query, from EXPLAIN ANALYZE."""
+    timings = {}
+    for name, (sql, params) in DASHBOARD_QUERIES.items():
+        try:
+            cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql.strip().rstrip(';')}", params or None)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            timings[name] = plan[0]["Execution Time"]
+        except psycopg2.Error as e:
+            print(f"⚠️ EXPLAIN {name} failed: {e.pgerror or e}")
+            timings[name] = None
+    return timings
+
+def provision(conn, benchmark=True):
+    """Create keys and indexes for the imported MIMIC tables, ANALYZE them and
+    report dashboard query timings before and after."""
+    conn.autocommit = True
+    cursor = conn.cursor()
+    before = explain_timings(cursor) if benchmark else {}
+
+    started = time.perf_counter()
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        trgm_available = True
+    except psycopg2.Error as e:
+        print(f"⚠️ pg_trgm unavailable, trigram indexes skipped: {e.pgerror or e}")
+        trgm_available = False
+
+    tables = set()
+    for table, columns in PRIMARY_KEYS.items():
+        if not table_exists(cursor, table) or has_primary_key(cursor, table):
+            continue
+        try:
+            add_primary_key(cursor, table, columns)
+            tables.add(table)
+            print(f"🔑 {table}: PRIMARY KEY ({', '.join(columns)})")
+        except psycopg2.Error as e:
+            print(f"⚠️ {table}: primary key not created: {e.pgerror or e}")
+
+    for table, columns, method in INDEXES:
+        if not table_exists(cursor, table) or (method == "trgm" and not trgm_available):
+            continue
+        try:
+            create_index(cursor, table, columns, method)
+            tables.add(table)
+        except psycopg2.Error as e:
+            print(f"⚠️ {table}: {method} index on {', '.join(columns)} not created: {e.pgerror or e}")
+
+    for table in sorted(tables):
+        cursor.execute(f"ANALYZE {table};")
+    # Duplicate removal may have changed query results
+    invalidate_tables(tables)
+    print(f"✅ Keys and indexes provisioned for {len(tables)} tables in {time.perf_counter() - started:.1f}s")
+
+    if benchmark:
+        after = explain_timings(cursor)
+        print("\n⏱️ Dashboard query timings (ms)")
+        for name in DASHBOARD_QUERIES:
+            old, new = before.get(name), after.get(name)
+            if old is None or new is None:
+                continue
+            print(f"   {name:<24} {old:>10.1f} → {new:>10.1f}")
+    cursor.close()
+
+if __name__ == "__main__":
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        provision(conn)
+    finally:
+        conn.close()
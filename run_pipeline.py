@@ -0,0 +1,265 @@
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from datasets import dataset_path, parquet_path
+
+# Kohort oluşturma adımlarının yapı grafiği. Her adım girdilerini, çıktılarını
+# ve parametrelerini (betiğe ortam değişkeni olarak verilir) bildirir; bağımlılıklar
+# bir adımın girdisinin başka bir adımın çıktısı olmasından çıkarılır. Betik ve
+# içe aktardığı depo modülleri, parametreler ve girdi içerik özetleri değişmeyen
+# adımlar yeniden çalıştırılmaz.
+PIPELINE_JOBS = int(os.getenv("PIPELINE_JOBS", "5"))
+PIPELINE_STATE_PATH = os.getenv("PIPELINE_STATE_PATH", os.path.join(".cache", "pipeline_state.json"))
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# stay_events.py'nin başvurulara hizaladığı detay kümeleri
+EVENT_DATASETS = ["depress_labs", "depress_meds", "depress_medrecon", "depress_pyxis", "depress_notes"]
+
+class Step:
+    def __init__(self, name, script, inputs, outputs, params=None):
+        self.name = name
+        self.script = script
+        self.inputs = inputs
+        self.outputs = outputs
+        self.params = params or {}
+
+PIPELINE_STEPS = [
+    Step(
+        "patients", "prepare_major_depressive_patients.py",
+        # Kohort tanımı da girdidir; değişince kohort yeniden oluşur
+        inputs=["data/diagnosis.csv", "data/d_icd_diagnoses.csv", "data/edstays.csv", "cohorts.json"],
+        outputs=[parquet_path("depress_diagnoses"), parquet_path("depress_patients")],
+    ),
+    Step(
+        "labs", "prepare_labs.py",
+        inputs=[parquet_path("depress_patients"), "data/labevents.csv", "data/d_labitems.csv"],
+        outputs=[parquet_path("depress_labs")],
+    ),
+    Step(
+        "lab_features", "lab_features.py",
+        inputs=[parquet_path("depress_patients"), parquet_path("depress_labs")],
+        outputs=[parquet_path("depress_lab_features")],
+    ),
+    Step(
+        "meds", "prepare_depress_meds.py",
+        inputs=[parquet_path("depress_patients"), "data/prescriptions.csv"],
+        outputs=[parquet_path("depress_meds")],
+    ),
+    Step(
+        "medrecon", "prepare_medrecon.py",
+        inputs=[parquet_path("depress_patients"), "data/medrecon.csv"],
+        outputs=[parquet_path("depress_medrecon")],
+    ),
+    Step(
+        "pyxis", "prepare_depress_pyxis.py",
+        inputs=[parquet_path("depress_patients"), "data/pyxis.csv"],
+        outputs=[parquet_path("depress_pyxis")],
+    ),
+    Step(
+        "notes", "prepare_neuropsych_note.py",
+        inputs=[parquet_path("depress_patients"), "data/discharge.csv", "data/radiology.csv"],
+        outputs=[parquet_path("depress_notes")],
+    ),
+    Step(
+        "stay_events", "stay_events.py",
+        # Detay kümeleri başvurulara hizalanır; yatış pencereleri admissions'tan gelir
+        inputs=[parquet_path("depress_patients"), dataset_path("admissions")]
+        + [parquet_path(dataset) for dataset in EVENT_DATASETS],
+        outputs=[parquet_path(f"{dataset}_by_stay") for dataset in EVENT_DATASETS],
+    ),
+]
+
+def module_paths(module, base_dir):
+    """``a.b`` modülü için depoda karşılık gelen dosyalar (paket __init__.py'leri dahil)."""
+    parts = module.split(".")
+    paths = []
+    for depth in range(1, len(parts) + 1):
+        package = os.path.join(base_dir, *parts[:depth], "__init__.py")
+        if os.path.exists(package):
+            paths.append(package)
+        elif depth == len(parts) and os.path.exists(os.path.join(base_dir, *parts) + ".py"):
+            paths.append(os.path.join(base_dir, *parts) + ".py")
+    return paths
+
+def local_imports(script):
+    """Betiğin doğrudan ya da dolaylı içe aktardığı depo içi modül dosyaları (betik dahil).
+
+    Modüller betiğin bulunduğu dizine göre çözülür; kurulu paketler ve
+    standart kütüphane depoda dosyası olmadığından kendiliğinden elenir.
+    """
+    base_dir = os.path.dirname(os.path.abspath(script))
+    seen = set()
+    pending = [os.path.abspath(script)]
+    while pending:
+        path = pending.pop()
+        if path in seen or not os.path.exists(path):
+            continue
+        seen.add(path)
+        with open(path, "rb") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    # Göreli içe aktarma: paketin dizinine göre çöz
+                    package_dir = path
+                    for _ in range(node.level):
+                        package_dir = os.path.dirname(package_dir)
+                    prefix = os.path.relpath(package_dir, base_dir).replace(os.sep, ".")
+                    module = ".".join(part for part in (prefix, node.module) if part and part != ".")
+                else:
+                    module = node.module
+                # "from paket import modul" alt modülleri de getirebilir
+                modules = [module] + [f"{module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            for module in modules:
+                pending.extend(module_paths(module, base_dir))
+    return sorted(os.path.relpath(path) for path in seen)
+
+class BuildState:
+    """Dosya içerik özetleri ((boyut, zaman) değişmedikçe yeniden hesaplanmaz)
+    ve her adımın son başarılı çalışmasının parmak izi."""
+
+    def __init__(self, path=PIPELINE_STATE_PATH):
+        self.path = path
+        try:
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        self.files = state.get("files", {})
+        self.steps = state.get("steps", {})
+
+    def file_hash(self, path):
+        """İçerik özeti; dosya yoksa None."""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        cached = self.files.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+        self.files[path] = [stat.st_size, stat.st_mtime, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def fingerprint(self, step):
+        payload = {
+            # Betiğin kullandığı depo modülleri (datasets.py vb.) değişince de adım yeniden çalışır
+            "code": {path: self.file_hash(path) for path in local_imports(step.script)},
+            "params": step.params,
+            "inputs": {path: self.file_hash(path) for path in step.inputs},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def is_fresh(self, step):
+        """Son çalışmadan beri ne girdiler ne de çıktılar değişmediyse True."""
+        record = self.steps.get(step.name)
+        if record is None or record["fingerprint"] != self.fingerprint(step):
+            return False
+        outputs = record["outputs"]
+        return all(path in outputs and self.file_hash(path) == outputs[path] for path in step.outputs)
+
+    def record(self, step, fingerprint):
+        self.steps[step.name] = {
+            "fingerprint": fingerprint,
+            "outputs": {path: self.file_hash(path) for path in step.outputs},
+        }
+        self.save()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "steps": self.steps}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+def step_dependencies(steps):
+    """Adım adı → girdilerini üreten adımların adları."""
+    producers = {path: step.name for step in steps for path in step.outputs}
+    return {
+        step.name: sorted({producers[path] for path in step.inputs if path in producers and producers[path] != step.name})
+        for step in steps
+    }
+
+def run_step(step, extract_workers):
+    """Adımı alt süreçte çalıştır; (dönüş kodu, çıktı, süre)."""
+    started = time.perf_counter()
+    # Aynı anda çalışan adımlar çekirdekleri paylaşsın
+    env = dict(os.environ, EXTRACT_WORKERS=str(extract_workers), **step.params)
+    result = subprocess.run([sys.executable, step.script], capture_output=True, text=True, env=env)
+    return result.returncode, result.stdout + result.stderr, time.perf_counter() - started
+
+def run_pipeline(steps=PIPELINE_STEPS, jobs=PIPELINE_JOBS, force=False, state_path=PIPELINE_STATE_PATH):
+    """Eskimiş adımları bağımlılık sırasıyla, bağımsız olanları paralel çalıştır."""
+    started = time.perf_counter()
+    state = BuildState(state_path)
+    dependencies = step_dependencies(steps)
+    extract_workers = max(1, (os.cpu_count() or 1) // jobs)
+    remaining = {step.name: step for step in steps}
+    done, failed = set(), set()
+    results = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        running = {}
+        while remaining or running:
+            progressed = False
+            for name, step in list(remaining.items()):
+                deps = dependencies[name]
+                if any(dep in failed for dep in deps):
+                    print(f"⏭️ {name}: bağımlı olduğu adım başarısız, atlandı")
+                    failed.add(name)
+                    del remaining[name]
+                    progressed = True
+                elif all(dep in done for dep in deps) and len(running) < jobs:
+                    del remaining[name]
+                    progressed = True
+                    # Girdiler yukarı akıştaki adımlar bittikten sonra özetlenir
+                    fingerprint = state.fingerprint(step)
+                    if not force and state.is_fresh(step):
+                        print(f"♻️ {name}: girdiler değişmedi, atlandı")
+                        results[name] = ("cached", 0.0)
+                        done.add(name)
+                        continue
+                    print(f"🚀 {name}: {step.script}")
+                    running[pool.submit(run_step, step, extract_workers)] = (step, fingerprint)
+            if not running:
+                # Önbellekten gelen adımlar yeni adımların önünü açmış olabilir
+                if remaining and progressed:
+                    continue
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step, fingerprint = running.pop(future)
+                returncode, output, elapsed = future.result()
+                print(f"--- {step.name} ({elapsed:.1f}s) ---\n{output.rstrip()}")
+                missing = [path for path in step.outputs if not os.path.exists(path)]
+                if returncode == 0 and not missing:
+                    state.record(step, fingerprint)
+                    results[step.name] = ("ok", elapsed)
+                    done.add(step.name)
+                else:
+                    if missing:
+                        print(f"❌ {step.name}: çıktılar oluşmadı: {', '.join(missing)}")
+                    results[step.name] = ("failed", elapsed)
+                    failed.add(step.name)
+
+    print("\n📊 Pipeline summary")
+    icons = {"ok": "✅", "cached": "♻️", "failed": "❌"}
+    for step in steps:
+        status, elapsed = results.get(step.name, ("skipped", None))
+        print(f"   {icons.get(status, '⏭️')} {step.name:<10} {status:<8} {'-' if elapsed is None else f'{elapsed:.1f}s':>8}")
+    print(f"⏱️ Toplam süre: {time.perf_counter() - started:.1f}s")
+    return not failed
+
+if __name__ == "__main__":
+    sys.exit(0 if run_pipeline(force="--force" in sys.argv[1:]) else 1)
@@ -0,0 +1,91 @@
+import os
+import pandas as pd
+
+# Column type candidates, checked from narrowest to widest
+INT_PATTERN = r"^[+-]?\d+$"
+NUMERIC_PATTERN = r"^[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?$"
+# Codes such as ICD "07070" must stay text to keep their leading zeros
+LEADING_ZERO_PATTERN = r"^[+-]?0\d"
+TIMESTAMP_PATTERN = r"^\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?$"
+
+INTEGER_TYPES = [
+    ("SMALLINT", -32768, 32767),
+    ("INT", -2147483648, 2147483647),
+    ("BIGINT", -9223372036854775808, 9223372036854775807),
+]
+
+class ColumnStats:
+    """Running type evidence for one column, updated chunk by chunk."""
+
+    def __init__(self):
+        self.candidates = {"int", "numeric", "timestamp"}
+        self.non_null = 0
+        self.min_int = None
+        self.max_int = None
+
+    def update(self, values):
+        values = values.dropna()
+        if values.empty:
+            return
+        self.non_null += len(values)
+        values = values.str.strip()
+        if values.str.match(LEADING_ZERO_PATTERN).any():
+            self.candidates -= {"int", "numeric"}
+
+        if "int" in self.candidates:
+            if values.str.match(INT_PATTERN).all():
+                ints = pd.to_numeric(values, errors="coerce")
+                # Integers wider than int64 come back as floats or NaN
+                if ints.isna().any() or ints.dtype != "int64":
+                    self.candidates.discard("int")
+                else:
+                    low, high = int(ints.min()), int(ints.max())
+                    self.min_int = low if self.min_int is None else min(self.min_int, low)
+                    self.max_int = high if self.max_int is None else max(self.max_int, high)
+            else:
+                self.candidates.discard("int")
+
+        if "numeric" in self.candidates and not values.str.match(NUMERIC_PATTERN).all():
+            self.candidates.discard("numeric")
+
+        if "timestamp" in self.candidates:
+            if not values.str.match(TIMESTAMP_PATTERN).all() \
+                    or pd.to_datetime(values, format="ISO8601", errors="coerce").isna().any():
+                self.candidates.discard("timestamp")
+
+    def postgres_type(self):
+        if self.non_null == 0:
+            return "TEXT"
+        if "int" in self.candidates:
+            for type_name, low, high in INTEGER_TYPES:
+                if low <= self.min_int and self.max_int <= high:
+                    return type_name
+        if "numeric" in self.candidates:
+            return "NUMERIC"
+        if "timestamp" in self.candidates:
+            return "TIMESTAMP"
+        return "TEXT"
+
+def infer_csv_schema(csv_path, chunksize=100000):
+    """Scan every row of a CSV and return ``{column: postgres_type}`` in file order."""
+    stats = {}
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize, dtype=str,
+                             keep_default_na=False, na_values=[""]):
+        for col in chunk.columns:
+            stats.setdefault(col, ColumnStats()).update(chunk[col])
+    if not stats:
+        stats = {col: ColumnStats() for col in pd.read_csv(csv_path, nrows=0).columns}
+    return {col: column.postgres_type() for col, column in stats.items()}
+
+def render_create_table(schema, table_name, column_types):
+    """CREATE TABLE statement for an inferred schema."""
+    columns = ",\n".join(f"    {col} {col_type}" for col, col_type in column_types.items())
+    return f"CREATE TABLE IF NOT EXISTS {schema}.{table_name} (\n{columns}\n);\n"
+
+def write_ddl(ddl_dir, schema, table_name, column_types):
+    """Write the inferred DDL to ``<ddl_dir>/<schema>.<table>.sql`` for review."""
+    os.makedirs(ddl_dir, exist_ok=True)
+    ddl_path = os.path.join(ddl_dir, f"{schema}.{table_name}.sql")
+    with open(ddl_path, "w", encoding="utf-8") as f:
+        f.write(render_create_table(schema, table_name, column_types))
+    return ddl_path
@@ -0,0 +1,255 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from build_cohort import read_input
+from datasets import DATA_DIR, DatasetWriter, dataset_columns, dataset_exists, dataset_path, iter_dataset, read_dataset, subject_filter
+from patient_store import DETAIL_SOURCES
+
+# Olayları (lab, ilaç, not...) ait oldukları acil servis başvurusuna atayan
+# aralık birleştirmesi. Başvurular hasta ve başlangıç zamanına göre sıralı
+# dizilerde tutulur; her olay için hastanın kendisinden önce başlayan en son
+# başvurusu ikili aramayla (merge_asof gibi) bulunur ve olay bu başvurunun
+# penceresindeyse ona atanır. Hasta başına çapraz birleştirme yapılmaz.
+# Pencere dışında kalan olaylar, yatış kimliği (hadm_id) veya yatış penceresi
+# üzerinden o yatışa yol açan başvuruya bağlanır.
+
+# Başvuru penceresi: [intime - önce, outtime + sonra] (saat)
+EVENT_BEFORE_HOURS = float(os.getenv("EVENT_BEFORE_HOURS", "0"))
+EVENT_AFTER_HOURS = float(os.getenv("EVENT_AFTER_HOURS", "0"))
+EVENT_BATCH_ROWS = int(os.getenv("EVENT_BATCH_ROWS", "1000000"))
+
+STAYS_DATASET = "depress_patients"
+STAY_COLUMNS = ["subject_id", "stay_id", "hadm_id", "intime", "outtime"]
+ADMISSION_COLUMNS = ["subject_id", "hadm_id", "admittime", "dischtime"]
+
+# Panel adı → olay zamanı sütunu (veri kümeleri patient_store.DETAIL_SOURCES'tadır)
+EVENT_TIME_COLUMNS = {
+    "labs": "charttime",
+    "meds": "starttime",
+    "medrecon": "charttime",
+    "pyxis": "starttime",
+    "notes": "charttime",
+}
+
+# aligned_by değerleri: olayın kendi stay_id'si, başvuru penceresi, yatış
+ALIGNED_BY = ["stay_id", "ed", "admission"]
+
+def _ints(values):
+    """Boş olabilen tamsayılar → (int64 dizi, dolu mu maskesi)."""
+    values = pd.Series(values)
+    return values.fillna(0).to_numpy(dtype="int64"), values.notna().to_numpy()
+
+def _seconds(values):
+    """Zamanlar → (epoch saniyesi, dolu mu maskesi)."""
+    values = pd.to_datetime(pd.Series(values), errors="coerce")
+    valid = values.notna().to_numpy()
+    return values.to_numpy(dtype="datetime64[s]").astype("int64"), valid
+
+class SubjectIntervals:
+    """Hasta başına [başlangıç, bitiş] aralıkları ve ikili aramayla olay ataması.
+
+    Aralıklar (hasta sırası, başlangıç) bileşik anahtarına göre sıralanır; bir
+    olayın anahtarı tek bir ``np.searchsorted`` ile aranır. Aynı hastanın
+    olayı kapsayan aralıklarından en son başlayanı seçilir. Uzun bir aralığın
+    içine sonradan başlayan kısa bir aralık düştüğünde olaydan önce başlayan son
+    aralık olayı kapsamayabilir; hasta içindeki bitişlerin birikimli en büyüğü
+    kapsayan bir aralık olup olmadığını söyler, varsa geriye doğru aranır.
+    """
+
+    def __init__(self, subject_ids, starts, ends):
+        subjects, subject_valid = _ints(subject_ids)
+        start_seconds, start_valid = _seconds(starts)
+        end_seconds, end_valid = _seconds(ends)
+        # Bitişi boş olan aralık yalnızca başlangıç anını kapsar
+        end_seconds = np.where(end_valid, end_seconds, start_seconds)
+        rows = np.flatnonzero(subject_valid & start_valid)
+        rows = rows[np.lexsort((start_seconds[rows], subjects[rows]))]
+        self.rows = rows
+        self.subject_ids = subjects[rows]
+        self.ends = end_seconds[rows]
+        self.max_ends = pd.Series(self.ends).groupby(subjects[rows]).cummax().to_numpy()
+        self.subjects = np.unique(self.subject_ids)
+        starts = start_seconds[rows]
+        self.origin = int(starts.min()) if len(rows) else 0
+        # Olay anahtarları başka bir hastanın anahtar aralığına taşmasın diye
+        # göreli zamanlar [-1, span - 1] aralığına kırpılır
+        self.span = int(starts.max()) - self.origin + 2 if len(rows) else 1
+        if len(self.subjects) * self.span >= 2 ** 62:
+            raise ValueError("Aralık anahtarları int64'e sığmıyor")
+        self.keys = np.searchsorted(self.subjects, self.subject_ids) * self.span + (starts - self.origin)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def lookup(self, subject_ids, times):
+        """Her olay için kapsayan aralığın kaynak tablodaki satır konumu (-1: yok)."""
+        subjects, subject_valid = _ints(subject_ids)
+        seconds, time_valid = _seconds(times)
+        result = np.full(len(subjects), -1, dtype="int64")
+        if not len(self.rows):
+            return result
+        rank = np.minimum(np.searchsorted(self.subjects, subjects), len(self.subjects) - 1)
+        known = subject_valid & time_valid & (self.subjects[rank] == subjects)
+        keys = rank * self.span + np.clip(seconds - self.origin, -1, self.span - 1)
+        positions = np.searchsorted(self.keys, keys, side="right") - 1
+        clipped = np.maximum(positions, 0)
+        hit = known & (positions >= 0) & (self.subject_ids[clipped] == subjects) & (seconds <= self.max_ends[clipped])
+        # Son aralık kapsamıyorsa hastanın daha önce başlayan aralıklarına geri gidilir;
+        # birikimli en büyük bitiş, arama hastanın ilk aralığından önce biter demektir
+        pending = np.flatnonzero(hit & (seconds > self.ends[clipped]))
+        while len(pending):
+            clipped[pending] -= 1
+            pending = pending[seconds[pending] > self.ends[clipped[pending]]]
+        result[hit] = self.rows[clipped[hit]]
+        return result
+
+def stay_intervals(stays, before_hours=EVENT_BEFORE_HOURS, after_hours=EVENT_AFTER_HOURS):
+    return SubjectIntervals(
+        stays["subject_id"],
+        pd.to_datetime(stays["intime"]) - pd.Timedelta(hours=before_hours),
+        pd.to_datetime(stays["outtime"]) + pd.Timedelta(hours=after_hours),
+    )
+
+class StayAligner:
+    """Başvuru ve (varsa) yatış pencerelerini bir kez dizinleyip olay parçalarını hizalar."""
+
+    def __init__(self, stays, admissions=None, before_hours=EVENT_BEFORE_HOURS, after_hours=EVENT_AFTER_HOURS):
+        stays = stays.dropna(subset=["subject_id", "stay_id"]).drop_duplicates("stay_id").reset_index(drop=True)
+        self.stays = stays
+        self.subject_ids, _ = _ints(stays["subject_id"])
+        self.stay_ids, _ = _ints(stays["stay_id"])
+        self.hadm_ids, self.hadm_valid = _ints(stays["hadm_id"]) if "hadm_id" in stays.columns else \
+            (np.zeros(len(stays), dtype="int64"), np.zeros(len(stays), dtype=bool))
+        self.ed = stay_intervals(stays, before_hours, after_hours)
+        self.admissions = None
+        if admissions is not None and not admissions.empty:
+            self.admissions = admissions.reset_index(drop=True)
+            self.admission_hadm_ids, _ = _ints(self.admissions["hadm_id"])
+            self.admission_intervals = SubjectIntervals(admissions["subject_id"], admissions["admittime"], admissions["dischtime"])
+        # (hasta, yatış) → o yatışa yol açan (en son) başvurunun satırı
+        linked = np.flatnonzero(self.hadm_valid)
+        index = pd.MultiIndex.from_arrays([self.subject_ids[linked], self.hadm_ids[linked]])
+        self.hadm_index = index[~index.duplicated(keep="last")]
+        self.hadm_rows = linked[~index.duplicated(keep="last")]
+
+    def align(self, events, time_column):
+        """``aligned_stay_id``, ``aligned_hadm_id`` ve ``aligned_by`` sütunlarını ekle."""
+        n = len(events)
+        stay_rows = np.full(n, -1, dtype="int64")
+        stay_ids = np.zeros(n, dtype="int64")
+        hadm_ids = np.zeros(n, dtype="int64")
+        hadm_valid = np.zeros(n, dtype=bool)
+        by = np.full(n, -1, dtype="int8")
+
+        # 1. Olayın kendi stay_id'si (ör. pyxis, medrecon)
+        if "stay_id" in events.columns:
+            native, native_valid = _ints(events["stay_id"])
+            stay_ids[native_valid] = native[native_valid]
+            by[native_valid] = 0
+            positions = pd.Index(self.stay_ids).get_indexer(native)
+            stay_rows[native_valid] = positions[native_valid]
+
+        # 2. Başvuru penceresi
+        pending = by < 0
+        if pending.any():
+            positions = self.ed.lookup(events["subject_id"][pending], events[time_column][pending])
+            found = np.flatnonzero(pending)[positions >= 0]
+            stay_rows[found] = positions[positions >= 0]
+            stay_ids[found] = self.stay_ids[positions[positions >= 0]]
+            by[found] = 1
+
+        # 3. Yatış: olayın kendi hadm_id'si, yoksa yatış penceresi → yatışa yol açan başvuru
+        pending = by < 0
+        if pending.any():
+            admission, admission_valid = (_ints(events["hadm_id"]) if "hadm_id" in events.columns else
+                                          (np.zeros(n, dtype="int64"), np.zeros(n, dtype=bool)))
+            if self.admissions is not None:
+                missing = np.flatnonzero(pending & ~admission_valid)
+                positions = self.admission_intervals.lookup(events["subject_id"].iloc[missing], events[time_column].iloc[missing])
+                inside = missing[positions >= 0]
+                admission[inside] = self.admission_hadm_ids[positions[positions >= 0]]
+                admission_valid[inside] = True
+            candidates = np.flatnonzero(pending & admission_valid)
+            subjects, _ = _ints(events["subject_id"].iloc[candidates])
+            positions = self.hadm_index.get_indexer(pd.MultiIndex.from_arrays([subjects, admission[candidates]]))
+            linked = positions >= 0
+            found = candidates[linked]
+            stay_rows[found] = self.hadm_rows[positions[linked]]
+            stay_ids[found] = self.stay_ids[stay_rows[found]]
+            by[found] = 2
+            # Başvuruya bağlanamasa da yatışı bilinen olaylar
+            hadm_ids[candidates] = admission[candidates]
+            hadm_valid[candidates] = True
+
+        # Başvurusu bilinen olayların yatışı başvurunun yatışıdır
+        known = stay_rows >= 0
+        hadm_ids[known] = self.hadm_ids[stay_rows[known]]
+        hadm_valid[known] = self.hadm_valid[stay_rows[known]]
+
+        return events.assign(
+            aligned_stay_id=pd.arrays.IntegerArray(stay_ids, by < 0),
+            aligned_hadm_id=pd.arrays.IntegerArray(hadm_ids, ~hadm_valid),
+            aligned_by=pd.Categorical.from_codes(by, ALIGNED_BY),
+        )
+
+def load_stays(dataset=STAYS_DATASET, data_dir=DATA_DIR):
+    columns = [column for column in STAY_COLUMNS if column in dataset_columns(dataset, data_dir)]
+    return read_dataset(dataset, columns=columns, data_dir=data_dir)
+
+def load_admissions(subject_ids=None):
+    """Yatış pencereleri (verilirse yalnızca bu hastaların); admissions kümesi veya sütunları yoksa boş tablo."""
+    filters = subject_filter(subject_ids) if subject_ids is not None else None
+    admissions = read_input("admissions", ADMISSION_COLUMNS, filters=filters)
+    return admissions.dropna(subset=["subject_id", "hadm_id", "admittime"]) if not admissions.empty else admissions
+
+def event_time_column(name, columns):
+    """Olay zamanı sütunu; kayıttaki sütun yoksa charttime/starttime'dan ilki."""
+    for column in (EVENT_TIME_COLUMNS.get(name), "charttime", "starttime"):
+        if column in columns:
+            return column
+    return None
+
+def align_dataset(name, aligner, dataset=None, data_dir=DATA_DIR):
+    """``dataset`` kümesini parça parça hizalayıp ``<küme>_by_stay`` olarak yaz."""
+    started = time.perf_counter()
+    dataset = dataset or DETAIL_SOURCES[name]
+    columns = dataset_columns(dataset, data_dir)
+    time_column = event_time_column(name, columns)
+    if "subject_id" not in columns or time_column is None:
+        print(f"⚠️ {dataset_path(dataset, data_dir)}: subject_id veya zaman sütunu yok, hizalanmadı")
+        return None
+    counts = pd.Series(0, index=ALIGNED_BY + ["unmatched"])
+    with DatasetWriter(f"{dataset}_by_stay", data_dir) as writer:
+        # Başvurusu olmayan hastaların olayları hizalanamaz; okunmaz
+        filters = subject_filter(aligner.stays["subject_id"])
+        for chunk in iter_dataset(dataset, batch_size=EVENT_BATCH_ROWS, filters=filters, data_dir=data_dir):
+            chunk = aligner.align(chunk, time_column)
+            writer.write(chunk)
+            counts = counts.add(chunk["aligned_by"].value_counts().reindex(counts.index, fill_value=0), fill_value=0)
+            counts["unmatched"] += int(chunk["aligned_by"].isna().sum())
+    summary = ", ".join(f"{label} {int(count):,}" for label, count in counts.items())
+    print(f"✅ {writer.path}: {writer.rows:,} olay ({summary}; {time.perf_counter() - started:.1f}s)")
+    return writer.path
+
+def build_stay_events(names=None, data_dir=DATA_DIR):
+    """Detay kaynaklarının başvuruya hizalanmış kopyalarını oluştur."""
+    stays = load_stays(data_dir=data_dir)
+    aligner = StayAligner(stays, load_admissions(stays["subject_id"]))
+    print(f"🗂️ {len(aligner.ed):,} başvuru penceresi"
+          + (f", {len(aligner.admission_intervals):,} yatış penceresi" if aligner.admissions is not None else ""))
+    for name in names or DETAIL_SOURCES:
+        if dataset_exists(DETAIL_SOURCES[name], data_dir):
+            align_dataset(name, aligner, data_dir=data_dir)
+        else:
+            print(f"⏭️ {dataset_path(DETAIL_SOURCES[name], data_dir)} bulunamadı, atlandı")
+
+if __name__ == "__main__":
+    # python stay_events.py [kaynak ...]  (labs, meds, medrecon, pyxis, notes)
+    if not dataset_exists(STAYS_DATASET):
+        print(f"❌ {dataset_path(STAYS_DATASET)} bulunamadı")
+        sys.exit(1)
+    build_stay_events(sys.argv[1:] or None)
@@ -0,0 +1,67 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from datasets import DATA_DIR, DatasetWriter, coerce_frame, dataset_schema, iter_csv
+
+# Büyük bir olgu tablosunu (ör. ED tanıları) küçük boyut tablolarıyla parça
+# parça birleştiren akışlı hash join. Boyut tabloları anahtarlarına göre bir kez
+# dizinlenip bellekte tutulur (broadcast); olgu tablosu sabit boyutlu parçalar
+# halinde okunur, her parça dizinlerde aranıp sabit şemayla çıktıya eklenir.
+# Bellek kullanımı boyut tabloları + bir parça kadardır.
+JOIN_BLOCK_MB = int(os.getenv("JOIN_BLOCK_MB", "8"))
+
+def key_index(frame, keys):
+    if len(keys) == 1:
+        return pd.Index(frame[keys[0]])
+    return pd.MultiIndex.from_frame(frame[keys])
+
+class Dimension:
+    """Anahtar → satır eşlemesi bellekte tutulan küçük tablo.
+
+    Anahtar başına bir satır tutulur (yinelenenlerde ilki); olgu satırının
+    anahtarı bulunamazsa veya boşsa boyut sütunları boş kalır. ``columns``
+    içinde tabloda olmayanlar atlanır.
+    """
+
+    def __init__(self, name, frame, keys, columns):
+        self.name = name
+        self.keys = keys
+        self.columns = [column for column in columns if column in frame.columns and column not in keys]
+        frame = coerce_frame(frame[keys + self.columns], dataset_schema(keys + self.columns))
+        duplicated = frame.duplicated(subset=keys)
+        if duplicated.any():
+            print(f"⚠️ {name}: {int(duplicated.sum()):,} yinelenen anahtar, ilk satır kullanıldı")
+            frame = frame[~duplicated]
+        self.index = key_index(frame, keys)
+        # Son satır tamamen boştur; eşleşmeyen olgu satırları buraya bakar
+        self.values = frame[self.columns].reset_index(drop=True).reindex(range(len(frame) + 1))
+
+    def lookup(self, chunk):
+        """Parçanın her satırı için boyut sütunları (parça ile aynı sırada)."""
+        positions = self.index.get_indexer(key_index(chunk, self.keys))
+        positions[chunk[self.keys].isna().any(axis=1).to_numpy()] = -1
+        positions = np.where(positions < 0, len(self.values) - 1, positions)
+        return self.values.take(positions).set_index(chunk.index)
+
+def join_chunk(chunk, dimensions):
+    """Boyutları sırayla ekle; sonraki boyutların anahtarları öncekilerden gelebilir."""
+    for dimension in dimensions:
+        chunk = pd.concat([chunk, dimension.lookup(chunk)], axis=1)
+    return chunk
+
+def stream_join(fact_path, fact_columns, dimensions, output, block_mb=JOIN_BLOCK_MB, data_dir=DATA_DIR):
+    """``fact_path`` CSV'sini parça parça boyutlarla birleştirip ``output`` veri kümesine yaz.
+
+    Çıktı şeması olgu sütunları ve boyut sütunlarından sabittir; yazılan satır
+    sayısını döndürür.
+    """
+    started = time.perf_counter()
+    columns = list(fact_columns) + [column for dimension in dimensions for column in dimension.columns]
+    with DatasetWriter(output, data_dir) as writer:
+        for chunk in iter_csv(fact_path, fact_columns, block_size=block_mb * 1024 * 1024):
+            writer.write(join_chunk(chunk, dimensions)[columns])
+    print(f"✅ {writer.path}: {writer.rows:,} satır ({time.perf_counter() - started:.1f}s)")
+    return writer.rows